@@ -1,19 +1,75 @@
 import os
+import base64
+import math
+import multiprocessing as mp
+import resource
+import threading
+import time
 import cv2
-from flask import Flask, render_template, request, jsonify
+import numpy as np
+from flask import Flask, Response, g, render_template, request, jsonify
 from werkzeug.utils import secure_filename
 
-from src.detect_cars import CarDetector
-from src.occupancy import OccupancyDetector
-from src.slot_utils import load_slots
-from src.visualize import draw_results
+from config import config
+
+from src.history import OccupancyHistory, RESOLUTIONS
+from src.inference_pool import InferencePool
+from src.layouts import LayoutRegistry
+from src.live_feed import LiveFeed
+from src.metrics import REGISTRY, StageTimer
+from src.result_cache import ResultCache
+from src.upload_store import AsyncUploadStore
 
 app = Flask(__name__)
 
+app_config = config.get(os.environ.get('FLASK_ENV', 'default'), config['default'])
+app_config.validate()
+
 # Configuration
 UPLOAD_FOLDER = "static/uploads"
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
+MAX_BATCH_FILES = 32
+BATCH_SIZE = 8
+OUTPUT_MODES = {'json', 'image'}
+JPEG_QUALITY = 90
+
+# Restrict detection to the slot area, optionally split into tiles
+ROI_INFERENCE = os.environ.get('ROI_INFERENCE', 'False').lower() == 'true'
+TILE_SIZE = int(os.environ.get('TILE_SIZE', 0)) or None
+ROI_MARGIN = 32
+
+# Uploads are decoded in memory; writing them to disk is optional
+SAVE_UPLOADS = os.environ.get('SAVE_UPLOADS', 'False').lower() == 'true'
+
+# Background inference pool for the async job API
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 2))
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 8))
+MAX_BATCH_WAIT_MS = float(os.environ.get('MAX_BATCH_WAIT_MS', 10))
+
+# Load the model and run a dummy inference in the background at import;
+# /readyz reports 503 until this has finished
+WARMUP_ON_START = os.environ.get('WARMUP_ON_START', 'True').lower() == 'true'
+WARMUP_FRAME_SIZE = (1280, 720)
+
+# Results for repeated uploads, keyed by upload bytes, layout and model;
+# RESULT_CACHE_SIZE=0 disables the cache
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 256))
+RESULT_CACHE_TTL = float(os.environ.get('RESULT_CACHE_TTL', 300))
+RESULT_CACHE_MAX_MB = int(os.environ.get('RESULT_CACHE_MAX_MB', 64))
+RESULT_CACHE_IMAGES = os.environ.get('RESULT_CACHE_IMAGES', 'True').lower() == 'true'
+
+# Per-slot occupancy of every processed image is kept in a SQLite database
+# with minute/hour rollups; an empty HISTORY_DB disables it
+HISTORY_DB = os.environ.get('HISTORY_DB', 'history/occupancy.db')
+HISTORY_DEFAULT_DAYS = 7
+
+# Server-sent per-slot changes for GET /live/<lot_id>; under WSGI each
+# subscriber holds a server thread (asgi.py serves them as coroutines), and
+# one that falls LIVE_MAX_PENDING events behind is sent a fresh snapshot instead
+LIVE_MAX_SUBSCRIBERS = int(os.environ.get('LIVE_MAX_SUBSCRIBERS', 500))
+LIVE_MAX_PENDING = int(os.environ.get('LIVE_MAX_PENDING', 64))
+LIVE_KEEPALIVE = 15
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
@@ -23,12 +79,286 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # Paths
 MODEL_PATH = "models/yolov8n.pt"
-SLOTS_PATH = "data/UFPR04/slots.json"
 
-# Initialize components
-car_detector = CarDetector(MODEL_PATH)
-slots = load_slots(SLOTS_PATH)
-occupancy_detector = OccupancyDetector(slots)
+# One slots.json per lot / camera view under LAYOUTS_DIR/<lot_id>/;
+# compiled layouts are cached and reloaded when the file changes
+LAYOUTS_DIR = os.environ.get('LAYOUTS_DIR', 'data')
+DEFAULT_LOT_ID = os.environ.get('DEFAULT_LOT_ID', 'UFPR04')
+MAX_CACHED_LAYOUTS = int(os.environ.get('MAX_CACHED_LAYOUTS', 16))
+MAX_CACHED_SLOTS = int(os.environ.get('MAX_CACHED_SLOTS', 100000))
+
+# Initialize components; the detector (torch/ultralytics) loads lazily
+layouts = LayoutRegistry(
+    LAYOUTS_DIR,
+    max_layouts=MAX_CACHED_LAYOUTS,
+    max_slots=MAX_CACHED_SLOTS,
+    region_margin=ROI_MARGIN,
+    scoring={
+        'mode': app_config.OCCUPANCY_MODE,
+        'slot_threshold': app_config.OVERLAP_SLOT_THRESHOLD,
+        'box_threshold': app_config.OVERLAP_BOX_THRESHOLD,
+        'assign': app_config.OVERLAP_ASSIGN,
+    },
+    engine=app_config.OCCUPANCY_ENGINE,
+    lot_engines=app_config.OCCUPANCY_ENGINES,
+    profile_defaults=app_config.profile_defaults()
+)
+upload_store = AsyncUploadStore(UPLOAD_FOLDER)
+result_cache = ResultCache(
+    max_entries=RESULT_CACHE_SIZE,
+    max_bytes=RESULT_CACHE_MAX_MB * 1024 * 1024,
+    ttl=RESULT_CACHE_TTL
+)
+history = OccupancyHistory(HISTORY_DB) if HISTORY_DB else None
+live_feed = LiveFeed(max_pending=LIVE_MAX_PENDING, max_subscribers=LIVE_MAX_SUBSCRIBERS)
+
+
+# Request-level metrics; per-stage and model timings are recorded by
+# StageTimer and the src modules into the same registry
+REQUEST_SECONDS = REGISTRY.histogram(
+    'parking_request_seconds', 'Request latency by endpoint', ('endpoint',))
+REQUESTS = REGISTRY.counter(
+    'parking_requests_total', 'Requests by endpoint and status code', ('endpoint', 'status'))
+ERRORS = REGISTRY.counter(
+    'parking_errors_total', 'Requests that failed with an unexpected error', ('endpoint', 'type'))
+
+
+_car_detector = None
+_detector_lock = threading.Lock()
+_warmup_lock = threading.Lock()
+_warmup_thread = None
+_model_version = None
+warmup_error = None
+ready = threading.Event()
+
+
+def model_memory_bytes():
+    """Memory held by the loaded model, None before it is loaded"""
+    return _car_detector.memory_bytes() if _car_detector is not None else None
+
+
+def resident_memory_bytes():
+    """Current resident set size of this process"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # Peak rather than current where /proc is unavailable (KiB on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def get_detector():
+    """Return the car detector, importing and loading the model on first use"""
+    global _car_detector
+    
+    if _car_detector is None:
+        with _detector_lock:
+            if _car_detector is None:
+                from src.detect_cars import CarDetector
+                _car_detector = CarDetector(MODEL_PATH, backend=app_config.DETECTOR_BACKEND)
+    
+    return _car_detector
+
+
+def model_version():
+    """Identify the model weights and backend results were computed with"""
+    global _model_version
+    
+    if _model_version is None:
+        stat = os.stat(MODEL_PATH)
+        _model_version = f'{app_config.DETECTOR_BACKEND}:{stat.st_size}:{stat.st_mtime_ns}'
+    
+    return _model_version
+
+
+def warm_up():
+    """Load the model and run one dummy inference, then mark the app ready"""
+    global warmup_error
+    
+    try:
+        width, height = WARMUP_FRAME_SIZE
+        dummy = np.zeros((height, width, 3), dtype=np.uint8)
+        layout = layouts.get(DEFAULT_LOT_ID)
+        get_detector().detect(dummy, region=detect_region(layout), tile_size=TILE_SIZE,
+                              profile=layout.profile)
+        ready.set()
+    except Exception as e:
+        warmup_error = str(e)
+
+
+def start_warmup():
+    """Start warm-up on a background thread unless it already started"""
+    global _warmup_thread
+    
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=warm_up, daemon=True)
+            _warmup_thread.start()
+    
+    return _warmup_thread
+
+
+def detect_region(layout):
+    """Region detection is restricted to for a layout, None for the full frame"""
+    return layout.region if ROI_INFERENCE else None
+
+
+def request_layout():
+    """
+    Resolve the layout named by the request's lot_id parameter
+    
+    Returns:
+        Layout, or None if the lot is unknown
+    """
+    lot_id = request.values.get('lot_id', DEFAULT_LOT_ID)
+    
+    try:
+        return layouts.get(lot_id)
+    except KeyError:
+        return None
+
+
+def unknown_lot():
+    """Error response for an unknown lot_id"""
+    lot_id = secure_filename(request.values.get('lot_id', DEFAULT_LOT_ID))
+    return jsonify({'error': f'Unknown lot: {lot_id}'}), 404
+
+
+def cache_key(data, layout):
+    """Result cache key for an upload processed against a layout"""
+    return result_cache.key(data, layout.lot_id, layout.version, model_version())
+
+
+def cached_result(key, output):
+    """
+    Look up a previous result for the same upload
+    
+    Args:
+        key: Key from cache_key()
+        output: Requested output mode; 'image' needs a cached image
+    
+    Returns:
+        Tuple of (result dictionary, slot predictions), or (None, None) on
+        a miss
+    """
+    result = result_cache.get(key, require='image' if output == 'image' else None)
+    if result is None:
+        return None, None
+    
+    # Kept so a resubmitted snapshot still reaches history and live feeds
+    predictions = result.pop('predictions')
+    if output != 'image':
+        result.pop('image', None)
+    
+    return result, predictions
+
+
+def cache_result(key, result, predictions):
+    """Store a freshly computed result, dropping the image unless configured"""
+    entry = {k: v for k, v in result.items() if RESULT_CACHE_IMAGES or k != 'image'}
+    entry['predictions'] = dict(predictions)
+    
+    result_cache.put(key, entry)
+
+
+def parse_timestamp(value):
+    """
+    Epoch seconds from a request parameter
+    
+    Args:
+        value: Parameter string, or None / empty for no timestamp
+    
+    Returns:
+        Float timestamp, or None
+    
+    Raises:
+        ValueError: If the value is not a finite number
+    """
+    if not value:
+        return None
+    
+    timestamp = float(value)
+    if not math.isfinite(timestamp):
+        raise ValueError(f"Timestamp must be finite, got {value}")
+    return timestamp
+
+
+def observation_time():
+    """Capture time sent with the upload, defaulting to now"""
+    return parse_timestamp(request.values.get('timestamp'))
+
+
+def record_observation(lot_id, predictions, timestamp=None):
+    """Send per-slot occupancy to live subscribers and the history store"""
+    live_feed.publish(lot_id, predictions, timestamp)
+    if history is not None:
+        history.record(lot_id, predictions, timestamp)
+
+
+def job_result(car_boxes, lot_id):
+    """Turn pooled detections into the job's occupancy result"""
+    layout = layouts.get(lot_id)
+    predictions = layout.occupancy_detector.predict(car_boxes)
+    record_observation(lot_id, predictions)
+    return {'lot_id': lot_id, **summarize(predictions)}
+
+
+# Pool workers are spawned, and under `python app.py` each re-imports this
+# module as __mp_main__; only the serving process owns a pool and warms up
+MAIN_PROCESS = mp.parent_process() is None
+
+# Worker processes are spawned on the first job, not at import
+inference_pool = InferencePool(
+    MODEL_PATH,
+    num_workers=INFERENCE_WORKERS,
+    max_batch_size=MAX_BATCH_SIZE,
+    max_wait=MAX_BATCH_WAIT_MS / 1000,
+    on_result=job_result,
+    backend=app_config.DETECTOR_BACKEND
+) if MAIN_PROCESS else None
+
+
+REGISTRY.gauge('parking_job_queue_depth', 'Background jobs queued or running',
+               callback=lambda: inference_pool.queue_depth())
+REGISTRY.gauge('parking_upload_queue_depth', 'Uploads waiting to be written to disk',
+               callback=lambda: upload_store.pending())
+REGISTRY.gauge('parking_model_memory_bytes', 'Parameter memory of the loaded model',
+               callback=model_memory_bytes)
+REGISTRY.gauge('parking_process_resident_memory_bytes', 'Resident memory of the server process',
+               callback=resident_memory_bytes)
+REGISTRY.gauge('parking_ready', 'Whether the model is loaded and warmed up',
+               callback=lambda: int(ready.is_set()))
+REGISTRY.gauge('parking_layouts_cached', 'Compiled slot layouts in memory',
+               callback=lambda: layouts.stats()['cached'])
+REGISTRY.gauge('parking_history_queue_depth', 'Observations waiting to be written to history',
+               callback=lambda: history.pending() if history else None)
+REGISTRY.counter('parking_history_dropped_total', 'Observations dropped by the history store',
+                 callback=lambda: history.dropped if history else None)
+REGISTRY.gauge('parking_live_subscribers', 'Clients subscribed to live occupancy events',
+               callback=lambda: live_feed.subscriber_count())
+REGISTRY.counter('parking_live_events_dropped_total', 'Live events dropped for slow subscribers',
+                 callback=lambda: live_feed.dropped)
+REGISTRY.counter('parking_result_cache_hits_total', 'Result cache hits',
+                 callback=lambda: result_cache.hits)
+REGISTRY.counter('parking_result_cache_misses_total', 'Result cache misses',
+                 callback=lambda: result_cache.misses)
+REGISTRY.gauge('parking_result_cache_bytes', 'Approximate memory held by cached results',
+               callback=lambda: result_cache.size)
+
+
+@app.before_request
+def start_request_timer():
+    g.start = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    """Count every request and time it by endpoint"""
+    endpoint = request.endpoint or 'unknown'
+    if 'start' in g:
+        REQUEST_SECONDS.observe(time.perf_counter() - g.start, endpoint=endpoint)
+    REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    return response
 
 
 def allowed_file(filename):
@@ -36,10 +366,193 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def summarize(predictions):
+    """Build occupancy statistics from slot predictions"""
+    total_slots = len(predictions)
+    occupied_count = sum(predictions.values())
+    vacant_count = total_slots - occupied_count
+
+    return {
+        'total_slots': total_slots,
+        'occupied': occupied_count,
+        'vacant': vacant_count,
+        'occupancy_rate': round((occupied_count / total_slots) * 100, 1) if total_slots > 0 else 0
+    }
+
+
+def decode_image(data):
+    """Decode uploaded image bytes in memory"""
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if buf.size == 0:
+        return None
+    return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+
+def encode_image(img):
+    """Encode an image to JPEG bytes in memory"""
+    ok, buf = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    if not ok:
+        raise ValueError('Failed to encode image')
+    return buf.tobytes()
+
+
+def build_result(filename, data, img, layout, predictions, output, timer):
+    """
+    Build the response entry for one processed image
+    
+    Args:
+        filename: Original upload file name
+        data: Raw upload bytes
+        img: Decoded image
+        layout: Layout the predictions were made against
+        predictions: Dictionary mapping slot_id to occupancy status
+        output: 'image' to include the annotated JPEG, 'json' for stats only
+        timer: StageTimer of the request
+    
+    Returns:
+        Dictionary of response fields
+    """
+    result = {'lot_id': layout.lot_id, **summarize(predictions)}
+    encoded = None
+    
+    if output == 'image':
+        with timer.stage('render'):
+            annotated = layout.renderer.draw(img, predictions)
+        with timer.stage('encode'):
+            encoded = encode_image(annotated)
+            result['image'] = 'data:image/jpeg;base64,' + base64.b64encode(encoded).decode('ascii')
+    
+    if SAVE_UPLOADS:
+        name = secure_filename(filename)
+        if encoded is not None:
+            name = os.path.splitext(name)[0] + '.jpg'
+        with timer.stage('save'):
+            path = upload_store.save(name, encoded if encoded is not None else data)
+        if path is not None:
+            result['image_path'] = path
+    
+    return result
+
+
+def predict_occupancy(img, layout, timer):
+    """
+    Slot occupancy of one image with the lot's engine
+    
+    Args:
+        img: Decoded image
+        layout: Layout to score against
+        timer: StageTimer of the request
+    
+    Returns:
+        Dictionary mapping slot_id to occupancy status
+    """
+    # Classifier lots score slot crops and never need the detector
+    if layout.classifier is not None:
+        with timer.stage('classify'):
+            return layout.classifier.predict(img)
+    
+    # Detect cars
+    with timer.stage('detect'):
+        car_boxes = get_detector().detect(img, region=detect_region(layout), tile_size=TILE_SIZE,
+                                          profile=layout.profile)
+    
+    # Predict occupancy
+    with timer.stage('occupancy'):
+        return layout.occupancy_detector.predict(car_boxes)
+
+
+def detect_upload(filename, data, layout, output, timestamp, timer):
+    """
+    Run the /detect pipeline on one upload: cache, decode, detect, score
+    
+    Shared by the Flask route and the ASGI server (asgi.py), which runs it
+    in an executor.
+    
+    Args:
+        filename: Original upload file name
+        data: Raw upload bytes
+        layout: Layout to score against
+        output: 'image' or 'json'
+        timestamp: Capture time for the history, None for now
+        timer: StageTimer of the request
+    
+    Returns:
+        Tuple of (result, cache_hit); result is None if the upload is not
+        a readable image
+    """
+    # Resubmitted snapshots are answered without decoding or inference
+    with timer.stage('cache_lookup'):
+        key = cache_key(data, layout)
+        result, predictions = cached_result(key, output)
+    
+    if result is not None:
+        record_observation(layout.lot_id, predictions, timestamp)
+        return result, True
+    
+    # Decode straight from the request body
+    with timer.stage('decode'):
+        img = decode_image(data)
+    
+    if img is None:
+        return None, False
+    
+    predictions = predict_occupancy(img, layout, timer)
+    record_observation(layout.lot_id, predictions, timestamp)
+    
+    # Return results, rendering the annotated image only if requested
+    result = build_result(filename, data, img, layout, predictions, output, timer)
+    cache_result(key, result, predictions)
+    
+    return result, False
+
+
+def timing_breakdown(timer, start):
+    """Stage breakdown plus the total since start (perf_counter seconds)"""
+    return {**timer.breakdown(), 'total': round((time.perf_counter() - start) * 1000, 3)}
+
+
+def wants_timings():
+    """Whether the client asked for a per-stage timing breakdown"""
+    return request.values.get('timings', '').lower() in ('1', 'true', 'yes')
+
+
+def with_timings(payload, timer):
+    """Add the request's stage breakdown to a response payload if requested"""
+    if wants_timings():
+        payload['timings'] = timing_breakdown(timer, g.start)
+    return payload
+
+
+def processing_failed(error):
+    """Log an unexpected error, count it and build the 500 response"""
+    app.logger.exception('Request to %s failed', request.path)
+    ERRORS.inc(endpoint=request.endpoint or 'unknown', type=type(error).__name__)
+    return jsonify({'error': f'Processing failed: {str(error)}'}), 500
+
+
 @app.route("/", methods=["GET"])
 def index():
     """Render main page"""
-    return render_template("index.html")
+    return render_template("index.html", default_lot=DEFAULT_LOT_ID)
+
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({'status': 'ok'})
+
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    """Readiness: the model is loaded and warmed up"""
+    if ready.is_set():
+        return jsonify({'status': 'ready'})
+    
+    if warmup_error is not None:
+        return jsonify({'status': 'failed', 'error': warmup_error}), 503
+    
+    start_warmup()
+    return jsonify({'status': 'warming_up'}), 503
 
 
 @app.route("/detect", methods=["POST"])
@@ -58,46 +571,278 @@ def detect():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type. Allowed: png, jpg, jpeg'}), 400
         
-        # Save uploaded file
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        output = request.values.get('output', 'image')
+        if output not in OUTPUT_MODES:
+            return jsonify({'error': 'Invalid output. Allowed: json, image'}), 400
         
-        # Read image
-        img = cv2.imread(filepath)
+        layout = request_layout()
+        if layout is None:
+            return unknown_lot()
         
-        if img is None:
+        try:
+            timestamp = observation_time()
+        except ValueError:
+            return jsonify({'error': 'Invalid timestamp. Use epoch seconds'}), 400
+        
+        timer = StageTimer()
+        
+        with timer.stage('read'):
+            data = file.read()
+        
+        result, hit = detect_upload(file.filename, data, layout, output, timestamp, timer)
+        
+        if result is None:
             return jsonify({'error': 'Failed to read image'}), 400
         
-        # Detect cars
-        car_boxes = car_detector.detect(img)
+        response = jsonify(with_timings({'success': True, **result}, timer))
+        response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+    
+    except Exception as e:
+        return processing_failed(e)
+
+
+@app.route("/detect_batch", methods=["POST"])
+def detect_batch():
+    """Process several uploaded images with batched car detection"""
+    try:
+        files = request.files.getlist('images')
+        
+        if not files:
+            return jsonify({'error': 'No image files provided'}), 400
+        
+        if len(files) > MAX_BATCH_FILES:
+            return jsonify({'error': f'Too many files. Maximum is {MAX_BATCH_FILES}'}), 400
+        
+        for file in files:
+            if file.filename == '' or not allowed_file(file.filename):
+                return jsonify({'error': 'Invalid file type. Allowed: png, jpg, jpeg'}), 400
         
-        # Predict occupancy
-        predictions = occupancy_detector.predict(car_boxes)
+        output = request.values.get('output', 'json')
+        if output not in OUTPUT_MODES:
+            return jsonify({'error': 'Invalid output. Allowed: json, image'}), 400
         
-        # Calculate statistics
-        total_slots = len(predictions)
-        occupied_count = sum(predictions.values())
-        vacant_count = total_slots - occupied_count
+        layout = request_layout()
+        if layout is None:
+            return unknown_lot()
         
-        # Draw results on image
-        output_img = draw_results(img, slots, predictions)
+        try:
+            timestamp = observation_time()
+        except ValueError:
+            return jsonify({'error': 'Invalid timestamp. Use epoch seconds'}), 400
         
-        # Save processed image
-        cv2.imwrite(filepath, output_img)
+        # Answer repeated uploads from the cache and decode the rest
+        # before running the model once per batch
+        timer = StageTimer()
+        results = [None] * len(files)
+        pending = []
+        images = []
+        for i, file in enumerate(files):
+            with timer.stage('read'):
+                data = file.read()
+            with timer.stage('cache_lookup'):
+                key = cache_key(data, layout)
+                results[i], predictions = cached_result(key, output)
+            if results[i] is not None:
+                record_observation(layout.lot_id, predictions, timestamp)
+                continue
+            
+            with timer.stage('decode'):
+                img = decode_image(data)
+            if img is None:
+                return jsonify({'error': f'Failed to read image: {secure_filename(file.filename)}'}), 400
+            
+            pending.append((i, key, file.filename, data))
+            images.append(img)
         
-        # Return results
-        return jsonify({
+        # Detect cars in the images not found in the cache, or classify
+        # their slot crops on classifier lots
+        if layout.classifier is not None:
+            with timer.stage('classify'):
+                batch_predictions = [layout.classifier.predict(img) for img in images]
+        else:
+            with timer.stage('detect'):
+                batch_boxes = get_detector().detect_batch(images, batch_size=BATCH_SIZE,
+                                                        region=detect_region(layout),
+                                                        tile_size=TILE_SIZE,
+                                                        profile=layout.profile) if images else []
+            with timer.stage('occupancy'):
+                batch_predictions = [layout.occupancy_detector.predict(car_boxes) for car_boxes in batch_boxes]
+        
+        for (i, key, filename, data), img, predictions in zip(pending, images, batch_predictions):
+            record_observation(layout.lot_id, predictions, timestamp)
+            results[i] = build_result(filename, data, img, layout, predictions, output, timer)
+            cache_result(key, results[i], predictions)
+        
+        return jsonify(with_timings({
             'success': True,
-            'image_path': filepath,
-            'total_slots': total_slots,
-            'occupied': occupied_count,
-            'vacant': vacant_count,
-            'occupancy_rate': round((occupied_count / total_slots) * 100, 1) if total_slots > 0 else 0
-        })
+            'count': len(results),
+            'results': results
+        }, timer))
     
     except Exception as e:
-        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+        return processing_failed(e)
+
+
+@app.route("/jobs", methods=["POST"])
+def create_job():
+    """Queue an uploaded image for background detection"""
+    try:
+        if 'image' not in request.files:
+            return jsonify({'error': 'No image file provided'}), 400
+        
+        file = request.files['image']
+        
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+        
+        if not allowed_file(file.filename):
+            return jsonify({'error': 'Invalid file type. Allowed: png, jpg, jpeg'}), 400
+        
+        layout = request_layout()
+        if layout is None:
+            return unknown_lot()
+        
+        # The pool only runs the detector
+        if layout.classifier is not None:
+            return jsonify({'error': f'Lot {layout.lot_id} uses the classifier engine; use /detect'}), 400
+        
+        img = decode_image(file.read())
+        
+        if img is None:
+            return jsonify({'error': 'Failed to read image'}), 400
+        
+        # Workers load the exported model; create it once here rather than
+        # in each of them. The pytorch backend loads the weights directly
+        if app_config.DETECTOR_BACKEND != 'pytorch':
+            from src.detect_cars import export_model
+            with _detector_lock:
+                export_model(MODEL_PATH, app_config.DETECTOR_BACKEND)
+        job_id = inference_pool.submit(img, context=layout.lot_id, profile=layout.profile)
+        
+        return jsonify({'success': True, 'job_id': job_id, 'status': 'queued'}), 202
+    
+    except Exception as e:
+        return processing_failed(e)
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Return the status and result of a background detection job"""
+    job = inference_pool.get(job_id)
+    
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify({'job_id': job_id, **job})
+
+
+@app.route("/lots", methods=["GET"])
+def list_lots():
+    """List the lots that have a slot layout"""
+    lot_ids = layouts.discover()
+    return jsonify({
+        'default': DEFAULT_LOT_ID,
+        'lots': lot_ids,
+        'engines': {lot_id: layouts.engine_for(lot_id) for lot_id in lot_ids},
+        'cache': layouts.stats()
+    })
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus metrics in text exposition format"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route("/cache", methods=["GET"])
+def cache_stats():
+    """Result cache hit/miss counters"""
+    return jsonify(result_cache.stats())
+
+
+def history_range():
+    """
+    Time range of a history query from start/end or days parameters
+    
+    Returns:
+        Tuple of (start, end) epoch seconds
+    
+    Raises:
+        ValueError: If a parameter is not a finite number or the range is empty
+    """
+    end = parse_timestamp(request.args.get('end'))
+    if end is None:
+        end = time.time()
+    
+    start = parse_timestamp(request.args.get('start'))
+    if start is None:
+        days = float(request.args.get('days', HISTORY_DEFAULT_DAYS))
+        if not math.isfinite(days):
+            raise ValueError(f"days must be finite, got {days}")
+        start = end - days * 86400
+    
+    if start >= end:
+        raise ValueError('start must be before end')
+    return start, end
+
+
+def history_query(name, lot_id, **kwargs):
+    """Run an OccupancyHistory query over the request's time range"""
+    if history is None:
+        return jsonify({'error': 'History is disabled'}), 404
+    
+    try:
+        start, end = history_range()
+    except ValueError:
+        return jsonify({'error': 'Invalid range. Use start/end epoch seconds or days'}), 400
+    
+    return jsonify(getattr(history, name)(lot_id, start, end, **kwargs))
+
+
+@app.route("/live/<lot_id>", methods=["GET"])
+def live(lot_id):
+    """Stream a lot's per-slot occupancy changes as server-sent events"""
+    if lot_id not in layouts.lot_ids() and lot_id not in layouts.discover():
+        return jsonify({'error': f'Unknown lot: {secure_filename(lot_id)}'}), 404
+    
+    subscription = live_feed.subscribe(lot_id)
+    if subscription is None:
+        return jsonify({'error': 'Too many live subscribers'}), 503
+    
+    def events():
+        try:
+            while True:
+                event = subscription.get(timeout=LIVE_KEEPALIVE)
+                # Comment lines keep idle connections open through proxies
+                yield event if event is not None else b': keepalive\n\n'
+        finally:
+            live_feed.unsubscribe(subscription)
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route("/history/<lot_id>", methods=["GET"])
+def history_occupancy(lot_id):
+    """Lot occupancy over time from the minute/hour rollups"""
+    resolution = request.args.get('resolution', 'hour')
+    if resolution not in RESOLUTIONS:
+        return jsonify({'error': f"Invalid resolution. Allowed: {', '.join(RESOLUTIONS)}"}), 400
+    
+    return history_query('occupancy', lot_id, resolution=resolution)
+
+
+@app.route("/history/<lot_id>/slots", methods=["GET"])
+def history_slots(lot_id):
+    """Per-slot occupancy rate over a time range"""
+    return history_query('slot_occupancy', lot_id)
+
+
+@app.route("/history/<lot_id>/dwell", methods=["GET"])
+def history_dwell(lot_id):
+    """How long cars stayed in each slot over a time range"""
+    return history_query('dwell', lot_id)
 
 
 @app.errorhandler(413)
@@ -106,5 +851,9 @@ def request_entity_too_large(error):
     return jsonify({'error': 'File too large. Maximum size is 16MB'}), 413
 
 
+if WARMUP_ON_START and MAIN_PROCESS:
+    start_warmup()
+
+
 if __name__ == "__main__":
     app.run(debug=True, host='0.0.0.0', port=5000)
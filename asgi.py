@@ -0,0 +1,422 @@
+"""
+ASGI server for the Smart Parking System
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+POST /detect is served natively with the same contract as app.py: the
+multipart upload is parsed as it streams in, so a slow client holds a
+coroutine rather than a thread, and the CPU-bound pipeline (cache lookup,
+decode, detection, occupancy, render, encode) runs in a thread pool.
+GET /live/<lot_id> is also served natively: each subscriber is a coroutine
+awaiting its feed queue, so open streams hold no threads. Every other route
+is handed to the Flask app through a WSGI bridge on its own thread pool.
+"""
+import asyncio
+import functools
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+import app as server
+from src.metrics import StageTimer
+
+# Threads running the detection pipeline; requests beyond
+# ASYNC_MAX_PENDING queued or running are turned away with 503
+ASYNC_WORKERS = int(os.environ.get('ASYNC_WORKERS', os.cpu_count() or 1))
+ASYNC_MAX_PENDING = int(os.environ.get('ASYNC_MAX_PENDING', 64))
+
+# Threads serving the remaining Flask routes
+BRIDGE_WORKERS = int(os.environ.get('BRIDGE_WORKERS', 64))
+
+executor = ThreadPoolExecutor(ASYNC_WORKERS, thread_name_prefix='detect')
+bridge_executor = ThreadPoolExecutor(BRIDGE_WORKERS, thread_name_prefix='wsgi')
+
+_pending = 0
+
+server.REGISTRY.gauge('parking_async_pending', 'Detections queued or running in the ASGI executor',
+                      callback=lambda: _pending)
+
+
+class UploadTooLarge(Exception):
+    """Request body exceeds MAX_FILE_SIZE"""
+
+
+class ClientDisconnected(Exception):
+    """Client went away before the request body was complete"""
+
+
+class InvalidTimestamp(Exception):
+    """Observation timestamp is not finite epoch seconds"""
+
+
+async def read_form(receive, content_type, limit):
+    """
+    Parse a multipart/form-data body as it arrives
+
+    Args:
+        receive: ASGI receive callable
+        content_type: Request Content-Type header
+        limit: Maximum body size in bytes
+
+    Returns:
+        Tuple of (fields, files): field name to value, and file field name
+        to (filename, bytes); the first part wins for repeated names
+
+    Raises:
+        UploadTooLarge: If the body grows beyond limit
+        ClientDisconnected: If the client disconnects mid-upload
+    """
+    mimetype, options = parse_options_header(content_type)
+    fields, files = {}, {}
+    if mimetype != 'multipart/form-data' or 'boundary' not in options:
+        return fields, files
+
+    decoder = MultipartDecoder(options['boundary'].encode('latin-1'))
+    part = None
+    buffer = bytearray()
+    received = 0
+    more_body = True
+
+    while True:
+        event = decoder.next_event()
+
+        if isinstance(event, NeedData):
+            if not more_body:
+                # Truncated body; keep what was complete
+                break
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                raise ClientDisconnected()
+
+            chunk = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            received += len(chunk)
+            if received > limit:
+                raise UploadTooLarge()
+
+            decoder.receive_data(chunk)
+            if not more_body:
+                decoder.receive_data(None)
+
+        elif isinstance(event, (Field, File)):
+            part = event
+            buffer = bytearray()
+
+        elif isinstance(event, Data):
+            buffer += event.data
+            if not event.more_data:
+                if isinstance(part, File):
+                    files.setdefault(part.name, (part.filename or '', bytes(buffer)))
+                else:
+                    fields.setdefault(part.name, buffer.decode('utf-8', 'replace'))
+
+        elif isinstance(event, Epilogue):
+            break
+
+    return fields, files
+
+
+def json_body(payload):
+    """Encode a payload the way Flask's jsonify does"""
+    return (json.dumps(payload, separators=(',', ':'), sort_keys=True) + '\n').encode()
+
+
+async def send_json(send, status, payload, headers=()):
+    """Send a complete JSON response"""
+    body = json_body(payload)
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            *headers,
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def process(lot_id, filename, data, output, timestamp, timer):
+    """
+    Layout lookup and the /detect pipeline, run in the executor
+
+    The lot is resolved before the timestamp is parsed, so an unknown lot
+    answers 404 whatever the timestamp, as in the Flask app.
+
+    Raises:
+        InvalidTimestamp: If the lot exists and timestamp is invalid
+    """
+    try:
+        layout = server.layouts.get(lot_id)
+    except KeyError:
+        return None, None, None
+
+    try:
+        timestamp = server.parse_timestamp(timestamp)
+    except ValueError:
+        raise InvalidTimestamp()
+
+    result, hit = server.detect_upload(filename, data, layout, output, timestamp, timer)
+    return layout, result, hit
+
+
+async def detect(scope, receive, send):
+    """POST /detect with uploads streamed and the pipeline offloaded"""
+    global _pending
+
+    start = time.perf_counter()
+    timer = StageTimer()
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+
+    length = headers.get('content-length')
+    if length and length.isdigit() and int(length) > server.MAX_FILE_SIZE:
+        return await send_json(send, 413, {'error': 'File too large. Maximum size is 16MB'})
+
+    try:
+        fields, files = await read_form(receive, headers.get('content-type', ''), server.MAX_FILE_SIZE)
+    except UploadTooLarge:
+        return await send_json(send, 413, {'error': 'File too large. Maximum size is 16MB'})
+    except ClientDisconnected:
+        return
+    timer.record('read', time.perf_counter() - start)
+
+    # Query parameters take precedence over form fields, as in Flask's request.values
+    values = {**fields, **dict(parse_qsl(scope['query_string'].decode('latin-1')))}
+
+    if 'image' not in files:
+        return await send_json(send, 400, {'error': 'No image file provided'})
+
+    filename, data = files['image']
+
+    if filename == '':
+        return await send_json(send, 400, {'error': 'No file selected'})
+
+    if not server.allowed_file(filename):
+        return await send_json(send, 400, {'error': 'Invalid file type. Allowed: png, jpg, jpeg'})
+
+    output = values.get('output', 'image')
+    if output not in server.OUTPUT_MODES:
+        return await send_json(send, 400, {'error': 'Invalid output. Allowed: json, image'})
+
+    if _pending >= ASYNC_MAX_PENDING:
+        return await send_json(send, 503, {'error': 'Server busy, retry later'}, [(b'retry-after', b'1')])
+
+    lot_id = values.get('lot_id', server.DEFAULT_LOT_ID)
+    loop = asyncio.get_running_loop()
+    _pending += 1
+    try:
+        layout, result, hit = await loop.run_in_executor(
+            executor, process, lot_id, filename, data, output, values.get('timestamp'), timer)
+    except InvalidTimestamp:
+        return await send_json(send, 400, {'error': 'Invalid timestamp. Use epoch seconds'})
+    except Exception as e:
+        server.app.logger.exception('Request to %s failed', scope['path'])
+        server.ERRORS.inc(endpoint='detect', type=type(e).__name__)
+        return await send_json(send, 500, {'error': f'Processing failed: {str(e)}'})
+    finally:
+        _pending -= 1
+
+    if layout is None:
+        return await send_json(send, 404, {'error': f'Unknown lot: {server.secure_filename(lot_id)}'})
+
+    if result is None:
+        return await send_json(send, 400, {'error': 'Failed to read image'})
+
+    payload = {'success': True, **result}
+    if values.get('timings', '').lower() in ('1', 'true', 'yes'):
+        payload['timings'] = server.timing_breakdown(timer, start)
+
+    await send_json(send, 200, payload, [(b'x-cache', b'HIT' if hit else b'MISS')])
+
+
+async def wait_disconnect(receive):
+    """Return once the client has gone away"""
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def live(scope, receive, send, lot_id):
+    """GET /live/<lot_id> with the subscriber awaited on the event loop"""
+    layouts = server.layouts
+    if lot_id not in layouts.lot_ids() and lot_id not in layouts.discover():
+        return await send_json(send, 404, {'error': f'Unknown lot: {server.secure_filename(lot_id)}'})
+
+    # The publisher wakes this coroutine from its own thread
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+    subscription = server.live_feed.subscribe(lot_id, notify=lambda: loop.call_soon_threadsafe(ready.set))
+    if subscription is None:
+        return await send_json(send, 503, {'error': 'Too many live subscribers'})
+
+    async def stream():
+        while True:
+            # Cleared before reading, so an event pushed after the read
+            # sets it again and is not missed
+            ready.clear()
+            event = subscription.get(timeout=0)
+            if event is None:
+                try:
+                    await asyncio.wait_for(ready.wait(), server.LIVE_KEEPALIVE)
+                    continue
+                except asyncio.TimeoutError:
+                    # Comment lines keep idle connections open through proxies
+                    event = b': keepalive\n\n'
+            await send({'type': 'http.response.body', 'body': event, 'more_body': True})
+
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        tasks = {asyncio.create_task(stream()), asyncio.create_task(wait_disconnect(receive))}
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for task in done:
+            task.result()
+    finally:
+        server.live_feed.unsubscribe(subscription)
+
+
+def wsgi_environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope with a fully read body"""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = 'HTTP_' + name
+            environ[key] = environ[key] + ',' + value if key in environ else value
+
+    return environ
+
+
+async def wsgi_bridge(scope, receive, send):
+    """Serve a request with the Flask app on the bridge thread pool"""
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+        body += message.get('body', b'')
+        if len(body) > server.MAX_FILE_SIZE:
+            return await send_json(send, 413, {'error': 'File too large. Maximum size is 16MB'})
+        if not message.get('more_body', False):
+            break
+
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+    loop = asyncio.get_running_loop()
+    iterable = await loop.run_in_executor(bridge_executor, server.app, wsgi_environ(scope, bytes(body)), start_response)
+
+    # Streamed responses end when the client goes away
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        await wait_disconnect(receive)
+        disconnected.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+        chunks = iter(iterable)
+        while not disconnected.is_set():
+            chunk = await loop.run_in_executor(bridge_executor, next, chunks, None)
+            if chunk is None:
+                break
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        if not disconnected.is_set():
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        watcher.cancel()
+        if hasattr(iterable, 'close'):
+            await loop.run_in_executor(bridge_executor, iterable.close)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            executor.shutdown(wait=False)
+            bridge_executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI application"""
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    if scope['type'] != 'http':
+        return
+
+    path, method = scope['path'], scope['method']
+    lot_id = path[len('/live/'):]
+    if path == '/detect' and method == 'POST':
+        endpoint, handler = 'detect', detect
+    elif path.startswith('/live/') and lot_id and '/' not in lot_id and method == 'GET':
+        endpoint, handler = 'live', functools.partial(live, lot_id=lot_id)
+    else:
+        return await wsgi_bridge(scope, receive, send)
+
+    # Same request metrics as the Flask routes record in after_request,
+    # where a stream is timed until its response starts
+    start = time.perf_counter()
+    status = {}
+
+    async def send_recorded(message):
+        if message['type'] == 'http.response.start':
+            status['code'] = message['status']
+            status['seconds'] = time.perf_counter() - start
+        await send(message)
+
+    try:
+        await handler(scope, receive, send_recorded)
+    finally:
+        server.REQUEST_SECONDS.observe(status.get('seconds', time.perf_counter() - start), endpoint=endpoint)
+        if 'code' in status:
+            server.REQUESTS.inc(endpoint=endpoint, status=status['code'])
@@ -3,6 +3,18 @@ Configuration settings for Smart Parking System
 """
 import os
 
+from src.engines import ENGINES
+from src.profiles import PROFILE_DEFAULTS
+
+
+def parse_engines(value):
+    """Per-lot occupancy engines from a value like 'lot_a=classifier, lot_b=detector'"""
+    return {
+        lot_id.strip(): engine.strip()
+        for lot_id, engine in (item.split('=', 1) for item in value.split(',') if '=' in item)
+    }
+
+
 class Config:
     """Base configuration"""
     
@@ -18,9 +30,53 @@ class Config:
     MODEL_PATH = 'models/yolov8n.pt'
     SLOTS_PATH = 'data/UFPR04/slots.json'
     
-    # Detection settings
-    CONFIDENCE_THRESHOLD = 0.5
-    IOU_THRESHOLD = 0.45
+    # Detection settings: the default inference profile of every lot. A
+    # lot's profile.json (next to its slots file) overrides any of them,
+    # e.g. {"imgsz": 416} from tools/tune_input_size.py. DETECT_CLASSES
+    # lists the vehicles that occupy a slot: car, motorcycle, bus, truck
+    CONFIDENCE_THRESHOLD = float(os.environ.get('CONFIDENCE_THRESHOLD', PROFILE_DEFAULTS['conf']))
+    IOU_THRESHOLD = float(os.environ.get('IOU_THRESHOLD', PROFILE_DEFAULTS['iou']))
+    INPUT_SIZE = int(os.environ.get('INPUT_SIZE', PROFILE_DEFAULTS['imgsz']))
+    MAX_DETECTIONS = int(os.environ.get('MAX_DETECTIONS', PROFILE_DEFAULTS['max_det']))
+    DETECT_CLASSES = os.environ.get('DETECT_CLASSES', PROFILE_DEFAULTS['classes'])
+    
+    # Occupancy scoring: 'any' marks a slot occupied if any box touches it;
+    # 'overlap' needs a box covering OVERLAP_SLOT_THRESHOLD of the slot with
+    # OVERLAP_BOX_THRESHOLD of the box inside it, each box filling at most
+    # one slot when OVERLAP_ASSIGN is set
+    OCCUPANCY_MODE = os.environ.get('OCCUPANCY_MODE', 'any')
+    OVERLAP_SLOT_THRESHOLD = float(os.environ.get('OVERLAP_SLOT_THRESHOLD', 0.3))
+    OVERLAP_BOX_THRESHOLD = float(os.environ.get('OVERLAP_BOX_THRESHOLD', 0.0))
+    OVERLAP_ASSIGN = os.environ.get('OVERLAP_ASSIGN', 'True').lower() == 'true'
+    
+    # Occupancy engine: 'detector' runs car detection and scores the boxes;
+    # 'classifier' classifies each slot's warped crop with the lot's
+    # classifier.npz (tools/train_slot_classifier.py), without the detector.
+    # OCCUPANCY_ENGINES overrides it per lot, e.g. "lot_a=classifier,lot_b=detector"
+    OCCUPANCY_ENGINE = os.environ.get('OCCUPANCY_ENGINE', 'detector')
+    OCCUPANCY_ENGINES = parse_engines(os.environ.get('OCCUPANCY_ENGINES', ''))
+    
+    # Inference backend: pytorch, torchscript, onnx, openvino or onnx-int8.
+    # Non-pytorch backends are exported from MODEL_PATH on first use.
+    DETECTOR_BACKEND = os.environ.get('DETECTOR_BACKEND', 'pytorch')
+    
+    @classmethod
+    def profile_defaults(cls):
+        """Default InferenceProfile settings of every lot"""
+        return {
+            'imgsz': cls.INPUT_SIZE,
+            'conf': cls.CONFIDENCE_THRESHOLD,
+            'iou': cls.IOU_THRESHOLD,
+            'max_det': cls.MAX_DETECTIONS,
+            'classes': cls.DETECT_CLASSES,
+        }
+    
+    @classmethod
+    def validate(cls):
+        """Check settings that must be provided or come from a fixed set"""
+        for engine in (cls.OCCUPANCY_ENGINE, *cls.OCCUPANCY_ENGINES.values()):
+            if engine not in ENGINES:
+                raise ValueError(f"Unknown occupancy engine '{engine}'. Choose from: {', '.join(ENGINES)}")
 
 
 class DevelopmentConfig(Config):
@@ -33,8 +89,12 @@ class ProductionConfig(Config):
     DEBUG = False
     SECRET_KEY = os.environ.get('SECRET_KEY')
     
-    if not SECRET_KEY:
-        raise ValueError("SECRET_KEY environment variable must be set in production")
+    @classmethod
+    def validate(cls):
+        """Check settings that must be provided in production"""
+        super().validate()
+        if not cls.SECRET_KEY:
+            raise ValueError("SECRET_KEY environment variable must be set in production")
 
 
 # Configuration dictionary
@@ -1,16 +1,24 @@
 """
 Entry point for running the Smart Parking System application
+
+Set SERVER=asgi to serve through asgi.py with uvicorn (pip install uvicorn)
+instead of the Flask development server.
 """
 import os
-from app import app
 
 if __name__ == "__main__":
     # Get configuration from environment variables
     host = os.environ.get('HOST', '0.0.0.0')
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('DEBUG', 'True').lower() == 'true'
-    
+    server = os.environ.get('SERVER', 'flask').lower()
+
     print(f"Starting Smart Parking System on {host}:{port}")
-    print(f"Debug mode: {debug}")
-    
-    app.run(host=host, port=port, debug=debug)
+    print(f"Server: {server}, debug mode: {debug}")
+
+    if server == 'asgi':
+        import uvicorn
+        uvicorn.run('asgi:app', host=host, port=port, log_level='debug' if debug else 'info')
+    else:
+        from app import app
+        app.run(host=host, port=port, debug=debug)
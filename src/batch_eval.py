@@ -0,0 +1,380 @@
+import argparse
+import csv
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+# UFPR images are named after their capture time, e.g. 2012-12-07_16_42_25.jpg
+TIMESTAMP_FORMAT = "%Y-%m-%d_%H_%M_%S"
+
+SUMMARY_FIELDS = ['image', 'captured_at', 'total_slots', 'occupied', 'vacant',
+                  'occupancy_rate', 'error']
+
+
+def iter_images(images_dir):
+    """
+    Yield image paths under a directory in a stable order
+
+    Args:
+        images_dir: Directory searched recursively
+
+    Yields:
+        Paths relative to images_dir, as strings with forward slashes
+    """
+    for root, dirs, files in os.walk(images_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                path = os.path.join(root, name)
+                yield Path(os.path.relpath(path, images_dir)).as_posix()
+
+
+def captured_at(path):
+    """Capture time parsed from a UFPR-style file name, or '' if unknown"""
+    try:
+        return datetime.strptime(Path(path).stem, TIMESTAMP_FORMAT).isoformat()
+    except ValueError:
+        return ''
+
+
+def _init_decoder():
+    # Parallelism comes from the worker processes
+    cv2.setNumThreads(1)
+
+
+def _decode(path):
+    """Decode one image in a worker process"""
+    return cv2.imread(path)
+
+
+class CsvResultWriter:
+    """Append per-image rows to a CSV file, resuming from what it holds"""
+
+    def __init__(self, path, slot_ids):
+        """
+        Open or create the output file
+
+        Args:
+            path: CSV file path
+            slot_ids: Slot ids, one 0/1 column each
+        """
+        self.path = path
+        self.fields = SUMMARY_FIELDS + [f'slot_{slot_id}' for slot_id in slot_ids]
+        self.done = set()
+
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            self._truncate_partial_line()
+            with open(path, newline='') as f:
+                reader = csv.DictReader(f)
+                if reader.fieldnames != self.fields:
+                    raise ValueError(f"{path} was written for a different slot layout")
+                self.done = {row['image'] for row in reader}
+
+        self._file = open(path, 'a', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fields)
+        if not exists:
+            self._writer.writeheader()
+
+    def write(self, rows):
+        """Append rows and flush them to disk"""
+        self._writer.writerows(rows)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+    def _truncate_partial_line(self):
+        """Drop a row cut short by an interrupted run"""
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            end = data.rfind(b'\n') + 1
+            if end < len(data):
+                f.truncate(end)
+
+
+class ParquetResultWriter:
+    """Write per-image rows as numbered Parquet part files in a directory"""
+
+    def __init__(self, path, slot_ids, rows_per_part=5000):
+        """
+        Open or create the output directory
+
+        Args:
+            path: Directory receiving part-NNNNN.parquet files
+            slot_ids: Slot ids, one 0/1 column each
+            rows_per_part: Rows buffered before a part file is written
+        """
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self.fields = SUMMARY_FIELDS + [f'slot_{slot_id}' for slot_id in slot_ids]
+        self.rows_per_part = rows_per_part
+        self.done = set()
+        self._rows = []
+
+        os.makedirs(path, exist_ok=True)
+        self._parts = sorted(Path(path).glob('part-*.parquet'))
+        for part in self._parts:
+            table = pq.read_table(part)
+            if table.column_names != self.fields:
+                raise ValueError(f"{part} was written for a different slot layout")
+            self.done.update(table.column('image').to_pylist())
+
+    def write(self, rows):
+        """Buffer rows, writing a part file once enough have arrived"""
+        self._rows.extend(rows)
+        if len(self._rows) >= self.rows_per_part:
+            self._flush()
+
+    def close(self):
+        self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self._rows:
+            return
+
+        table = pa.Table.from_pylist(self._rows, schema=pa.schema(
+            [(name, pa.string()) for name in SUMMARY_FIELDS[:2]] +
+            [(name, pa.int32()) for name in SUMMARY_FIELDS[2:5]] +
+            [('occupancy_rate', pa.float32()), ('error', pa.string())] +
+            [(name, pa.int8()) for name in self.fields[len(SUMMARY_FIELDS):]]
+        ))
+
+        # Write then rename so a killed run never leaves a half-written part
+        part = Path(self.path) / f"part-{len(self._parts):05d}.parquet"
+        tmp = part.with_suffix('.tmp')
+        pq.write_table(table, tmp)
+        os.replace(tmp, part)
+
+        self._parts.append(part)
+        self._rows = []
+
+
+def open_writer(path, slot_ids, fmt=None):
+    """
+    Open a result writer, picking the format from the path if not given
+
+    Args:
+        path: Output CSV file or Parquet directory
+        slot_ids: Slot ids of the layout being evaluated
+        fmt: 'csv' or 'parquet'; defaults to parquet for a .parquet path
+
+    Returns:
+        CsvResultWriter or ParquetResultWriter
+    """
+    fmt = fmt or ('parquet' if str(path).endswith('.parquet') else 'csv')
+    if fmt == 'parquet':
+        return ParquetResultWriter(path, slot_ids)
+    return CsvResultWriter(path, slot_ids)
+
+
+class BatchEvaluator:
+    """Occupancy for every image in a directory: pooled decode, batched detection"""
+
+    def __init__(self, detector, occupancy_detector, workers=2, batch_size=8,
+                 region=None, tile_size=None, history=None, lot_id=None):
+        """
+        Initialize batch evaluator
+
+        Args:
+            detector: CarDetector (or anything with detect_batch)
+            occupancy_detector: OccupancyDetector for the images' layout
+            workers: Decoder processes, 0 to decode in this process
+            batch_size: Images per detection call
+            region: Optional crop (x1, y1, x2, y2) passed to the detector
+            tile_size: Optional tile size passed to the detector
+            history: Optional OccupancyHistory fed with each image's slots,
+                timestamped by the capture time in its file name
+            lot_id: Lot id recorded in the history
+        """
+        self.detector = detector
+        self.occupancy_detector = occupancy_detector
+        self.workers = workers
+        self.batch_size = batch_size
+        self.region = region
+        self.tile_size = tile_size
+        self.history = history
+        self.lot_id = lot_id
+
+    def run(self, images_dir, writer, limit=None, on_progress=None):
+        """
+        Evaluate every image not already in the writer's output
+
+        Args:
+            images_dir: Directory of images
+            writer: Result writer from open_writer()
+            limit: Optional maximum number of new images to process
+            on_progress: Optional callable(stats) called after each batch
+
+        Returns:
+            Dictionary of run statistics
+        """
+        pending = (p for p in iter_images(images_dir) if p not in writer.done)
+        if limit is not None:
+            pending = (p for i, p in zip(range(limit), pending))
+
+        stats = {'processed': 0, 'failed': 0, 'skipped': len(writer.done)}
+        batch = []
+        start = time.perf_counter()
+
+        for path, img in self._decoded(images_dir, pending):
+            batch.append((path, img))
+            if len(batch) == self.batch_size:
+                self._process(batch, writer, stats)
+                batch = []
+                if on_progress:
+                    on_progress(self._rates(stats, start))
+
+        if batch:
+            self._process(batch, writer, stats)
+        writer.close()
+
+        return self._rates(stats, start)
+
+    def _decoded(self, images_dir, paths):
+        """Decode images in order, keeping a bounded number in flight"""
+        if self.workers <= 0:
+            for path in paths:
+                yield path, _decode(os.path.join(images_dir, path))
+            return
+
+        ctx = mp.get_context("spawn")
+        in_flight = deque()
+        max_in_flight = self.workers * self.batch_size * 2
+
+        with ctx.Pool(self.workers, initializer=_init_decoder) as pool:
+            for path in paths:
+                in_flight.append((path, pool.apply_async(_decode, (os.path.join(images_dir, path),))))
+                if len(in_flight) >= max_in_flight:
+                    path, result = in_flight.popleft()
+                    yield path, result.get()
+
+            while in_flight:
+                path, result = in_flight.popleft()
+                yield path, result.get()
+
+    def _process(self, batch, writer, stats):
+        """Detect, score and write one batch"""
+        decoded = [(path, img) for path, img in batch if img is not None]
+        batch_boxes = self.detector.detect_batch(
+            [img for _, img in decoded], batch_size=self.batch_size,
+            region=self.region, tile_size=self.tile_size
+        ) if decoded else []
+        boxes_by_path = {path: boxes for (path, _), boxes in zip(decoded, batch_boxes)}
+
+        rows = []
+        for path, img in batch:
+            row = {'image': path, 'captured_at': captured_at(path)}
+
+            if img is None:
+                row['error'] = 'Failed to read image'
+                stats['failed'] += 1
+            else:
+                predictions = self.occupancy_detector.predict(boxes_by_path[path])
+                occupied = sum(predictions.values())
+                row.update(
+                    total_slots=len(predictions),
+                    occupied=occupied,
+                    vacant=len(predictions) - occupied,
+                    occupancy_rate=round(100 * occupied / len(predictions), 1) if predictions else 0,
+                    error='',
+                    **{f'slot_{slot_id}': int(flag) for slot_id, flag in predictions.items()}
+                )
+                stats['processed'] += 1
+
+                if self.history is not None and row['captured_at']:
+                    timestamp = datetime.fromisoformat(row['captured_at']).timestamp()
+                    self.history.record(self.lot_id, predictions, timestamp)
+
+            rows.append(row)
+
+        writer.write(rows)
+
+    @staticmethod
+    def _rates(stats, start):
+        elapsed = time.perf_counter() - start
+        done = stats['processed'] + stats['failed']
+        return {
+            **stats,
+            'seconds': round(elapsed, 3),
+            'images_per_sec': round(done / elapsed, 2) if elapsed else 0,
+        }
+
+
+def main():
+    from .detect_cars import CarDetector
+    from .occupancy import OccupancyDetector
+    from .slot_utils import load_slots
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(description="Compute occupancy for every image in a directory")
+    parser.add_argument("images", help="Directory of images, searched recursively")
+    parser.add_argument("--output", required=True,
+                        help="CSV file, or a .parquet directory (needs pyarrow); "
+                             "images already in it are skipped")
+    parser.add_argument("--format", choices=["csv", "parquet"], default=None)
+    parser.add_argument("--model", default=os.path.join(base_dir, "models", "yolov8n.pt"))
+    parser.add_argument("--backend", default="pytorch")
+    parser.add_argument("--slots", default=os.path.join(base_dir, "data", "UFPR04", "slots.json"))
+    parser.add_argument("--workers", type=int, default=min(4, (os.cpu_count() or 1) - 1),
+                        help="Decoder processes, 0 to decode inline (leave a core for detection)")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=None, help="Process at most this many new images")
+    parser.add_argument("--history", default=None,
+                        help="Also record per-slot occupancy in this history database")
+    parser.add_argument("--lot-id", default="UFPR04", help="Lot id used in the history database")
+    args = parser.parse_args()
+
+    slots = load_slots(args.slots)
+    occupancy_detector = OccupancyDetector(slots)
+    writer = open_writer(args.output, occupancy_detector.geometry.slot_ids, args.format)
+
+    history = None
+    if args.history:
+        from .history import OccupancyHistory
+        history = OccupancyHistory(args.history)
+
+    evaluator = BatchEvaluator(
+        CarDetector(args.model, backend=args.backend),
+        occupancy_detector,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        history=history,
+        lot_id=args.lot_id,
+    )
+
+    def progress(stats):
+        done = stats['processed'] + stats['failed']
+        if done % (args.batch_size * 25) == 0:
+            print(f"{done} images, {stats['images_per_sec']} images/sec")
+
+    try:
+        stats = evaluator.run(args.images, writer, limit=args.limit, on_progress=progress)
+    except KeyboardInterrupt:
+        writer.close()
+        print("Interrupted; rerun the same command to resume")
+        return
+    finally:
+        if history is not None:
+            history.flush()
+
+    print(f"Processed {stats['processed']} images ({stats['failed']} failed, "
+          f"{stats['skipped']} already done) in {stats['seconds']}s: "
+          f"{stats['images_per_sec']} images/sec")
+
+
+if __name__ == "__main__":
+    main()
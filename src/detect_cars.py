@@ -1,7 +1,11 @@
 import os
+import numpy as np
 import torch
 from ultralytics import YOLO
 
+from .metrics import REGISTRY
+from .profiles import InferenceProfile
+
 # Monkey patch torch.load to use weights_only=False for compatibility
 _original_torch_load = torch.load
 
@@ -13,38 +17,343 @@ def _patched_torch_load(f, *args, **kwargs):
 
 torch.load = _patched_torch_load
 
+# Export format and whether the exported model accepts any batch size and
+# input size
+BACKENDS = {
+    'pytorch': (None, True),
+    'torchscript': ('torchscript', False),
+    'onnx': ('onnx', True),
+    'openvino': ('openvino', True),
+    'onnx-int8': ('onnx', True),
+}
+
+MODEL_SECONDS = REGISTRY.histogram(
+    'parking_model_seconds', 'YOLO time per image by phase', ('phase',))
+CARS_DETECTED = REGISTRY.counter(
+    'parking_cars_detected_total', 'Vehicle boxes returned by the model before tile merging')
+
+# Input size baked into static exports
+EXPORT_IMGSZ = 640
+
+
+def exported_model_path(model_path, backend):
+    """
+    Location ultralytics writes an exported model to
+
+    Args:
+        model_path: Path to the YOLOv8 .pt weights
+        backend: One of BACKENDS
+
+    Returns:
+        Path of the exported file or directory
+    """
+    stem = os.path.splitext(model_path)[0]
+    return {
+        'pytorch': model_path,
+        'torchscript': stem + '.torchscript',
+        'onnx': stem + '.onnx',
+        'openvino': stem + '_openvino_model',
+        'onnx-int8': stem + '_int8.onnx',
+    }[backend]
+
+
+def export_model(model_path, backend, imgsz=EXPORT_IMGSZ):
+    """
+    Export YOLOv8 weights for a backend unless already exported
+
+    Args:
+        model_path: Path to the YOLOv8 .pt weights
+        backend: One of BACKENDS
+        imgsz: Model input size baked into the export
+
+    Returns:
+        Path of the exported model
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Choose from: {', '.join(BACKENDS)}")
+
+    path = exported_model_path(model_path, backend)
+    if os.path.exists(path):
+        return path
+
+    if backend == 'onnx-int8':
+        # Weight-only quantization; tools/quantize_model.py writes a
+        # calibrated static model to the same path
+        from .quantize import quantize_onnx
+        return quantize_onnx(export_model(model_path, 'onnx', imgsz), path, imgsz=imgsz)
+
+    export_format, dynamic = BACKENDS[backend]
+    return YOLO(model_path).export(format=export_format, imgsz=imgsz, dynamic=dynamic)
+
+
+def tile_windows(region, tile_size, overlap=0.2):
+    """
+    Split a region into overlapping square-ish tiles
+
+    Args:
+        region: Area to cover (x1, y1, x2, y2)
+        tile_size: Tile edge in pixels, None for a single tile
+        overlap: Fraction of the tile shared with its neighbour
+
+    Returns:
+        List of tile windows [(x1, y1, x2, y2), ...]
+    """
+    x1, y1, x2, y2 = region
+    if not tile_size:
+        return [region]
+
+    stride = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(lo, hi):
+        # Slightly oversized regions are cheaper as one letterboxed tile
+        if hi - lo <= tile_size * (1 + overlap):
+            return [lo]
+        positions = list(range(lo, hi - tile_size, stride))
+        positions.append(hi - tile_size)
+        return positions
+
+    xs = starts(x1, x2)
+    ys = starts(y1, y2)
+    width = x2 - x1 if len(xs) == 1 else tile_size
+    height = y2 - y1 if len(ys) == 1 else tile_size
+
+    return [(tx, ty, tx + width, ty + height) for ty in ys for tx in xs]
+
+
+def merge_boxes(boxes, scores, iou_threshold=0.5, ios_threshold=0.7):
+    """
+    Cross-tile non-maximum suppression
+
+    A box is dropped if a higher-scoring box overlaps it by more than
+    iou_threshold IoU, or covers more than ios_threshold of the smaller
+    of the two, which catches cars cut in half at a tile edge.
+
+    Args:
+        boxes: Float array of boxes [x1, y1, x2, y2], shape (N, 4)
+        scores: Confidence per box, shape (N,)
+        iou_threshold: IoU above which the lower-scoring box is dropped
+        ios_threshold: Intersection over smaller area above which the
+            lower-scoring box is dropped
+
+    Returns:
+        Indices of the kept boxes, highest score first
+    """
+    order = np.argsort(-scores)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        ix1 = np.maximum(boxes[i, 0], boxes[rest, 0])
+        iy1 = np.maximum(boxes[i, 1], boxes[rest, 1])
+        ix2 = np.minimum(boxes[i, 2], boxes[rest, 2])
+        iy2 = np.minimum(boxes[i, 3], boxes[rest, 3])
+        inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+
+        union = areas[i] + areas[rest] - inter
+        smaller = np.minimum(areas[i], areas[rest])
+        iou = inter / np.maximum(union, 1e-9)
+        ios = inter / np.maximum(smaller, 1e-9)
+
+        order = rest[(iou <= iou_threshold) & (ios <= ios_threshold)]
+
+    return np.array(keep, dtype=np.intp)
+
 
 class CarDetector:
     """YOLOv8-based car detector"""
     
-    def __init__(self, model_path):
+    def __init__(self, model_path, backend='pytorch', profile=None):
         """
         Initialize car detector with YOLOv8 model
         
         Args:
             model_path: Path to YOLOv8 model file
+            backend: Inference backend (pytorch, torchscript, onnx,
+                openvino or onnx-int8); other backends are exported on
+                first use
+            profile: Default InferenceProfile (input size, thresholds and
+                vehicle classes); calls can pass their own
+        """
+        self.backend = backend
+        self.model_path = export_model(model_path, backend) if backend != 'pytorch' else model_path
+        self.model = YOLO(self.model_path, task='detect')
+        # Static exports take one image per call at the export input size
+        self.max_batch_size = None if BACKENDS[backend][1] else 1
+        self.profile = profile or InferenceProfile()
+
+    def memory_bytes(self):
+        """
+        Approximate memory held by the model weights
+
+        Returns:
+            Bytes of parameters and buffers for the pytorch backend, or the
+            size of the exported model on disk for the others
         """
-        self.model = YOLO(model_path)
-        self.CAR_CLASS = 2  # COCO dataset car class ID
+        module = self.model.model
+        if isinstance(module, torch.nn.Module):
+            tensors = list(module.parameters()) + list(module.buffers())
+            return sum(t.numel() * t.element_size() for t in tensors)
+
+        if os.path.isdir(self.model_path):
+            return sum(
+                os.path.getsize(os.path.join(root, name))
+                for root, _, files in os.walk(self.model_path) for name in files
+            )
+        return os.path.getsize(self.model_path)
 
-    def detect(self, img):
+    def predict_kwargs(self, profile=None):
+        """
+        Keyword arguments for a model call under a profile
+
+        Args:
+            profile: Optional InferenceProfile, the detector's own if None
+
+        Returns:
+            Dictionary for self.model(); static exports keep their
+            EXPORT_IMGSZ input size
+        """
+        kwargs = (profile or self.profile).predict_kwargs()
+        if not BACKENDS[self.backend][1]:
+            kwargs['imgsz'] = EXPORT_IMGSZ
+        return kwargs
+
+    def detect(self, img, region=None, tile_size=None, tile_overlap=0.2, profile=None):
         """
         Detect cars in image
         
         Args:
             img: Input image (numpy array)
+            region: Optional (x1, y1, x2, y2) area to run the model on,
+                e.g. the bounds of all parking slots
+            tile_size: Optional tile edge; larger regions are split into
+                overlapping tiles run as one batch
+            tile_overlap: Fraction of each tile shared with its neighbour
+            profile: Optional InferenceProfile, e.g. the lot's
         
         Returns:
             List of bounding boxes [(x1, y1, x2, y2), ...]
         """
-        results = self.model(img, verbose=False)[0]
+        if region is not None or tile_size:
+            boxes = self.detect_batch([img], region=region, tile_size=tile_size,
+                                      tile_overlap=tile_overlap, profile=profile)[0]
+            return [tuple(box) for box in boxes.tolist()]
+
+        results = self.model(img, verbose=False, **self.predict_kwargs(profile))[0]
+        return [tuple(box) for box in self._car_boxes(results, profile).tolist()]
+
+    def detect_batch(self, images, batch_size=8, region=None, tile_size=None, tile_overlap=0.2,
+                     profile=None):
+        """
+        Detect cars in several images, running the model on batches
+
+        Args:
+            images: List of input images (numpy arrays)
+            batch_size: Maximum number of images (or tiles) per model call
+            region: Optional (x1, y1, x2, y2) area to run the model on
+            tile_size: Optional tile edge for splitting large regions
+            tile_overlap: Fraction of each tile shared with its neighbour
+            profile: Optional InferenceProfile, e.g. the lot's
+
+        Returns:
+            List with one int array of boxes, shape (N, 4), per image
+        """
+        if self.max_batch_size:
+            batch_size = min(batch_size, self.max_batch_size)
+
+        if region is not None or tile_size:
+            return self._detect_tiled(images, batch_size, region, tile_size, tile_overlap, profile)
+
         boxes = []
+        kwargs = self.predict_kwargs(profile)
+
+        for start in range(0, len(images), batch_size):
+            batch = list(images[start:start + batch_size])
+            for results in self.model(batch, verbose=False, **kwargs):
+                boxes.append(self._car_boxes(results, profile))
+
+        return boxes
+
+    def _detect_tiled(self, images, batch_size, region, tile_size, tile_overlap, profile=None):
+        """Run the model on region crops / tiles and merge back per image"""
+        crops = []
+        owners = []
+
+        for n, img in enumerate(images):
+            h, w = img.shape[:2]
+            x1, y1, x2, y2 = region if region is not None else (0, 0, w, h)
+            area = (max(0, int(x1)), max(0, int(y1)), min(w, int(x2)), min(h, int(y2)))
 
-        for box, cls in zip(results.boxes.xyxy, results.boxes.cls):
-            if int(cls) != self.CAR_CLASS:
+            if area[2] <= area[0] or area[3] <= area[1]:
                 continue
 
-            x1, y1, x2, y2 = map(int, box.tolist())
-            boxes.append((x1, y1, x2, y2))
+            for tx1, ty1, tx2, ty2 in tile_windows(area, tile_size, tile_overlap):
+                crops.append(img[ty1:ty2, tx1:tx2])
+                owners.append((n, tx1, ty1))
+
+        found = [[] for _ in images]
+        kwargs = self.predict_kwargs(profile)
+
+        for start in range(0, len(crops), batch_size):
+            batch = crops[start:start + batch_size]
+            outputs = self.model(batch, verbose=False, **kwargs)
+            for results, (n, ox, oy) in zip(outputs, owners[start:start + batch_size]):
+                xyxy, conf = self._car_detections(results, profile)
+                if len(xyxy):
+                    found[n].append((xyxy + [ox, oy, ox, oy], conf))
+
+        boxes = []
+        for detections in found:
+            if not detections:
+                boxes.append(np.zeros((0, 4), dtype=np.int32))
+                continue
+
+            xyxy = np.concatenate([d[0] for d in detections])
+            conf = np.concatenate([d[1] for d in detections])
+            if len(detections) > 1:
+                keep = merge_boxes(xyxy, conf, iou_threshold=(profile or self.profile).iou)
+                xyxy = xyxy[keep]
+            boxes.append(xyxy.astype(np.int32).reshape(-1, 4))
 
         return boxes
+
+    def _car_detections(self, results, profile=None):
+        """
+        Select vehicle boxes and scores from one YOLO result with a class mask
+
+        Args:
+            results: Single ultralytics Results object
+            profile: Optional InferenceProfile whose classes are kept
+
+        Returns:
+            Tuple of float boxes, shape (N, 4), and confidences, shape (N,)
+        """
+        cls = results.boxes.cls.cpu().numpy().reshape(-1)
+        mask = np.isin(cls, (profile or self.profile).class_ids)
+        xyxy = results.boxes.xyxy.cpu().numpy().reshape(-1, 4)[mask]
+        conf = results.boxes.conf.cpu().numpy().reshape(-1)[mask]
+
+        # ultralytics reports per-image preprocess/inference/postprocess ms
+        for phase, ms in (results.speed or {}).items():
+            if ms is not None:
+                MODEL_SECONDS.observe(ms / 1000, phase=phase)
+        CARS_DETECTED.inc(len(xyxy))
+
+        return xyxy, conf
+
+    def _car_boxes(self, results, profile=None):
+        """
+        Select vehicle boxes from one YOLO result with a class mask
+
+        Args:
+            results: Single ultralytics Results object
+            profile: Optional InferenceProfile whose classes are kept
+
+        Returns:
+            Int array of boxes [x1, y1, x2, y2], shape (N, 4)
+        """
+        xyxy, _ = self._car_detections(results, profile)
+        return xyxy.astype(np.int32)
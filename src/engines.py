@@ -0,0 +1,5 @@
+# Occupancy engines a lot can be scored with; kept free of heavy imports
+# so config.py can validate settings without loading the models:
+# 'detector': car detection scored against the slot polygons
+# 'classifier': warped slot crops classified by the lot's CLASSIFIER_FILE
+ENGINES = ('detector', 'classifier')
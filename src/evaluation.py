@@ -0,0 +1,144 @@
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import numpy as np
+
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png')
+
+
+def load_pklot_labels(xml_path):
+    """
+    Read per-slot ground truth from a PKLot-style annotation file
+
+    Args:
+        xml_path: XML file with <space id=".." occupied="0|1"> elements
+
+    Returns:
+        Dictionary mapping slot_id (int) to occupancy (bool); spaces
+        without an occupied attribute are left out
+    """
+    labels = {}
+
+    for space in ET.parse(xml_path).getroot().iter('space'):
+        occupied = space.get('occupied')
+        if occupied is not None:
+            labels[int(space.get('id'))] = occupied == '1'
+
+    return labels
+
+
+def write_pklot_labels(xml_path, labels, lot_id="lot"):
+    """
+    Write per-slot ground truth in the PKLot annotation layout
+
+    Args:
+        xml_path: Output XML file
+        labels: Dictionary mapping slot_id to occupancy (bool)
+        lot_id: Value of the root id attribute
+    """
+    root = ET.Element('parking', id=lot_id)
+    for slot_id, occupied in labels.items():
+        ET.SubElement(root, 'space', id=str(slot_id), occupied=str(int(occupied)))
+    ET.ElementTree(root).write(xml_path)
+
+
+def labeled_images(images_dir, limit=None):
+    """
+    Find the images that have PKLot-style labels next to them
+
+    Args:
+        images_dir: Directory searched recursively
+        limit: Stop after this many images, None for all
+
+    Returns:
+        List of (image path, labels) for every image with a .xml file of
+        the same stem
+    """
+    items = []
+    for path in sorted(Path(images_dir).rglob('*')):
+        if path.suffix.lower() in IMAGE_SUFFIXES and path.with_suffix('.xml').exists():
+            items.append((str(path), load_pklot_labels(path.with_suffix('.xml'))))
+            if limit and len(items) >= limit:
+                break
+    return items
+
+
+def latency_summary(samples):
+    """
+    Percentiles of a list of durations
+
+    Args:
+        samples: Durations in seconds
+
+    Returns:
+        Dictionary of mean/p50/p90/p99/max in milliseconds
+    """
+    if not len(samples):
+        return {}
+
+    ms = np.asarray(samples, dtype=np.float64) * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {
+        'mean': round(float(ms.mean()), 3),
+        'p50': round(float(p50), 3),
+        'p90': round(float(p90), 3),
+        'p99': round(float(p99), 3),
+        'max': round(float(ms.max()), 3),
+    }
+
+
+class SlotMetrics:
+    """Per-slot confusion counts for occupancy predictions"""
+
+    def __init__(self):
+        self.counts = {}
+
+    def update(self, predictions, labels):
+        """
+        Add one image's predictions
+
+        Args:
+            predictions: Dictionary mapping slot_id to predicted occupancy
+            labels: Dictionary mapping slot_id to true occupancy; slots
+                missing here are not scored
+        """
+        for slot_id, truth in labels.items():
+            if slot_id not in predictions:
+                continue
+
+            counts = self.counts.setdefault(slot_id, np.zeros(4, dtype=np.int64))
+            predicted = bool(predictions[slot_id])
+
+            # Counts are ordered tp, fp, fn, tn
+            if predicted:
+                counts[0 if truth else 1] += 1
+            else:
+                counts[2 if truth else 3] += 1
+
+    def summary(self):
+        """
+        Precision, recall and F1 for "occupied", per slot and overall
+
+        Returns:
+            Dictionary with 'overall' and 'per_slot' entries
+        """
+        per_slot = {slot_id: _scores(counts) for slot_id, counts in sorted(self.counts.items())}
+        total = sum(self.counts.values()) if self.counts else np.zeros(4, dtype=np.int64)
+
+        return {'overall': _scores(total), 'per_slot': per_slot}
+
+
+def _scores(counts):
+    tp, fp, fn, tn = (int(c) for c in counts)
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    total = tp + fp + fn + tn
+
+    return {
+        'tp': tp, 'fp': fp, 'fn': fn, 'tn': tn,
+        'precision': round(precision, 4),
+        'recall': round(recall, 4),
+        'f1': round(f1, 4),
+        'accuracy': round((tp + tn) / total, 4) if total else 0.0,
+    }
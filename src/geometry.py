@@ -0,0 +1,334 @@
+import numpy as np
+import shapely
+from shapely.strtree import STRtree
+
+# Areas below this (in px^2) are treated as floating-point residue
+AREA_EPSILON = 1e-9
+
+
+def flatten_polygons(polygons):
+    """
+    Concatenate polygon vertices into one array
+
+    Args:
+        polygons: Iterable of polygon coordinates (lists or (K, 2) arrays)
+
+    Returns:
+        Tuple (coords, offsets): float64 vertices (V, 2) and int64 offsets
+        (S + 1,) where polygon i is coords[offsets[i]:offsets[i + 1]]
+    """
+    arrays = list(polygons)
+
+    # Binary layouts already hold (K, 2) arrays; only lists need converting
+    if not all(isinstance(a, np.ndarray) and a.ndim == 2 for a in arrays):
+        arrays = [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in arrays]
+
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    np.cumsum([len(a) for a in arrays], out=offsets[1:])
+
+    if not arrays:
+        return np.zeros((0, 2), dtype=np.float64), offsets
+    return np.concatenate(arrays).astype(np.float64, copy=False), offsets
+
+
+def _clip_axis(pts, axis, limit, keep_below):
+    """
+    Clip closed polylines against an axis-aligned half-plane
+
+    Every edge is split where it crosses the clip line and the vertices on
+    the wrong side are then clamped onto the line. The clamped parts run
+    along the clip line and enclose no area, so the shoelace area of the
+    result equals the area of the clipped polygon.
+
+    Args:
+        pts: Array of vertices, shape (..., K, 2)
+        axis: 0 to clip on x, 1 to clip on y
+        limit: Clip line per polygon, broadcastable to shape (...)
+        keep_below: Keep the side where coordinate <= limit if True,
+            otherwise the side where coordinate >= limit
+
+    Returns:
+        Array of vertices, shape (..., 2K, 2)
+    """
+    nxt = np.roll(pts, -1, axis=-2)
+    limit = np.asarray(limit, dtype=np.float64)[..., None]
+
+    a = pts[..., axis]
+    b = nxt[..., axis]
+    denom = b - a
+    safe = np.where(denom == 0, 1.0, denom)
+    t = np.clip((limit - a) / safe, 0.0, 1.0)
+    t = np.where(denom == 0, 0.0, t)
+    crossing = pts + t[..., None] * (nxt - pts)
+
+    out = np.stack([pts, crossing], axis=-2)
+    out = out.reshape(pts.shape[:-2] + (-1, 2))
+
+    coord = out[..., axis]
+    clamped = np.minimum(coord, limit) if keep_below else np.maximum(coord, limit)
+    out[..., axis] = clamped
+    return out
+
+
+def polygon_area(pts):
+    """
+    Signed shoelace area of closed polylines
+
+    Args:
+        pts: Array of vertices, shape (..., K, 2)
+
+    Returns:
+        Array of signed areas, shape (...)
+    """
+    x = pts[..., 0]
+    y = pts[..., 1]
+    return 0.5 * np.sum(x * np.roll(y, -1, axis=-1) - np.roll(x, -1, axis=-1) * y, axis=-1)
+
+
+def clipped_area(polygons, boxes):
+    """
+    Area of each polygon clipped to its paired axis-aligned box
+
+    Args:
+        polygons: Array of polygon vertices, shape (N, K, 2)
+        boxes: Array of boxes [x1, y1, x2, y2], shape (N, 4)
+
+    Returns:
+        Array of intersection areas, shape (N,)
+    """
+    # Work relative to each box corner to keep the shoelace sums small
+    origin = boxes[:, None, :2]
+    pts = polygons - origin
+    width = boxes[:, 2] - boxes[:, 0]
+    height = boxes[:, 3] - boxes[:, 1]
+
+    pts = _clip_axis(pts, 0, 0.0, keep_below=False)
+    pts = _clip_axis(pts, 0, width, keep_below=True)
+    pts = _clip_axis(pts, 1, 0.0, keep_below=False)
+    pts = _clip_axis(pts, 1, height, keep_below=True)
+
+    areas = np.abs(polygon_area(pts))
+    areas[areas < AREA_EPSILON] = 0.0
+    return areas
+
+
+class SlotGeometry:
+    """Parking slot polygons compiled into NumPy arrays"""
+
+    def __init__(self, slots):
+        """
+        Precompute vertex, bounds and area arrays for all slots
+
+        Args:
+            slots: Dictionary mapping slot_id to list of polygon coordinates
+        """
+        self.slot_ids = list(slots.keys())
+
+        coords, offsets = flatten_polygons(slots.values())
+        counts = np.diff(offsets)
+        max_vertices = int(counts.max()) if len(counts) else 3
+
+        if len(counts) and (counts == max_vertices).all():
+            vertices = coords.reshape(len(counts), max_vertices, 2)
+        else:
+            vertices = np.zeros((len(self.slot_ids), max_vertices, 2), dtype=np.float64)
+            for i, (start, end) in enumerate(zip(offsets[:-1], offsets[1:])):
+                vertices[i, :end - start] = coords[start:end]
+                # Pad with the last vertex; repeated points add no area
+                vertices[i, end - start:] = coords[end - 1]
+
+        self.vertices = vertices
+        self.bounds = np.concatenate(
+            [vertices.min(axis=1), vertices.max(axis=1)], axis=1
+        ) if len(vertices) else np.zeros((0, 4))
+        self.areas = np.abs(polygon_area(vertices))
+
+        # R-tree over slot bounds so each box only meets nearby slots
+        self.index = STRtree(shapely.box(*self.bounds.T))
+
+    def __len__(self):
+        return len(self.slot_ids)
+
+    def candidate_pairs(self, boxes):
+        """
+        Find slot/box pairs whose bounding boxes overlap
+
+        Args:
+            boxes: Array of boxes [x1, y1, x2, y2], shape (B, 4)
+
+        Returns:
+            Tuple of (slot_indices, box_indices) arrays
+        """
+        if len(self) == 0 or len(boxes) == 0:
+            empty = np.zeros(0, dtype=np.intp)
+            return empty, empty
+
+        box_idx, slot_idx = self.index.query(shapely.box(*boxes.T))
+        return slot_idx, box_idx
+
+    def pair_areas(self, boxes, slot_mask=None):
+        """
+        Compute intersection areas for every overlapping slot/box pair
+
+        Args:
+            boxes: List of car bounding boxes [(x1, y1, x2, y2), ...]
+            slot_mask: Optional boolean array selecting the slots to evaluate
+
+        Returns:
+            Tuple of (slot_indices, box_indices, areas) arrays
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        slot_idx, box_idx = self.candidate_pairs(boxes)
+
+        if slot_mask is not None:
+            keep = slot_mask[slot_idx]
+            slot_idx, box_idx = slot_idx[keep], box_idx[keep]
+
+        if len(slot_idx) == 0:
+            return slot_idx, box_idx, np.zeros(0, dtype=np.float64)
+
+        areas = clipped_area(self.vertices[slot_idx], boxes[box_idx])
+        return slot_idx, box_idx, areas
+
+    def intersection_areas(self, boxes):
+        """
+        Compute the slot/box intersection area matrix in one batched pass
+
+        Args:
+            boxes: List of car bounding boxes [(x1, y1, x2, y2), ...]
+
+        Returns:
+            Array of intersection areas, shape (slots, boxes)
+        """
+        n_boxes = len(np.asarray(boxes).reshape(-1, 4))
+        areas = np.zeros((len(self), n_boxes), dtype=np.float64)
+
+        slot_idx, box_idx, pair_areas = self.pair_areas(boxes)
+        areas[slot_idx, box_idx] = pair_areas
+        return areas
+
+    def occupied_mask(self, boxes, slot_mask=None):
+        """
+        Flag slots that share a non-zero area with any box
+
+        Args:
+            boxes: List of car bounding boxes [(x1, y1, x2, y2), ...]
+            slot_mask: Optional boolean array selecting the slots to evaluate;
+                unselected slots are reported as vacant
+
+        Returns:
+            Boolean array, shape (slots,)
+        """
+        occupied = np.zeros(len(self), dtype=bool)
+
+        slot_idx, _, areas = self.pair_areas(boxes, slot_mask)
+        occupied[slot_idx[areas > 0]] = True
+        return occupied
+
+    def pair_overlaps(self, boxes, slot_mask=None):
+        """
+        Overlap fractions for every slot/box pair that shares area
+
+        Args:
+            boxes: List of car bounding boxes [(x1, y1, x2, y2), ...]
+            slot_mask: Optional boolean array selecting the slots to evaluate
+
+        Returns:
+            Tuple of (slot_indices, box_indices, slot_fractions, box_fractions):
+            the share of the slot's area and of the box's area in each pair's
+            intersection
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        slot_idx, box_idx, areas = self.pair_areas(boxes, slot_mask)
+
+        keep = areas > 0
+        slot_idx, box_idx, areas = slot_idx[keep], box_idx[keep], areas[keep]
+
+        box_areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        slot_areas = self.areas[slot_idx]
+        box_areas = box_areas[box_idx]
+
+        slot_fractions = areas / np.where(slot_areas > 0, slot_areas, 1.0)
+        box_fractions = areas / np.where(box_areas > 0, box_areas, 1.0)
+        return slot_idx, box_idx, slot_fractions, box_fractions
+
+    def coverage(self, boxes, slot_mask=None, assign=False):
+        """
+        Best overlap fractions per slot
+
+        Args:
+            boxes: List of car bounding boxes [(x1, y1, x2, y2), ...]
+            slot_mask: Optional boolean array selecting the slots to evaluate
+            assign: Count each box only for the slot it overlaps most
+
+        Returns:
+            Tuple of (slot_fractions, box_fractions) arrays, shape (slots,):
+            the largest share of the slot covered by a single box, and the
+            largest share of a single box lying inside the slot
+        """
+        slot_idx, box_idx, slot_fractions, box_fractions = self._scored_pairs(boxes, slot_mask, assign)
+
+        slot_coverage = np.zeros(len(self), dtype=np.float64)
+        box_coverage = np.zeros(len(self), dtype=np.float64)
+        np.maximum.at(slot_coverage, slot_idx, slot_fractions)
+        np.maximum.at(box_coverage, slot_idx, box_fractions)
+        return slot_coverage, box_coverage
+
+    def scored_mask(self, boxes, slot_threshold=0.3, box_threshold=0.0,
+                    assign=False, slot_mask=None):
+        """
+        Flag slots by how much of them, and of the box, the overlap covers
+
+        Args:
+            boxes: List of car bounding boxes [(x1, y1, x2, y2), ...]
+            slot_threshold: Minimum share of the slot's area a box must cover
+            box_threshold: Minimum share of the box's area inside the slot
+            assign: Count each box only for the slot it overlaps most
+            slot_mask: Optional boolean array selecting the slots to evaluate;
+                unselected slots are reported as vacant
+
+        Returns:
+            Boolean array, shape (slots,)
+        """
+        slot_idx, _, slot_fractions, box_fractions = self._scored_pairs(boxes, slot_mask, assign)
+
+        hit = (slot_fractions >= slot_threshold) & (box_fractions >= box_threshold)
+        occupied = np.zeros(len(self), dtype=bool)
+        occupied[slot_idx[hit]] = True
+        return occupied
+
+    def _scored_pairs(self, boxes, slot_mask, assign):
+        """pair_overlaps(), optionally keeping only each box's best slot"""
+        # A box's best slot is chosen among all slots, not just the masked ones
+        slot_idx, box_idx, slot_fractions, box_fractions = self.pair_overlaps(
+            boxes, None if assign else slot_mask)
+
+        if assign and len(box_idx):
+            # Best slot per box: largest intersection, i.e. largest box
+            # fraction, then the slot it covers most
+            order = np.lexsort((-slot_fractions, -box_fractions, box_idx))
+            _, first = np.unique(box_idx[order], return_index=True)
+            best = order[first]
+            slot_idx, box_idx = slot_idx[best], box_idx[best]
+            slot_fractions, box_fractions = slot_fractions[best], box_fractions[best]
+
+        if assign and slot_mask is not None:
+            keep = slot_mask[slot_idx]
+            slot_idx, box_idx = slot_idx[keep], box_idx[keep]
+            slot_fractions, box_fractions = slot_fractions[keep], box_fractions[keep]
+
+        return slot_idx, box_idx, slot_fractions, box_fractions
+
+    def overlap_ratios(self, boxes):
+        """
+        Fraction of each slot's area covered by each box
+
+        Args:
+            boxes: List of car bounding boxes [(x1, y1, x2, y2), ...]
+
+        Returns:
+            Array of overlap ratios in [0, 1], shape (slots, boxes)
+        """
+        areas = self.intersection_areas(boxes)
+        slot_areas = np.where(self.areas > 0, self.areas, 1.0)
+        return areas / slot_areas[:, None]
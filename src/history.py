@@ -0,0 +1,386 @@
+import logging
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+
+logger = logging.getLogger(__name__)
+
+# Lot rollups are kept per minute and per hour; per-slot rollups per hour.
+# Day buckets are summed from the hourly rows at query time.
+RESOLUTIONS = {'minute': MINUTE, 'hour': HOUR, 'day': DAY}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    lot_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    total INTEGER NOT NULL,
+    occupied INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS observations_lot_ts ON observations (lot_id, ts);
+
+CREATE TABLE IF NOT EXISTS slot_events (
+    lot_id TEXT NOT NULL,
+    slot_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    occupied INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS slot_events_lot_ts ON slot_events (lot_id, ts);
+
+CREATE TABLE IF NOT EXISTS slot_state (
+    lot_id TEXT NOT NULL,
+    slot_id TEXT NOT NULL,
+    occupied INTEGER NOT NULL,
+    since REAL NOT NULL,
+    PRIMARY KEY (lot_id, slot_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS dwells (
+    lot_id TEXT NOT NULL,
+    slot_id TEXT NOT NULL,
+    started REAL NOT NULL,
+    ended REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dwells_lot_ended ON dwells (lot_id, ended);
+
+CREATE TABLE IF NOT EXISTS lot_rollups (
+    lot_id TEXT NOT NULL,
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    occupied INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    PRIMARY KEY (lot_id, resolution, bucket)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS slot_rollups (
+    lot_id TEXT NOT NULL,
+    slot_id TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    occupied INTEGER NOT NULL,
+    PRIMARY KEY (lot_id, bucket, slot_id)
+) WITHOUT ROWID;
+"""
+
+UPSERT_LOT_ROLLUP = """
+INSERT INTO lot_rollups VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (lot_id, resolution, bucket) DO UPDATE SET
+    samples = samples + excluded.samples,
+    occupied = occupied + excluded.occupied,
+    total = total + excluded.total
+"""
+
+UPSERT_SLOT_ROLLUP = """
+INSERT INTO slot_rollups VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (lot_id, bucket, slot_id) DO UPDATE SET
+    samples = samples + excluded.samples,
+    occupied = occupied + excluded.occupied
+"""
+
+
+def _bucket(ts, resolution):
+    return int(ts // resolution) * resolution
+
+
+class OccupancyHistory:
+    """Append-only occupancy store in SQLite with rollups maintained on ingest"""
+
+    def __init__(self, path, max_pending=10000):
+        """
+        Open or create the history database
+
+        Args:
+            path: SQLite database file
+            max_pending: Observations queued before new ones are dropped
+        """
+        self.path = path
+        self.written = 0
+        self.dropped = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        conn.close()
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def record(self, lot_id, predictions, timestamp=None):
+        """
+        Queue one frame's occupancy for writing without blocking
+
+        Args:
+            lot_id: Lot the predictions belong to
+            predictions: Dictionary mapping slot_id to occupancy status
+            timestamp: Capture time in epoch seconds, defaults to now
+
+        Returns:
+            True if queued, False if the queue is full and it was dropped
+
+        Raises:
+            ValueError: If timestamp is not a finite number
+        """
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        if not math.isfinite(timestamp):
+            raise ValueError(f"Timestamp must be finite, got {timestamp}")
+
+        self._ensure_started()
+
+        try:
+            self._queue.put_nowait((lot_id, timestamp, predictions))
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+        return True
+
+    def pending(self):
+        """Number of observations queued but not yet written"""
+        return self._queue.unfinished_tasks
+
+    def flush(self):
+        """Block until every queued observation has been written"""
+        self._queue.join()
+
+    def occupancy(self, lot_id, start, end, resolution='hour'):
+        """
+        Lot occupancy over a time range, answered from the rollups
+
+        Args:
+            lot_id: Identifier of the lot
+            start: Range start in epoch seconds
+            end: Range end in epoch seconds
+            resolution: 'minute', 'hour' or 'day'; buckets overlapping the
+                range are returned whole
+
+        Returns:
+            Dictionary with the overall occupancy rate, the number of
+            observations and one entry per non-empty bucket
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution '{resolution}'. Choose from: {', '.join(RESOLUTIONS)}")
+
+        size = RESOLUTIONS[resolution]
+        stored = MINUTE if resolution == 'minute' else HOUR
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT bucket / ? * ?, SUM(samples), SUM(occupied), SUM(total) FROM lot_rollups "
+                "WHERE lot_id = ? AND resolution = ? AND bucket >= ? AND bucket < ? "
+                "GROUP BY bucket / ? ORDER BY 1",
+                (size, size, lot_id, stored, _bucket(start, size), end, size)
+            ).fetchall()
+        conn.close()
+
+        samples = sum(row[1] for row in rows)
+        occupied = sum(row[2] for row in rows)
+        total = sum(row[3] for row in rows)
+
+        return {
+            'lot_id': lot_id,
+            'resolution': resolution,
+            'start': start,
+            'end': end,
+            'samples': samples,
+            'occupancy_rate': round(100 * occupied / total, 1) if total else None,
+            'buckets': [
+                {
+                    'start': bucket,
+                    'samples': n,
+                    'occupied': round(occ / n, 2),
+                    'occupancy_rate': round(100 * occ / tot, 1) if tot else None,
+                }
+                for bucket, n, occ, tot in rows
+            ],
+        }
+
+    def slot_occupancy(self, lot_id, start, end):
+        """
+        Fraction of observations each slot was occupied, from hourly rollups
+
+        Args:
+            lot_id: Identifier of the lot
+            start: Range start in epoch seconds
+            end: Range end in epoch seconds
+
+        Returns:
+            Dictionary with a 'slots' entry mapping slot_id (str) to
+            {'samples', 'occupancy_rate'}
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT slot_id, SUM(samples), SUM(occupied) FROM slot_rollups "
+                "WHERE lot_id = ? AND bucket >= ? AND bucket < ? GROUP BY slot_id",
+                (lot_id, _bucket(start, HOUR), end)
+            ).fetchall()
+        conn.close()
+
+        return {
+            'lot_id': lot_id,
+            'start': start,
+            'end': end,
+            'slots': {
+                slot_id: {'samples': n, 'occupancy_rate': round(100 * occ / n, 1)}
+                for slot_id, n, occ in sorted(rows, key=_slot_order)
+            },
+        }
+
+    def dwell(self, lot_id, start, end):
+        """
+        How long cars stayed in each slot, for stays that ended in the range
+
+        Args:
+            lot_id: Identifier of the lot
+            start: Range start in epoch seconds
+            end: Range end in epoch seconds
+
+        Returns:
+            Dictionary with overall and per-slot stay counts and mean/max
+            durations in seconds
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT slot_id, COUNT(*), SUM(ended - started), MAX(ended - started) FROM dwells "
+                "WHERE lot_id = ? AND ended >= ? AND ended < ? GROUP BY slot_id",
+                (lot_id, start, end)
+            ).fetchall()
+        conn.close()
+
+        stays = sum(row[1] for row in rows)
+        seconds = sum(row[2] for row in rows)
+
+        return {
+            'lot_id': lot_id,
+            'start': start,
+            'end': end,
+            'stays': stays,
+            'mean_seconds': round(seconds / stays, 1) if stays else None,
+            'max_seconds': round(max(row[3] for row in rows), 1) if rows else None,
+            'per_slot': {
+                slot_id: {'stays': n, 'mean_seconds': round(total / n, 1), 'max_seconds': round(longest, 1)}
+                for slot_id, n, total, longest in sorted(rows, key=_slot_order)
+            },
+        }
+
+    def stats(self):
+        """Ingest counters for monitoring"""
+        return {'written': self.written, 'dropped': self.dropped, 'pending': self.pending()}
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        conn = self._connect()
+        # Safe with WAL: a power loss can drop the last commits, not corrupt
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        state = {
+            (lot_id, slot_id): (occupied, since)
+            for lot_id, slot_id, occupied, since in conn.execute("SELECT * FROM slot_state")
+        }
+
+        while True:
+            # Everything queued while the last batch was written goes in one transaction
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Slot state changes only reach memory once the batch committed,
+            # so a rolled-back batch leaves it matching the database; any
+            # failure drops the batch but keeps the writer running
+            try:
+                with conn:
+                    changed = self._write(conn, batch, state)
+                state.update(changed)
+                self.written += len(batch)
+            except Exception:
+                logger.exception("Dropped %d history observations", len(batch))
+                self.dropped += len(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _write(conn, batch, state):
+        """
+        Append raw rows and fold one batch into the rollups (transaction held)
+
+        Returns:
+            Dictionary of the slot states the batch changed, to apply to
+            state after the transaction commits
+        """
+        observations = []
+        events = []
+        dwells = []
+        changed = {}
+        lot_rollups = defaultdict(lambda: [0, 0, 0])
+        slot_rollups = defaultdict(lambda: [0, 0])
+
+        for lot_id, ts, predictions in batch:
+            occupied = sum(1 for flag in predictions.values() if flag)
+            observations.append((lot_id, ts, len(predictions), occupied))
+
+            for resolution in (MINUTE, HOUR):
+                entry = lot_rollups[lot_id, resolution, _bucket(ts, resolution)]
+                entry[0] += 1
+                entry[1] += occupied
+                entry[2] += len(predictions)
+
+            hour = _bucket(ts, HOUR)
+            for slot_id, flag in predictions.items():
+                slot_id = str(slot_id)
+                flag = 1 if flag else 0
+
+                entry = slot_rollups[lot_id, slot_id, hour]
+                entry[0] += 1
+                entry[1] += flag
+
+                previous = changed.get((lot_id, slot_id), state.get((lot_id, slot_id)))
+                if previous is not None and (previous[0] == flag or ts < previous[1]):
+                    continue
+
+                # A stay ends when an occupied slot is seen vacant
+                if previous is not None and previous[0] and not flag:
+                    dwells.append((lot_id, slot_id, previous[1], ts))
+
+                events.append((lot_id, slot_id, ts, flag))
+                changed[lot_id, slot_id] = (flag, ts)
+
+        conn.executemany("INSERT INTO observations VALUES (?, ?, ?, ?)", observations)
+        conn.executemany("INSERT INTO slot_events VALUES (?, ?, ?, ?)", events)
+        conn.executemany("INSERT INTO dwells VALUES (?, ?, ?, ?)", dwells)
+        conn.executemany(
+            "INSERT OR REPLACE INTO slot_state VALUES (?, ?, ?, ?)",
+            [(lot_id, slot_id, flag, since) for (lot_id, slot_id), (flag, since) in changed.items()]
+        )
+        conn.executemany(UPSERT_LOT_ROLLUP, [key + tuple(value) for key, value in lot_rollups.items()])
+        conn.executemany(UPSERT_SLOT_ROLLUP, [key + tuple(value) for key, value in slot_rollups.items()])
+        return changed
+
+
+def _slot_order(row):
+    """Sort numeric slot ids numerically, others after them by name"""
+    slot_id = row[0]
+    return (0, int(slot_id), '') if slot_id.isdigit() else (1, 0, slot_id)
@@ -0,0 +1,355 @@
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+def _worker_loop(index, model_path, backend, requests, results, claims, max_batch_size, max_wait,
+                 num_threads, detector_factory=None):
+    """
+    Worker process: own a CarDetector and serve micro-batches from the queue
+
+    Args:
+        index: Worker slot in the pool, reported with claimed jobs
+        model_path: Path to YOLOv8 model file
+        backend: CarDetector inference backend
+        requests: Queue of (job_id, image, profile) items, None to stop
+        results: Queue receiving (job_id, boxes, error) items
+        claims: SimpleQueue receiving (index, None) once the detector is
+            loaded and (index, job_ids) before a batch runs; its writes are
+            synchronous, so they survive a crash mid-batch
+        max_batch_size: Maximum number of images per model call
+        max_wait: Seconds to wait for a batch to fill after the first item
+        num_threads: Torch intra-op threads for this worker
+        detector_factory: Optional callable(model_path, backend) building
+            the detector; CarDetector if None
+    """
+    import torch
+
+    torch.set_num_threads(num_threads)
+    if detector_factory is None:
+        from .detect_cars import CarDetector
+        detector_factory = CarDetector
+    detector = detector_factory(model_path, backend=backend)
+    claims.put((index, None))
+    running = True
+
+    while running:
+        item = requests.get()
+        if item is None:
+            break
+
+        batch = [item]
+        deadline = time.monotonic() + max_wait
+
+        while len(batch) < max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                running = False
+                break
+            batch.append(item)
+
+        # Lets the pool fail these jobs if this process dies mid-batch
+        claims.put((index, [job_id for job_id, _, _ in batch]))
+
+        # One model call per profile, since input size and thresholds
+        # apply to the whole batch
+        groups = OrderedDict()
+        for job_id, img, profile in batch:
+            groups.setdefault(profile, []).append((job_id, img))
+
+        for profile, items in groups.items():
+            try:
+                images = [img for _, img in items]
+                batch_boxes = detector.detect_batch(images, batch_size=max_batch_size, profile=profile)
+                for (job_id, _), boxes in zip(items, batch_boxes):
+                    results.put((job_id, boxes, None))
+            except Exception as e:
+                for job_id, _ in items:
+                    results.put((job_id, None, str(e)))
+
+
+class InferencePool:
+    """Pool of detector processes fed from a shared micro-batching queue"""
+
+    def __init__(self, model_path, num_workers=2, max_batch_size=8,
+                 max_wait=0.01, max_jobs=1000, on_result=None, backend='pytorch',
+                 poll_interval=1.0, detector_factory=None, max_start_failures=3):
+        """
+        Initialize inference pool (workers start on first submit)
+
+        Args:
+            model_path: Path to YOLOv8 model file
+            num_workers: Number of worker processes, each with its own model
+            max_batch_size: Maximum number of queued images per model call
+            max_wait: Seconds a worker waits for more images before running
+            max_jobs: Number of jobs remembered before the oldest are dropped
+            on_result: Optional callable(boxes, context) turning detections
+                into the stored job result, run on the collector thread
+            backend: CarDetector inference backend; exported models must
+                already exist so workers do not export concurrently
+            poll_interval: Seconds between checks that workers are alive;
+                a dead worker's jobs fail and it is replaced
+            detector_factory: Optional picklable callable(model_path,
+                backend) building each worker's detector, CarDetector if None
+            max_start_failures: Attempts to start a worker whose previous
+                process died before loading its detector, with a doubling
+                delay between them; once every worker is out of attempts,
+                queued jobs fail instead of waiting forever
+        """
+        self.model_path = model_path
+        self.backend = backend
+        self.num_workers = num_workers
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_jobs = max_jobs
+        self.on_result = on_result
+        self.poll_interval = poll_interval
+        self.detector_factory = detector_factory
+        self.max_start_failures = max_start_failures
+        self.restarts = 0
+
+        self._ctx = mp.get_context("spawn")
+        self._requests = None
+        self._results = None
+        self._claims = None
+        self._workers = []
+        self._collector = None
+        self._num_threads = 1
+
+        # Per worker slot: detector loaded, consecutive failed starts, and
+        # when a slot whose worker failed to start may try again
+        self._ready = []
+        self._start_failures = []
+        self._retry_at = []
+        self._start_error = None
+
+        self._jobs = OrderedDict()
+        self._contexts = {}
+        # Worker index holding each claimed, unfinished job
+        self._owners = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start worker processes and the result collector thread"""
+        with self._lock:
+            if self._workers:
+                return
+
+            self._requests = self._ctx.Queue()
+            self._results = self._ctx.Queue()
+            self._claims = self._ctx.SimpleQueue()
+            self._num_threads = max(1, (os.cpu_count() or 1) // self.num_workers)
+            self._ready = [False] * self.num_workers
+            self._start_failures = [0] * self.num_workers
+            self._retry_at = [0.0] * self.num_workers
+            self._workers = [self._spawn(index) for index in range(self.num_workers)]
+
+            self._collector = threading.Thread(target=self._collect, daemon=True)
+            self._collector.start()
+
+    def _spawn(self, index):
+        """Start the worker process for one pool slot"""
+        worker = self._ctx.Process(
+            target=_worker_loop,
+            args=(index, self.model_path, self.backend, self._requests, self._results, self._claims,
+                  self.max_batch_size, self.max_wait, self._num_threads, self.detector_factory),
+            daemon=True,
+        )
+        worker.start()
+        return worker
+
+    def stop(self, timeout=5):
+        """Ask workers to exit and wait for them"""
+        with self._lock:
+            workers, self._workers = self._workers, []
+
+        workers = [worker for worker in workers if worker is not None]
+        for _ in workers:
+            self._requests.put(None)
+        for worker in workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
+
+        if self._collector is not None:
+            self._results.put(None)
+            self._collector.join(timeout)
+            self._collector = None
+
+    def submit(self, img, context=None, profile=None):
+        """
+        Queue an image for detection
+
+        Args:
+            img: Input image (numpy array)
+            context: Optional value handed to on_result with the detections
+            profile: Optional InferenceProfile, the detector default if None
+
+        Returns:
+            Job id string
+        """
+        self.start()
+
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                'status': 'queued',
+                'submitted_at': time.time(),
+            }
+            if context is not None:
+                self._contexts[job_id] = context
+            self._evict()
+
+        self._requests.put((job_id, img, profile))
+        return job_id
+
+    def get(self, job_id):
+        """
+        Look up a job
+
+        Args:
+            job_id: Id returned by submit()
+
+        Returns:
+            Job dictionary, or None if the id is unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def queue_depth(self):
+        """Number of jobs submitted but not yet finished"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job['status'] == 'queued')
+
+    def _collect(self):
+        """Move worker results into the job table and replace dead workers"""
+        last_check = time.monotonic()
+
+        while True:
+            try:
+                item = self._results.get(timeout=self.poll_interval)
+            except queue.Empty:
+                item = ()
+
+            if item is None:
+                break
+
+            self._read_claims()
+            if item:
+                self._finish(*item)
+
+            if time.monotonic() - last_check >= self.poll_interval:
+                self._check_workers()
+                last_check = time.monotonic()
+
+    def _read_claims(self):
+        """Record which worker holds each job it took from the queue"""
+        while not self._claims.empty():
+            index, job_ids = self._claims.get()
+            with self._lock:
+                if job_ids is None:
+                    self._ready[index] = True
+                    self._start_failures[index] = 0
+                    continue
+                for job_id in job_ids:
+                    job = self._jobs.get(job_id)
+                    # A result can overtake its claim
+                    if job is not None and job['status'] == 'queued':
+                        self._owners[job_id] = index
+
+    def _finish(self, job_id, boxes, error):
+        """Store the result of one job"""
+        update = {'finished_at': time.time()}
+
+        with self._lock:
+            context = self._contexts.pop(job_id, None)
+            self._owners.pop(job_id, None)
+
+        if error is None:
+            try:
+                result = self.on_result(boxes, context) if self.on_result else boxes.tolist()
+                update.update(status='done', result=result)
+            except Exception as e:
+                update.update(status='failed', error=str(e))
+        else:
+            update.update(status='failed', error=error)
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(update)
+
+    def _check_workers(self):
+        """Fail the jobs of workers that died and start replacements"""
+        self._read_claims()
+        now = time.monotonic()
+
+        with self._lock:
+            for index, worker in enumerate(self._workers):
+                if worker is None:
+                    # Backing off after a failed start
+                    if self._start_failures[index] < self.max_start_failures and now >= self._retry_at[index]:
+                        self._workers[index] = self._spawn(index)
+                        self.restarts += 1
+                    continue
+
+                if worker.is_alive():
+                    continue
+
+                error = f'Inference worker exited with code {worker.exitcode}'
+                for job_id in [job_id for job_id, owner in self._owners.items() if owner == index]:
+                    del self._owners[job_id]
+                    self._fail(job_id, error)
+
+                if self._ready[index]:
+                    # Died while serving, e.g. out of memory; replace it now
+                    self._ready[index] = False
+                    self._workers[index] = self._spawn(index)
+                    self.restarts += 1
+                else:
+                    # Died before loading its detector, e.g. a bad model path
+                    self._start_failures[index] += 1
+                    self._retry_at[index] = now + self.poll_interval * 2 ** self._start_failures[index]
+                    self._workers[index] = None
+                    self._start_error = error
+
+            if all(failures >= self.max_start_failures for failures in self._start_failures):
+                self._fail_queued(f'No inference worker could start ({self._start_error})')
+
+    def _fail(self, job_id, error):
+        """Mark a queued job failed (caller holds the lock)"""
+        self._contexts.pop(job_id, None)
+        job = self._jobs.get(job_id)
+        if job is not None and job['status'] == 'queued':
+            job.update(status='failed', error=error, finished_at=time.time())
+
+    def _fail_queued(self, error):
+        """Fail every job still waiting for a worker (caller holds the lock)"""
+        while True:
+            try:
+                item = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                self._fail(item[0], error)
+
+        for job_id in list(self._jobs):
+            self._fail(job_id, error)
+
+    def _evict(self):
+        """Drop the oldest jobs beyond max_jobs (caller holds the lock)"""
+        while len(self._jobs) > self.max_jobs:
+            job_id, _ = self._jobs.popitem(last=False)
+            self._contexts.pop(job_id, None)
+            self._owners.pop(job_id, None)
@@ -0,0 +1,257 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from .engines import ENGINES
+from .occupancy import OccupancyDetector
+from .profiles import PROFILE_FILE, load_profile
+from .slot_classifier import ClassifierEngine, SlotClassifier
+from .slot_utils import BINARY_SUFFIX, load_slots, slots_region
+from .visualize import SlotRenderer
+
+# Slot classifier model, next to the lot's slots file
+CLASSIFIER_FILE = "classifier.npz"
+
+
+def _mtime(path):
+    """Modification time of a file, None if it does not exist"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _newest_layout(paths):
+    """
+    Most recently written of a lot's layout files
+
+    A slots.npz converted from slots.json goes stale when the JSON is edited
+    afterwards, so the newer file wins; a binary layout wins a tie.
+
+    Returns:
+        Tuple (path, mtime), or (None, None) if none of the files exist
+    """
+    best = None
+    for path in paths:
+        mtime = _mtime(path)
+        if mtime is None:
+            continue
+        key = (mtime, path.endswith(BINARY_SUFFIX))
+        if best is None or key > best[0]:
+            best = (key, path)
+
+    return (best[1], best[0][0]) if best is not None else (None, None)
+
+
+class Layout:
+    """One camera view's slots with all derived geometry compiled once"""
+
+    def __init__(self, lot_id, path, region_margin=32, scoring=None, engine='detector',
+                 profile_defaults=None):
+        """
+        Load and compile a slot layout
+
+        Args:
+            lot_id: Identifier of the lot / camera view
+            path: Path to its slots file
+            region_margin: Padding around the slot area used for cropping
+            scoring: Optional OccupancyDetector keyword arguments (mode,
+                thresholds, assign)
+            engine: Occupancy engine, one of ENGINES; 'classifier' needs a
+                CLASSIFIER_FILE next to the slots file
+            profile_defaults: Optional InferenceProfile settings, overridden
+                by a PROFILE_FILE next to the slots file
+
+        Raises:
+            ValueError: If engine is unknown or the profile is invalid
+            FileNotFoundError: If the classifier engine has no model
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown occupancy engine '{engine}'. Choose from: {', '.join(ENGINES)}")
+
+        self.lot_id = lot_id
+        self.path = path
+        self.engine = engine
+        self.mtime = os.stat(path).st_mtime_ns
+
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            digest.update(f.read())
+
+        self.slots = load_slots(path)
+        self.occupancy_detector = OccupancyDetector(self.slots, **(scoring or {}))
+        self.renderer = SlotRenderer(self.slots)
+        self.region = slots_region(self.slots, region_margin)
+
+        # Files next to the slots file this layout depends on, with the
+        # modification time they were read at (None while missing)
+        self.side_files = {}
+
+        self.profile_path = os.path.join(os.path.dirname(path), PROFILE_FILE)
+        self.side_files[self.profile_path] = _mtime(self.profile_path)
+        self.profile = load_profile(self.profile_path, profile_defaults)
+        digest.update(repr(self.profile.key()).encode())
+
+        # Slot warps are precomputed here, once per layout and model
+        self.classifier = None
+        self.model_path = None
+        if engine == 'classifier':
+            self.model_path = os.path.join(os.path.dirname(path), CLASSIFIER_FILE)
+            if not os.path.exists(self.model_path):
+                raise FileNotFoundError(
+                    f"Lot {lot_id} uses the classifier engine but {self.model_path} does not exist; "
+                    f"train one with tools/train_slot_classifier.py"
+                )
+            self.side_files[self.model_path] = _mtime(self.model_path)
+            with open(self.model_path, "rb") as f:
+                digest.update(f.read())
+            self.classifier = ClassifierEngine(self.slots, SlotClassifier.load(self.model_path))
+
+        # Results are cached per version, so a retrained model or a new
+        # profile counts too
+        self.version = digest.hexdigest()[:12]
+
+    def __len__(self):
+        return len(self.slots)
+
+    def files_changed(self):
+        """Whether the profile or classifier file changed since loading"""
+        return any(_mtime(path) != mtime for path, mtime in self.side_files.items())
+
+
+class LayoutRegistry:
+    """Discovers slot layouts and keeps compiled ones in a bounded LRU cache"""
+
+    def __init__(self, root, pattern="*/slots.*", max_layouts=16,
+                 max_slots=100000, region_margin=32, scoring=None,
+                 engine='detector', lot_engines=None, profile_defaults=None):
+        """
+        Initialize layout registry
+
+        Args:
+            root: Directory searched for layout files
+            pattern: Glob, relative to root, matching layout files; the
+                parent directory name becomes the lot id, and of a binary
+                (.npz) and JSON layout in the same directory the newer is used
+            max_layouts: Compiled layouts kept in memory
+            max_slots: Total slots across compiled layouts kept in memory
+            region_margin: Padding around each layout's slot area
+            scoring: Optional OccupancyDetector keyword arguments applied
+                to every layout
+            engine: Occupancy engine of lots not in lot_engines
+            lot_engines: Optional dictionary mapping lot_id to engine
+            profile_defaults: Optional InferenceProfile settings of lots
+                without their own PROFILE_FILE values
+        """
+        self.root = root
+        self.pattern = pattern
+        self.max_layouts = max_layouts
+        self.max_slots = max_slots
+        self.region_margin = region_margin
+        self.scoring = scoring
+        self.engine = engine
+        self.lot_engines = dict(lot_engines or {})
+        self.profile_defaults = profile_defaults
+
+        self.loads = 0
+        self._paths = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.discover()
+
+    def discover(self):
+        """
+        Rescan root for layout files
+
+        Returns:
+            Sorted list of lot ids
+        """
+        paths = {}
+        for path in sorted(Path(self.root).glob(self.pattern)):
+            if path.suffix in (".json", BINARY_SUFFIX):
+                paths.setdefault(path.parent.name, []).append(str(path))
+
+        with self._lock:
+            self._paths = paths
+        return sorted(paths)
+
+    def lot_ids(self):
+        """Sorted list of known lot ids"""
+        with self._lock:
+            return sorted(self._paths)
+
+    def get(self, lot_id):
+        """
+        Return the compiled layout for a lot, loading or reloading as needed
+
+        Args:
+            lot_id: Identifier of the lot
+
+        Returns:
+            Layout
+
+        Raises:
+            KeyError: If no layout file exists for lot_id
+        """
+        with self._lock:
+            paths = self._paths.get(lot_id)
+
+        if paths is None:
+            self.discover()
+            with self._lock:
+                paths = self._paths.get(lot_id)
+            if paths is None:
+                raise KeyError(lot_id)
+
+        # Checked on every call so an edit to either file is picked up
+        path, mtime = _newest_layout(paths)
+        if path is None:
+            with self._lock:
+                self._cache.pop(lot_id, None)
+                self._paths.pop(lot_id, None)
+            raise KeyError(lot_id)
+
+        with self._lock:
+            layout = self._cache.get(lot_id)
+            if (layout is not None and layout.mtime == mtime and layout.path == path
+                    and not layout.files_changed()):
+                self._cache.move_to_end(lot_id)
+                return layout
+
+        # Compile outside the lock so other lots stay available
+        layout = Layout(lot_id, path, self.region_margin, self.scoring, self.engine_for(lot_id),
+                        self.profile_defaults)
+
+        with self._lock:
+            self.loads += 1
+            self._cache[lot_id] = layout
+            self._cache.move_to_end(lot_id)
+            self._evict()
+
+        return layout
+
+    def engine_for(self, lot_id):
+        """Occupancy engine configured for a lot"""
+        return self.lot_engines.get(lot_id, self.engine)
+
+    def stats(self):
+        """Cache occupancy for monitoring"""
+        with self._lock:
+            return {
+                'known': len(self._paths),
+                'cached': len(self._cache),
+                'cached_slots': sum(len(layout) for layout in self._cache.values()),
+                'loads': self.loads,
+            }
+
+    def _evict(self):
+        """Drop least recently used layouts beyond the limits (lock held)"""
+        total = sum(len(layout) for layout in self._cache.values())
+
+        while len(self._cache) > 1 and (
+            len(self._cache) > self.max_layouts or total > self.max_slots
+        ):
+            _, layout = self._cache.popitem(last=False)
+            total -= len(layout)
@@ -0,0 +1,247 @@
+import json
+import threading
+import time
+from collections import deque
+
+
+def encode_event(kind, payload):
+    """
+    Encode one server-sent event
+
+    Args:
+        kind: Event name ('snapshot' or 'diff')
+        payload: JSON-serializable dictionary with a 'seq' entry
+
+    Returns:
+        Event bytes, ready to write to every subscriber
+    """
+    data = json.dumps(payload, separators=(',', ':'))
+    return f"id: {payload['seq']}\nevent: {kind}\ndata: {data}\n\n".encode()
+
+
+class Subscription:
+    """One client's bounded queue of encoded events for a lot"""
+
+    def __init__(self, feed, lot_id, max_pending, notify=None):
+        """
+        Initialize subscription; use LiveFeed.subscribe() instead
+
+        Args:
+            feed: LiveFeed the subscription belongs to
+            lot_id: Lot whose events are delivered
+            max_pending: Events queued before the client is considered slow
+            notify: Optional callable run on the publisher's thread whenever
+                an event is ready, for readers that cannot block in get()
+        """
+        self.feed = feed
+        self.lot_id = lot_id
+        self.max_pending = max_pending
+        self.notify = notify
+        self.dropped = 0
+        self.resyncs = 0
+
+        self._events = deque()
+        # The first read returns a snapshot of the lot
+        self._resync = True
+        self._cond = threading.Condition()
+
+    def get(self, timeout=None):
+        """
+        Wait for the next event
+
+        Args:
+            timeout: Seconds to wait, None to wait forever
+
+        Returns:
+            Encoded event bytes, or None if nothing arrived in time
+        """
+        with self._cond:
+            if not self._events and not self._resync:
+                self._cond.wait(timeout)
+
+            if not self._resync:
+                return self._events.popleft() if self._events else None
+            self._resync = False
+
+        # Diffs carry absolute slot states, so ones queued while the
+        # snapshot is built are safe to apply after it
+        return self.feed.snapshot_event(self.lot_id)
+
+    def pending(self):
+        """Number of events queued for this client"""
+        with self._cond:
+            return len(self._events)
+
+    def _push(self, event):
+        """Queue an event without blocking the publisher"""
+        with self._cond:
+            if self._resync:
+                # The snapshot about to be sent already includes it
+                return
+
+            if len(self._events) >= self.max_pending:
+                # A client this far behind gets a fresh snapshot instead of
+                # an ever-growing backlog of diffs
+                self.dropped += len(self._events) + 1
+                self.resyncs += 1
+                self.feed._count_dropped(len(self._events) + 1)
+                self._events.clear()
+                self._resync = True
+            else:
+                self._events.append(event)
+
+            self._cond.notify()
+
+        if self.notify is not None:
+            self.notify()
+
+
+class LiveFeed:
+    """Fans per-slot occupancy changes out from the pipeline to many subscribers"""
+
+    def __init__(self, max_pending=64, max_subscribers=1000):
+        """
+        Initialize live feed
+
+        Args:
+            max_pending: Events queued per subscriber before it is resynced
+            max_subscribers: Concurrent subscriptions accepted across lots
+        """
+        self.max_pending = max_pending
+        self.max_subscribers = max_subscribers
+        self.published = 0
+        self.dropped = 0
+
+        self._lots = {}
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, lot_id, notify=None):
+        """
+        Start receiving a lot's events
+
+        Args:
+            lot_id: Identifier of the lot
+            notify: Optional callable run whenever an event is ready; it
+                must not block, as the publisher calls it
+
+        Returns:
+            Subscription, or None if max_subscribers is reached
+        """
+        with self._lock:
+            if self._subscriber_count() >= self.max_subscribers:
+                return None
+            subscription = Subscription(self, lot_id, self.max_pending, notify)
+            self._subscribers.setdefault(lot_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stop delivering events to a subscription"""
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.lot_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.lot_id]
+
+    def subscriber_count(self):
+        """Number of active subscriptions across lots"""
+        with self._lock:
+            return self._subscriber_count()
+
+    def _subscriber_count(self):
+        """subscriber_count() with the lock already held"""
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, lot_id, predictions, timestamp=None):
+        """
+        Send the slots that changed since the lot's previous frame
+
+        A frame whose slot ids differ from the previous one (first frame,
+        reloaded layout) is sent as a full snapshot instead.
+
+        Args:
+            lot_id: Lot the predictions belong to
+            predictions: Dictionary mapping slot_id to occupancy status
+            timestamp: Capture time in epoch seconds, defaults to now
+
+        Returns:
+            Number of slots sent
+        """
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        state = {str(slot_id): 1 if flag else 0 for slot_id, flag in predictions.items()}
+
+        with self._lock:
+            lot = self._lots.get(lot_id)
+
+            if lot is not None and lot['state'].keys() == state.keys():
+                previous = lot['state']
+                slots = {slot_id: flag for slot_id, flag in state.items() if previous[slot_id] != flag}
+                kind = 'diff'
+                if not slots:
+                    lot['timestamp'] = timestamp
+                    lot['snapshot'] = None
+                    return 0
+            else:
+                slots = state
+                kind = 'snapshot'
+
+            seq = lot['seq'] + 1 if lot is not None else 1
+            self._lots[lot_id] = lot = {'seq': seq, 'state': state, 'timestamp': timestamp, 'snapshot': None}
+            event = encode_event(kind, self._payload(lot_id, lot, slots))
+            self.published += 1
+
+            # Encoded once, queued for every subscriber; pushes never block,
+            # and delivering under the lock keeps each client's events in order
+            for subscription in self._subscribers.get(lot_id, ()):
+                subscription._push(event)
+
+        return len(slots)
+
+    def snapshot_event(self, lot_id):
+        """
+        Full state of a lot as an encoded 'snapshot' event
+
+        Args:
+            lot_id: Identifier of the lot
+
+        Returns:
+            Event bytes; a lot with no frames yet has seq 0 and no slots
+        """
+        with self._lock:
+            lot = self._lots.get(lot_id)
+            if lot is None:
+                return encode_event('snapshot', {'lot_id': lot_id, 'seq': 0, 'timestamp': None,
+                                                 'total': 0, 'occupied': 0, 'slots': {}})
+
+            # Shared by every client that (re)subscribes before the next change
+            if lot['snapshot'] is None:
+                lot['snapshot'] = encode_event('snapshot', self._payload(lot_id, lot, lot['state']))
+            return lot['snapshot']
+
+    def stats(self):
+        """Fan-out counters for monitoring"""
+        with self._lock:
+            return {
+                'lots': len(self._lots),
+                'subscribers': self._subscriber_count(),
+                'published': self.published,
+                'dropped': self.dropped,
+            }
+
+    def _count_dropped(self, count):
+        # Called from _push with the feed lock held
+        self.dropped += count
+
+    @staticmethod
+    def _payload(lot_id, lot, slots):
+        state = lot['state']
+        occupied = sum(state.values())
+        return {
+            'lot_id': lot_id,
+            'seq': lot['seq'],
+            'timestamp': lot['timestamp'],
+            'total': len(state),
+            'occupied': occupied,
+            'slots': slots,
+        }
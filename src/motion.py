@@ -0,0 +1,150 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Cheap per-slot frame differencing that decides when to run inference"""
+
+    def __init__(self, slots, scale=0.25, pixel_threshold=25, changed_ratio=0.05, margin=32):
+        """
+        Initialize motion gate
+
+        Args:
+            slots: Dictionary mapping slot_id to polygon coordinates
+            scale: Downscale factor applied before differencing
+            pixel_threshold: Grey-level difference that counts as a change
+            changed_ratio: Fraction of a slot's pixels that must change
+            margin: Padding in pixels around the changed region crop
+        """
+        self.slot_ids = list(slots.keys())
+        self.polygons = [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in slots.values()]
+        self.scale = scale
+        self.pixel_threshold = pixel_threshold
+        self.changed_ratio = changed_ratio
+        self.margin = margin
+
+        self.reference = None
+        self._shape = None
+        self._labels = None
+        self._counts = None
+        self._overlapped = []
+        self._bounds = np.array([
+            [*p.min(axis=0), *p.max(axis=0)] for p in self.polygons
+        ]).reshape(-1, 4)
+
+    def reset(self):
+        """Drop the reference frame; the next frame always needs inference"""
+        self.reference = None
+
+    def check(self, img):
+        """
+        Compare a frame with the last frame that was sent to inference
+
+        Args:
+            img: Input image (numpy array, BGR)
+
+        Returns:
+            Tuple (needs_inference, changed, region) where changed is a
+            boolean array in slot order and region is the (x1, y1, x2, y2)
+            crop covering the changed slots, or None
+        """
+        small = self._prepare(img)
+
+        if self.reference is None:
+            changed = np.ones(len(self.slot_ids), dtype=bool)
+        else:
+            moved = cv2.absdiff(small, self.reference) > self.pixel_threshold
+            hits = np.bincount(self._labels.ravel(), weights=moved.ravel(),
+                               minlength=len(self.slot_ids) + 1)[1:]
+            flat = moved.ravel()
+            for i, pixels in self._overlapped:
+                hits[i] = np.count_nonzero(flat[pixels])
+            changed = hits > self.changed_ratio * self._counts
+
+        if not changed.any():
+            return False, changed, None
+
+        return True, changed, self._region(changed, img.shape)
+
+    def accept(self, img, evaluated=None):
+        """
+        Make this frame the reference after inference ran on it
+
+        Args:
+            img: Input image (numpy array, BGR)
+            evaluated: Optional boolean array in slot order of the slots
+                whose occupancy was re-evaluated; the others keep their old
+                reference, so slow changes there still add up
+        """
+        small = self._prepare(img)
+
+        if evaluated is None or self.reference is None:
+            self.reference = small
+            return
+
+        # Label 0 is outside every slot and never compared
+        selected = np.concatenate(([True], np.asarray(evaluated, dtype=bool)))
+        mask = selected[self._labels]
+        self.reference[mask] = small[mask]
+
+    def _prepare(self, img):
+        """Downscaled grey frame; builds slot label maps for new frame sizes"""
+        h, w = img.shape[:2]
+        size = (max(1, int(w * self.scale)), max(1, int(h * self.scale)))
+
+        if self._shape != (h, w):
+            self._build_labels(size)
+            self._shape = (h, w)
+            self.reference = None
+
+        grey = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        return cv2.resize(grey, size, interpolation=cv2.INTER_AREA)
+
+    def _build_labels(self, size):
+        """
+        Rasterise slots at the downscaled size, one label per slot
+
+        Where slots overlap, the later one owns the shared pixels in the
+        label map; slots that lose pixels that way keep their full mask as
+        flat pixel indices, so a slot covered by another is still compared.
+        """
+        width, height = size
+        labels = np.zeros((height, width), dtype=np.int32)
+        points = [np.round(polygon * self.scale).astype(np.int32).reshape(-1, 1, 2) for polygon in self.polygons]
+
+        for i, pts in enumerate(points):
+            cv2.fillPoly(labels, [pts], i + 1)
+
+        counts = np.bincount(labels.ravel(), minlength=len(self.slot_ids) + 1)[1:]
+        self._overlapped = []
+
+        for i, pts in enumerate(points):
+            # The slot's own mask, drawn in its bounding box
+            x0, y0 = pts.reshape(-1, 2).min(axis=0)
+            x1, y1 = pts.reshape(-1, 2).max(axis=0)
+            mask = np.zeros((y1 - y0 + 1, x1 - x0 + 1), dtype=np.uint8)
+            cv2.fillPoly(mask, [pts - (x0, y0)], 1)
+            ys, xs = np.nonzero(mask)
+            ys, xs = ys + y0, xs + x0
+            inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+
+            if np.count_nonzero(inside) > counts[i]:
+                self._overlapped.append((i, ys[inside] * width + xs[inside]))
+                counts[i] = np.count_nonzero(inside)
+
+        self._labels = labels
+        self._counts = np.maximum(counts, 1)
+
+    def _region(self, changed, shape):
+        """Padded bounding box of the changed slots in full-size pixels"""
+        h, w = shape[:2]
+        bounds = self._bounds[changed]
+
+        x1 = max(int(bounds[:, 0].min()) - self.margin, 0)
+        y1 = max(int(bounds[:, 1].min()) - self.margin, 0)
+        x2 = min(int(np.ceil(bounds[:, 2].max())) + self.margin, w)
+        y2 = min(int(np.ceil(bounds[:, 3].max())) + self.margin, h)
+
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return x1, y1, x2, y2
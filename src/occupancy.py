@@ -1,18 +1,90 @@
-from shapely.geometry import Polygon
+from .geometry import SlotGeometry
+from .metrics import REGISTRY
+
+SLOTS_EVALUATED = REGISTRY.counter(
+    'parking_slots_evaluated_total', 'Slot occupancy decisions made')
+
+# 'any': a slot is occupied if any box overlaps it at all
+# 'overlap': a box must cover enough of the slot (and the slot enough of the box)
+SCORING_MODES = ('any', 'overlap')
+
 
 class OccupancyDetector:
-    def __init__(self, slots):
+    def __init__(self, slots, mode='any', slot_threshold=0.3, box_threshold=0.0, assign=False):
         """
         Initialize occupancy detector with parking slot polygons
         
         Args:
             slots: Dictionary mapping slot_id to list of polygon coordinates
+            mode: Scoring mode, one of SCORING_MODES
+            slot_threshold: 'overlap' mode; minimum fraction of the slot's
+                area a box must cover
+            box_threshold: 'overlap' mode; minimum fraction of the box's
+                area that must lie inside the slot
+            assign: 'overlap' mode; count each box only for the slot it
+                overlaps most, so a car straddling a line fills one slot
         """
-        self.slots = {}
+        if mode not in SCORING_MODES:
+            raise ValueError(f"Unknown occupancy mode '{mode}'. Choose from: {', '.join(SCORING_MODES)}")
+
+        self.mode = mode
+        self.slot_threshold = slot_threshold
+        self.box_threshold = box_threshold
+        self.assign = assign
+
+        # Slot polygons compiled once into arrays for batched overlap tests
+        self.geometry = SlotGeometry(slots)
 
-        for slot_id, polygon in slots.items():
-            poly = Polygon(polygon)
-            self.slots[slot_id] = poly
+    def overlap_ratios(self, boxes):
+        """
+        Compute the fraction of each slot covered by each car box
+
+        Args:
+            boxes: List of car bounding boxes [(x1, y1, x2, y2), ...]
+
+        Returns:
+            Array of overlap ratios, shape (slots, boxes), rows in slot order
+        """
+        return self.geometry.overlap_ratios(boxes)
+
+    def scores(self, boxes):
+        """
+        Overlap fractions behind each slot's decision
+
+        Args:
+            boxes: List of car bounding boxes [(x1, y1, x2, y2), ...]
+
+        Returns:
+            Dictionary mapping slot_id to {'slot_overlap', 'box_overlap'}:
+            the largest fraction of the slot covered by one box, and the
+            largest fraction of one box inside the slot
+        """
+        slot_coverage, box_coverage = self.geometry.coverage(
+            boxes, assign=self.mode == 'overlap' and self.assign)
+
+        return {
+            slot_id: {'slot_overlap': round(float(s), 4), 'box_overlap': round(float(b), 4)}
+            for slot_id, s, b in zip(self.geometry.slot_ids, slot_coverage, box_coverage)
+        }
+
+    def occupied_mask(self, boxes, slot_mask=None):
+        """
+        Occupancy of every slot under the configured scoring mode
+
+        Args:
+            boxes: List of car bounding boxes [(x1, y1, x2, y2), ...]
+            slot_mask: Optional boolean array selecting the slots to evaluate;
+                unselected slots are reported as vacant
+
+        Returns:
+            Boolean array in slot order
+        """
+        if self.mode == 'overlap':
+            return self.geometry.scored_mask(
+                boxes, self.slot_threshold, self.box_threshold,
+                assign=self.assign, slot_mask=slot_mask
+            )
+        return self.geometry.occupied_mask(boxes, slot_mask=slot_mask)
 
     def predict(self, boxes):
         """
@@ -24,25 +96,10 @@ class OccupancyDetector:
         Returns:
             Dictionary mapping slot_id to occupancy status (True/False)
         """
-        predictions = {}
-
-        for slot_id, slot_poly in self.slots.items():
-            occupied = False
-
-            for (x1, y1, x2, y2) in boxes:
-                # Create polygon from bounding box
-                car_poly = Polygon([
-                    (x1, y1),
-                    (x2, y1),
-                    (x2, y2),
-                    (x1, y2)
-                ])
-
-                # Check if there's any intersection
-                if slot_poly.intersection(car_poly).area > 0:
-                    occupied = True
-                    break
-
-            predictions[slot_id] = occupied
+        occupied = self.occupied_mask(boxes)
+        SLOTS_EVALUATED.inc(len(occupied))
 
-        return predictions
+        return {
+            slot_id: bool(flag)
+            for slot_id, flag in zip(self.geometry.slot_ids, occupied)
+        }
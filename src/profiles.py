@@ -0,0 +1,142 @@
+import json
+
+# COCO class ids of the vehicles a profile can count as occupying a slot
+VEHICLE_CLASSES = {'car': 2, 'motorcycle': 3, 'bus': 5, 'truck': 7}
+CLASS_ALIASES = {'cars': 'car', 'motorbike': 'motorcycle', 'motorbikes': 'motorcycle',
+                 'motorcycles': 'motorcycle', 'buses': 'bus', 'trucks': 'truck'}
+
+# Per-lot overrides, next to the lot's slots file
+PROFILE_FILE = "profile.json"
+
+# YOLO input sizes must be a multiple of the model's largest stride
+STRIDE = 32
+
+# Settings of a profile nobody overrode; config.py takes its environment
+# defaults from here, so the server and the tools detect alike
+PROFILE_DEFAULTS = {'imgsz': 640, 'conf': 0.5, 'iou': 0.45, 'max_det': 300, 'classes': 'car'}
+
+
+class InferenceProfile:
+    """Detector settings used for one lot's camera"""
+
+    FIELDS = ('imgsz', 'conf', 'iou', 'max_det', 'classes')
+
+    def __init__(self, imgsz=PROFILE_DEFAULTS['imgsz'], conf=PROFILE_DEFAULTS['conf'],
+                 iou=PROFILE_DEFAULTS['iou'], max_det=PROFILE_DEFAULTS['max_det'],
+                 classes=PROFILE_DEFAULTS['classes']):
+        """
+        Initialize and validate a profile
+
+        Args:
+            imgsz: Model input size (longest side), a multiple of STRIDE
+            conf: Minimum detection confidence
+            iou: IoU threshold of the model's non-maximum suppression
+            max_det: Maximum detections kept per image (or tile)
+            classes: Vehicle class names from VEHICLE_CLASSES, as a list or
+                a comma-separated string
+
+        Raises:
+            ValueError: If a value is out of range or a class is unknown
+        """
+        if isinstance(classes, str):
+            classes = [name for name in classes.split(',') if name.strip()]
+        names = [CLASS_ALIASES.get(name.strip().lower(), name.strip().lower()) for name in classes]
+
+        unknown = [name for name in names if name not in VEHICLE_CLASSES]
+        if unknown or not names:
+            raise ValueError(f"Unknown vehicle classes {unknown or classes}. "
+                             f"Choose from: {', '.join(VEHICLE_CLASSES)}")
+        if int(imgsz) <= 0 or int(imgsz) % STRIDE:
+            raise ValueError(f"imgsz must be a positive multiple of {STRIDE}, got {imgsz}")
+        if not 0 <= float(conf) <= 1 or not 0 <= float(iou) <= 1:
+            raise ValueError("conf and iou must be between 0 and 1")
+        if int(max_det) <= 0:
+            raise ValueError("max_det must be positive")
+
+        self.imgsz = int(imgsz)
+        self.conf = float(conf)
+        self.iou = float(iou)
+        self.max_det = int(max_det)
+        self.classes = tuple(sorted(set(names), key=list(VEHICLE_CLASSES).index))
+        self.class_ids = [VEHICLE_CLASSES[name] for name in self.classes]
+
+    def __eq__(self, other):
+        return isinstance(other, InferenceProfile) and self.to_dict() == other.to_dict()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return f"InferenceProfile({', '.join(f'{k}={v!r}' for k, v in self.to_dict().items())})"
+
+    def key(self):
+        """Hashable identity, e.g. for grouping images by profile"""
+        return (self.imgsz, self.conf, self.iou, self.max_det, self.classes)
+
+    def to_dict(self):
+        """JSON-serializable settings"""
+        return {'imgsz': self.imgsz, 'conf': self.conf, 'iou': self.iou,
+                'max_det': self.max_det, 'classes': list(self.classes)}
+
+    def replace(self, **changes):
+        """Copy of the profile with some settings changed"""
+        return InferenceProfile(**{**self.to_dict(), **changes})
+
+    def predict_kwargs(self):
+        """Keyword arguments for an ultralytics model call"""
+        return {'imgsz': self.imgsz, 'conf': self.conf, 'iou': self.iou,
+                'max_det': self.max_det, 'classes': self.class_ids}
+
+
+def load_profile(path, defaults=None):
+    """
+    Build a lot's profile from defaults and its optional profile file
+
+    Args:
+        path: PROFILE_FILE of the lot; a missing file means no overrides
+        defaults: Optional dictionary of InferenceProfile settings
+
+    Returns:
+        InferenceProfile
+
+    Raises:
+        ValueError: If the file sets an unknown or invalid setting
+    """
+    settings = dict(defaults or {})
+
+    try:
+        with open(path) as f:
+            overrides = json.load(f)
+    except FileNotFoundError:
+        overrides = {}
+
+    unknown = set(overrides) - set(InferenceProfile.FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown settings in {path}: {', '.join(sorted(unknown))}")
+
+    settings.update(overrides)
+    return InferenceProfile(**settings)
+
+
+def save_profile(path, profile, fields=None):
+    """
+    Write a lot's profile overrides, keeping others already in the file
+
+    Args:
+        path: PROFILE_FILE of the lot
+        profile: InferenceProfile to store
+        fields: Optional settings to write; others keep following the
+            defaults
+    """
+    try:
+        with open(path) as f:
+            settings = json.load(f)
+    except FileNotFoundError:
+        settings = {}
+
+    values = profile.to_dict()
+    settings.update({name: values[name] for name in (fields or InferenceProfile.FIELDS)})
+
+    with open(path, "w") as f:
+        json.dump(settings, f, indent=2)
+        f.write("\n")
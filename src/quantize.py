@@ -0,0 +1,98 @@
+import cv2
+import numpy as np
+
+
+def letterbox(img, imgsz=640, pad_value=114):
+    """
+    Resize keeping aspect ratio and pad to a square model input
+
+    Args:
+        img: Input image (numpy array, BGR)
+        imgsz: Model input size
+        pad_value: Grey level of the padding
+
+    Returns:
+        Float32 array, shape (1, 3, imgsz, imgsz), RGB in [0, 1]
+    """
+    h, w = img.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    nh, nw = int(round(h * scale)), int(round(w * scale))
+
+    resized = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((imgsz, imgsz, 3), pad_value, dtype=np.uint8)
+    top, left = (imgsz - nh) // 2, (imgsz - nw) // 2
+    canvas[top:top + nh, left:left + nw] = resized
+
+    blob = canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return blob[None]
+
+
+class ImageCalibrationReader:
+    """Feeds letterboxed images to ONNX Runtime static quantization"""
+
+    def __init__(self, input_name, images, imgsz=640):
+        """
+        Args:
+            input_name: Name of the model input tensor
+            images: Iterable of BGR images (numpy arrays)
+            imgsz: Model input size
+        """
+        self.input_name = input_name
+        self.images = list(images)
+        self.imgsz = imgsz
+        self._iter = iter(self.images)
+
+    def get_next(self):
+        img = next(self._iter, None)
+        if img is None:
+            return None
+        return {self.input_name: letterbox(img, self.imgsz)}
+
+    def rewind(self):
+        self._iter = iter(self.images)
+
+
+def quantize_onnx(onnx_path, output_path, calibration_images=None, imgsz=640):
+    """
+    Quantize an exported YOLOv8 ONNX model to INT8
+
+    With calibration images, activations and weights are quantized
+    statically (QDQ format). Without, only weights are quantized and
+    activations are quantized on the fly at runtime.
+
+    Args:
+        onnx_path: Path of the fp32 ONNX model
+        output_path: Path to write the INT8 model to
+        calibration_images: Optional list of BGR images for calibration
+        imgsz: Model input size used when exporting
+
+    Returns:
+        output_path
+    """
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationMethod, QuantFormat, QuantType, quantize_dynamic, quantize_static,
+    )
+
+    model = onnx.load(onnx_path)
+
+    if calibration_images:
+        reader = ImageCalibrationReader(model.graph.input[0].name, calibration_images, imgsz)
+        quantize_static(
+            onnx_path, output_path, reader,
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+            calibrate_method=CalibrationMethod.MinMax,
+        )
+    else:
+        quantize_dynamic(onnx_path, output_path, weight_type=QuantType.QUInt8)
+
+    # Keep the ultralytics metadata (class names, stride, imgsz)
+    quantized = onnx.load(output_path)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(model.metadata_props)
+    onnx.save(quantized, output_path)
+
+    return output_path
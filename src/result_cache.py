@@ -0,0 +1,133 @@
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    """Content-addressed LRU cache of detection results with a TTL"""
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, ttl=300):
+        """
+        Initialize result cache
+
+        Args:
+            max_entries: Results kept before the least recently used is dropped
+            max_bytes: Approximate memory budget for cached results
+            ttl: Seconds a result stays valid, None to never expire
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(data, *versions):
+        """
+        Cache key for uploaded image bytes
+
+        Args:
+            data: Raw upload bytes
+            versions: Strings naming everything else the result depends on
+                (layout version, model version, ...)
+
+        Returns:
+            Hex digest string
+        """
+        digest = hashlib.blake2b(data, digest_size=16)
+        for version in versions:
+            digest.update(b"\0" + str(version).encode())
+        return digest.hexdigest()
+
+    def get(self, key, require=None):
+        """
+        Look up a cached result
+
+        Args:
+            key: Key from ResultCache.key()
+            require: Optional field the cached result must contain
+
+        Returns:
+            Copy of the cached result dictionary, or None on a miss
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and self.ttl is not None and now - entry[0] > self.ttl:
+                self._drop(key)
+                entry = None
+
+            if entry is None or (require is not None and require not in entry[1]):
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, key, result):
+        """
+        Store a result, evicting old entries beyond the limits
+
+        Args:
+            key: Key from ResultCache.key()
+            result: JSON-serializable result dictionary
+        """
+        if self.max_entries <= 0:
+            return
+
+        size = _result_size(result)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+            self._entries[key] = (time.monotonic(), dict(result), size)
+            self.size += size
+
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def _drop(self, key):
+        """Remove one entry (caller holds the lock)"""
+        _, _, size = self._entries.pop(key)
+        self.size -= size
+
+
+def _result_size(result):
+    """Approximate memory held by a result; dominated by the image string"""
+    return sys.getsizeof(result) + sum(
+        sys.getsizeof(value) for value in result.values()
+    )
@@ -0,0 +1,335 @@
+import cv2
+import numpy as np
+
+from .occupancy import SLOTS_EVALUATED
+
+# Width and height of the patch every slot is warped to
+PATCH_SIZE = (32, 32)
+
+# Gradient histogram layout: cells x cells grid, orientation bins per cell
+HOG_CELLS = 4
+HOG_BINS = 9
+
+# Slots smaller than this (px^2) cannot be warped and are reported vacant
+MIN_SLOT_AREA = 1.0
+
+
+def slot_quad(polygon):
+    """
+    Four corners a slot polygon is warped from
+
+    Polygons that are not quadrilaterals once repeated vertices are
+    dropped (annotated triangles, for one) use their minimum-area
+    rectangle. Corners run clockwise on screen from the top-left one,
+    turned so the first edge lies along the slot's long side and every
+    patch shares an orientation.
+
+    Args:
+        polygon: Slot polygon coordinates
+
+    Returns:
+        float32 array of shape (4, 2)
+    """
+    pts = np.unique(np.asarray(polygon, dtype=np.float32).reshape(-1, 2), axis=0)
+    if len(pts) != 4:
+        pts = cv2.boxPoints(cv2.minAreaRect(pts))
+
+    centre = pts.mean(axis=0)
+    pts = pts[np.argsort(np.arctan2(pts[:, 1] - centre[1], pts[:, 0] - centre[0]))]
+    pts = np.roll(pts, -int(np.argmin(pts.sum(axis=1))), axis=0)
+
+    if np.linalg.norm(pts[1] - pts[0]) < np.linalg.norm(pts[3] - pts[0]):
+        pts = np.roll(pts, 1, axis=0)
+    return pts
+
+
+class SlotWarper:
+    """Cuts every slot of a frame out as a fixed-size patch in one remap"""
+
+    def __init__(self, slots, patch_size=PATCH_SIZE):
+        """
+        Precompute the perspective warp of every slot
+
+        The slots' patch-to-frame homographies are sampled once into a
+        single remap table that tiles all patches in a grid, so warping a
+        frame is one cv2.remap call whatever the number of slots.
+
+        Args:
+            slots: Dictionary mapping slot_id to polygon coordinates
+            patch_size: (width, height) of each patch
+        """
+        self.slot_ids = list(slots.keys())
+        self.patch_size = tuple(patch_size)
+        width, height = self.patch_size
+        count = len(self.slot_ids)
+
+        quads = np.array([slot_quad(polygon) for polygon in slots.values()], dtype=np.float32).reshape(-1, 4, 2)
+        x, y = quads[..., 0], quads[..., 1]
+        areas = 0.5 * np.abs((x * np.roll(y, -1, axis=1) - np.roll(x, -1, axis=1) * y).sum(axis=1))
+        self.valid = areas >= MIN_SLOT_AREA
+
+        patch = np.float32([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]])
+        homographies = np.array([
+            cv2.getPerspectiveTransform(patch, quad) if valid else np.zeros((3, 3))
+            for quad, valid in zip(quads, self.valid)
+        ]).reshape(-1, 3, 3)
+
+        # Frame coordinates of every patch pixel, shape (slots, 2, height * width)
+        gx, gy = np.meshgrid(np.arange(width), np.arange(height))
+        grid = np.stack([gx.ravel(), gy.ravel(), np.ones(gx.size)])
+        mapped = homographies @ grid
+        w = np.where(np.abs(mapped[:, 2]) > 1e-12, mapped[:, 2], 1.0)
+        coords = np.where(self.valid[:, None, None], mapped[:, :2] / w[:, None], -1)
+
+        # Tile patches in a near-square grid; remap tables are limited to
+        # 32767 pixels per side
+        self.cols = max(1, int(np.ceil(np.sqrt(count))))
+        self.rows = max(1, int(np.ceil(count / self.cols)))
+        tiles = np.full((self.rows * self.cols, 2, height, width), -1, dtype=np.float32)
+        tiles[:count] = coords.reshape(count, 2, height, width)
+        tiles = tiles.reshape(self.rows, self.cols, 2, height, width).transpose(2, 0, 3, 1, 4)
+        tiles = tiles.reshape(2, self.rows * height, self.cols * width)
+
+        # Fixed-point maps remap noticeably faster than float ones
+        self.map1, self.map2 = cv2.convertMaps(tiles[0], tiles[1], cv2.CV_16SC2)
+
+    def __len__(self):
+        return len(self.slot_ids)
+
+    def warp(self, img):
+        """
+        Cut out every slot
+
+        Args:
+            img: Frame as a BGR image
+
+        Returns:
+            uint8 array of shape (slots, height, width, 3), in slot order;
+            parts of a slot outside the frame are black
+        """
+        width, height = self.patch_size
+        tiled = cv2.remap(img, self.map1, self.map2, cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+        patches = tiled.reshape(self.rows, height, self.cols, width, -1).transpose(0, 2, 1, 3, 4)
+        return patches.reshape(self.rows * self.cols, height, width, -1)[:len(self.slot_ids)]
+
+
+def patch_features(patches, cells=HOG_CELLS, bins=HOG_BINS):
+    """
+    Texture and colour features of slot patches
+
+    An empty slot is mostly flat asphalt and paint lines; a car adds
+    edges in many directions, highlights and colour. Per patch this is a
+    cells x cells grid of gradient orientation histograms (HOG without
+    block overlap), plus brightness, contrast, edge energy and saturation.
+
+    Args:
+        patches: uint8 array of shape (N, height, width, 3), BGR
+        cells: Histogram grid size per side
+        bins: Unsigned orientation bins per cell
+
+    Returns:
+        float32 array of shape (N, cells * cells * bins + 5)
+    """
+    count, height, width = patches.shape[:3]
+    if not count:
+        return np.zeros((0, cells * cells * bins + 5), dtype=np.float32)
+
+    # Patches stacked into one tall image, converted with single OpenCV calls
+    stacked = np.ascontiguousarray(patches).reshape(count * height, width, 3)
+    gray = cv2.cvtColor(stacked, cv2.COLOR_BGR2GRAY).astype(np.float32).reshape(count, height, width)
+    saturation = cv2.cvtColor(stacked, cv2.COLOR_BGR2HSV)[:, :, 1].reshape(count, -1) / np.float32(255)
+
+    gx = np.zeros_like(gray)
+    gy = np.zeros_like(gray)
+    gx[:, :, 1:-1] = gray[:, :, 2:] - gray[:, :, :-2]
+    gy[:, 1:-1, :] = gray[:, 2:, :] - gray[:, :-2, :]
+    magnitude, angle = cv2.cartToPolar(gx.reshape(-1, width), gy.reshape(-1, width), angleInDegrees=True)
+    magnitude = magnitude.reshape(count, height, width)
+
+    # Unsigned orientation bins; integer modulo is far cheaper than float
+    orientation = (angle.reshape(count, height, width) * (bins / 180)).astype(np.int64) % bins
+
+    # One bincount accumulates every patch's histograms
+    cell_y = np.minimum(np.arange(height) * cells // height, cells - 1)
+    cell_x = np.minimum(np.arange(width) * cells // width, cells - 1)
+    cell = (cell_y[:, None] * cells + cell_x[None, :]) * bins
+    size = cells * cells * bins
+    index = orientation + cell[None] + (np.arange(count) * size)[:, None, None]
+    hog = np.bincount(index.ravel(), weights=magnitude.ravel(), minlength=count * size).reshape(count, size)
+    hog /= np.linalg.norm(hog, axis=1, keepdims=True) + 1e-6
+
+    flat = gray.reshape(count, -1)
+    extra = np.stack([
+        flat.mean(axis=1) / 255,
+        flat.std(axis=1) / 255,
+        magnitude.reshape(count, -1).mean(axis=1) / 255,
+        saturation.mean(axis=1),
+        saturation.std(axis=1),
+    ], axis=1)
+
+    return np.hstack([hog, extra]).astype(np.float32)
+
+
+class SlotClassifier:
+    """Occupied/empty logistic regression over patch features"""
+
+    def __init__(self, weights, bias, mean, scale, patch_size=PATCH_SIZE,
+                 cells=HOG_CELLS, bins=HOG_BINS, threshold=0.5):
+        """
+        Initialize classifier; use fit() or load() to get one
+
+        Args:
+            weights: Feature weights, shape (F,)
+            bias: Intercept
+            mean: Feature means subtracted before weighting, shape (F,)
+            scale: Feature scales divided by before weighting, shape (F,)
+            patch_size: (width, height) of the patches it was trained on
+            cells: Gradient histogram grid size of the features
+            bins: Orientation bins of the features
+            threshold: Probability above which a slot is occupied
+        """
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.patch_size = tuple(int(v) for v in patch_size)
+        self.cells = int(cells)
+        self.bins = int(bins)
+        self.threshold = float(threshold)
+
+    def features(self, patches):
+        """Feature matrix of patches, shape (N, F)"""
+        return patch_features(patches, self.cells, self.bins)
+
+    def probabilities(self, patches):
+        """
+        Probability that each patch shows an occupied slot
+
+        Args:
+            patches: uint8 array of shape (N, height, width, 3)
+
+        Returns:
+            float32 array of shape (N,)
+        """
+        if not len(patches):
+            return np.zeros(0, dtype=np.float32)
+        logits = ((self.features(patches) - self.mean) / self.scale) @ self.weights + self.bias
+        return 1 / (1 + np.exp(-np.clip(logits, -50, 50)))
+
+    def predict(self, patches):
+        """Boolean occupancy of each patch"""
+        return self.probabilities(patches) > self.threshold
+
+    def save(self, path):
+        """Write the model to an .npz file"""
+        np.savez(path, weights=self.weights, bias=self.bias, mean=self.mean, scale=self.scale,
+                 patch_size=np.array(self.patch_size), cells=self.cells, bins=self.bins,
+                 threshold=self.threshold)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a model written by save()
+
+        Args:
+            path: .npz model file
+
+        Returns:
+            SlotClassifier
+        """
+        with np.load(path) as data:
+            return cls(data['weights'], data['bias'], data['mean'], data['scale'],
+                       patch_size=data['patch_size'], cells=data['cells'], bins=data['bins'],
+                       threshold=data['threshold'])
+
+    @classmethod
+    def fit(cls, patches, labels, l2=1.0, iterations=50, cells=HOG_CELLS, bins=HOG_BINS):
+        """
+        Train on labeled patches with Newton's method
+
+        Classes are weighted equally however unbalanced the labels are.
+
+        Args:
+            patches: uint8 array of shape (N, height, width, 3)
+            labels: Occupancy of each patch, shape (N,)
+            l2: L2 penalty on the feature weights
+            iterations: Maximum Newton steps
+            cells: Gradient histogram grid size
+            bins: Orientation bins per cell
+
+        Returns:
+            SlotClassifier
+        """
+        labels = np.asarray(labels, dtype=np.float64)
+        if len(np.unique(labels)) < 2:
+            raise ValueError("Training needs both occupied and empty patches")
+
+        features = patch_features(patches, cells, bins).astype(np.float64)
+        mean = features.mean(axis=0)
+        scale = features.std(axis=0) + 1e-6
+        x = np.hstack([(features - mean) / scale, np.ones((len(features), 1))])
+
+        positives = labels.mean()
+        sample_weight = np.where(labels > 0, 0.5 / positives, 0.5 / (1 - positives))
+        penalty = np.full(x.shape[1], l2)
+        penalty[-1] = 1e-6
+
+        w = np.zeros(x.shape[1])
+        for _ in range(iterations):
+            p = 1 / (1 + np.exp(-np.clip(x @ w, -50, 50)))
+            gradient = x.T @ (sample_weight * (p - labels)) + penalty * w
+            hessian = (x.T * (sample_weight * p * (1 - p))) @ x + np.diag(penalty)
+            step = np.linalg.solve(hessian, gradient)
+            w -= step
+            if np.abs(step).max() < 1e-6:
+                break
+
+        height, width = patches.shape[1:3]
+        return cls(w[:-1], w[-1], mean, scale, patch_size=(width, height), cells=cells, bins=bins)
+
+
+class ClassifierEngine:
+    """Slot occupancy from warped slot crops, all slots of a frame in one pass"""
+
+    def __init__(self, slots, classifier):
+        """
+        Initialize engine for a layout
+
+        Args:
+            slots: Dictionary mapping slot_id to polygon coordinates
+            classifier: Trained SlotClassifier
+        """
+        self.classifier = classifier
+        self.warper = SlotWarper(slots, classifier.patch_size)
+        self.slot_ids = self.warper.slot_ids
+
+    def probabilities(self, img):
+        """
+        Occupancy probability of every slot
+
+        Args:
+            img: Frame as a BGR image
+
+        Returns:
+            float32 array in slot order; slots too small to warp get 0
+        """
+        return np.where(self.warper.valid, self.classifier.probabilities(self.warper.warp(img)), 0)
+
+    def occupied_mask(self, img):
+        """Boolean occupancy of every slot, in slot order"""
+        return self.probabilities(img) > self.classifier.threshold
+
+    def predict(self, img):
+        """
+        Predict occupancy status for each parking slot
+
+        Args:
+            img: Frame as a BGR image
+
+        Returns:
+            Dictionary mapping slot_id to occupancy status (True/False)
+        """
+        occupied = self.occupied_mask(img)
+        SLOTS_EVALUATED.inc(len(occupied))
+
+        return {slot_id: bool(flag) for slot_id, flag in zip(self.slot_ids, occupied)}
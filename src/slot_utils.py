@@ -1,17 +1,174 @@
 import json
+import math
+import struct
+import zipfile
+
+import numpy as np
+
+from .geometry import flatten_polygons
+
+# Suffix of the binary layout format written by save_slot_arrays
+BINARY_SUFFIX = ".npz"
+
 
 def load_slots(json_path):
     """
-    Load parking slot polygons from JSON file
+    Load parking slot polygons from a JSON or binary (.npz) layout file
     
     Args:
-        json_path: Path to slots JSON file
+        json_path: Path to slots JSON file, or a layout written by
+            save_slot_arrays
     
     Returns:
-        Dictionary mapping slot_id (int) to list of polygon coordinates
+        Dictionary mapping slot_id (int) to polygon coordinates; binary
+        layouts give (K, 2) array views instead of nested lists
     """
+    if str(json_path).endswith(BINARY_SUFFIX):
+        return arrays_to_slots(*load_slot_arrays(json_path))
+
     with open(json_path, "r") as f:
         slots = json.load(f)
 
     # Convert string keys to integers
     return {int(k): v for k, v in slots.items()}
+
+
+def slots_to_arrays(slots):
+    """
+    Flatten slot polygons into id, offset and vertex arrays
+
+    Args:
+        slots: Dictionary mapping slot_id to polygon coordinates
+
+    Returns:
+        Tuple (ids, offsets, vertices): int64 ids (S,), int64 offsets (S + 1,)
+        where slot i owns vertices[offsets[i]:offsets[i + 1]], and float64
+        vertices (V, 2), so fractional annotations round-trip exactly
+    """
+    ids = np.fromiter(slots.keys(), dtype=np.int64, count=len(slots))
+    coords, offsets = flatten_polygons(slots.values())
+    vertices = coords.astype(np.float64)
+
+    return ids, offsets, vertices
+
+
+def arrays_to_slots(ids, offsets, vertices):
+    """
+    Slot dictionary over flattened layout arrays, without copying vertices
+
+    Args:
+        ids: Slot ids, shape (S,)
+        offsets: Vertex offsets, shape (S + 1,)
+        vertices: Vertex coordinates, shape (V, 2)
+
+    Returns:
+        Dictionary mapping slot_id (int) to a (K, 2) view of vertices
+    """
+    return dict(zip(ids.tolist(), np.split(vertices, offsets[1:-1])))
+
+
+def save_slot_arrays(slots, path):
+    """
+    Write slots in the binary layout format
+
+    Args:
+        slots: Dictionary mapping slot_id to polygon coordinates
+        path: Output path, normally ending in .npz
+
+    Returns:
+        Path written
+    """
+    ids, offsets, vertices = slots_to_arrays(slots)
+
+    # Uncompressed so loading is a straight read of each array
+    with open(path, "wb") as f:
+        np.savez(f, ids=ids, offsets=offsets, vertices=vertices)
+
+    return path
+
+
+def load_slot_arrays(path, mmap_mode="r"):
+    """
+    Load a layout as flattened arrays
+
+    Args:
+        path: Binary (.npz) or JSON layout file
+        mmap_mode: np.memmap mode for the binary format's arrays, None to
+            read them into memory
+
+    Returns:
+        Tuple (ids, offsets, vertices) as returned by slots_to_arrays
+    """
+    if not str(path).endswith(BINARY_SUFFIX):
+        return slots_to_arrays(load_slots(path))
+
+    names = ("ids", "offsets", "vertices")
+    if mmap_mode is not None:
+        arrays = _map_npz(path, names, mmap_mode)
+        if arrays is not None:
+            return arrays
+
+    with np.load(path) as data:
+        return tuple(data[name] for name in names)
+
+
+def _map_npz(path, names, mmap_mode):
+    """
+    Memory-map arrays stored uncompressed in an .npz archive
+
+    np.load ignores mmap_mode for archives, but save_slot_arrays stores each
+    .npy member as is, so its data can be mapped straight from the file.
+
+    Returns:
+        Tuple of arrays, or None if a member is compressed
+    """
+    arrays = []
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for name in names:
+            info = archive.getinfo(name + ".npy")
+            if info.compress_type != zipfile.ZIP_STORED:
+                return None
+
+            # Local file header: 30 bytes, then the name and extra field
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack("<HH", f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+
+            version = np.lib.format.read_magic(f)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) \
+                else np.lib.format.read_array_header_2_0
+            shape, fortran_order, dtype = read_header(f)
+
+            if math.prod(shape) == 0:
+                arrays.append(np.zeros(shape, dtype))
+            else:
+                mapped = np.memmap(path, dtype=dtype, mode=mmap_mode, offset=f.tell(), shape=shape,
+                                   order="F" if fortran_order else "C")
+                # Plain ndarray view; slicing np.memmap per slot is slow
+                arrays.append(np.asarray(mapped))
+    return tuple(arrays)
+
+
+def slots_region(slots, margin=0):
+    """
+    Bounding region covering every parking slot
+
+    Args:
+        slots: Dictionary mapping slot_id to list of polygon coordinates
+        margin: Padding in pixels added on every side
+
+    Returns:
+        Tuple (x1, y1, x2, y2) of ints, or None if there are no slots
+    """
+    points, _ = flatten_polygons(slots.values())
+    if not len(points):
+        return None
+
+    x1, y1 = points.min(axis=0)
+    x2, y2 = points.max(axis=0)
+    return (
+        max(0, int(x1) - margin),
+        max(0, int(y1) - margin),
+        int(math.ceil(x2)) + margin,
+        int(math.ceil(y2)) + margin,
+    )
@@ -0,0 +1,335 @@
+import argparse
+import math
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+from .metrics import STAGE_SECONDS
+from .motion import MotionGate
+from .tracker import OccupancyTracker
+from .visualize import draw_results
+
+# Marks the end of the stream as it moves through the stage queues
+_END = object()
+
+
+class FrameSkipper:
+    """Choose a frame stride that holds a target processing rate"""
+
+    def __init__(self, source_fps, target_fps=None, smoothing=0.2, adaptive=True):
+        """
+        Initialize frame skipper
+
+        Args:
+            source_fps: Frame rate of the input stream
+            target_fps: Frames per second to process, None for every frame
+                the pipeline can keep up with
+            smoothing: Weight of the newest latency sample in the average
+            adaptive: Widen the stride when detection is slower than the
+                target rate
+        """
+        self.source_fps = source_fps if source_fps and source_fps > 0 else 30.0
+        self.target_fps = target_fps
+        self.smoothing = smoothing
+        self.adaptive = adaptive
+        self.latency = None
+
+    def update(self, seconds):
+        """Record how long the slowest stage took for one frame"""
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += self.smoothing * (seconds - self.latency)
+
+    @property
+    def stride(self):
+        """Process one frame out of every `stride` source frames"""
+        fps = self.target_fps or self.source_fps
+        if self.adaptive and self.latency:
+            fps = min(fps, 1.0 / self.latency)
+        return max(1, math.ceil(self.source_fps / fps - 1e-9))
+
+
+class StreamProcessor:
+    """Pipelined decode / detect / occupancy / render over a video source"""
+
+    def __init__(self, detector, occupancy_detector, slots, target_fps=None,
+                 queue_size=4, output_path=None, on_change=None, flip_frames=1,
+                 motion_gate=None, crop_changed=False, adaptive=True):
+        """
+        Initialize stream processor
+
+        Args:
+            detector: Object with detect(img) returning car boxes
+            occupancy_detector: OccupancyDetector for the camera's slots
+            slots: Dictionary mapping slot_id to polygon coordinates
+            target_fps: Frames per second to process, None for adaptive only
+            queue_size: Capacity of each queue between stages
+            output_path: Optional video file receiving annotated frames
+            on_change: Optional callable(event) for occupancy changes
+            flip_frames: Consecutive frames needed before a slot changes state
+            motion_gate: Optional MotionGate; frames without slot changes
+                skip detection entirely
+            crop_changed: With a motion gate, run detection only on the
+                crop around the changed slots
+            adaptive: Skip extra frames when detection cannot keep up
+        """
+        self.detector = detector
+        self.occupancy_detector = occupancy_detector
+        self.slots = slots
+        self.target_fps = target_fps
+        self.queue_size = queue_size
+        self.output_path = output_path
+        self.on_change = on_change
+        self.flip_frames = flip_frames
+        self.motion_gate = motion_gate
+        self.crop_changed = crop_changed
+        self.adaptive = adaptive
+
+        self.stats = {
+            'frames_read': 0,
+            'frames_processed': 0,
+            'frames_skipped': 0,
+            'frames_gated': 0,
+            'events': 0,
+        }
+        self.error = None
+        self._stop = threading.Event()
+
+    def stop(self):
+        """Stop reading from the source; queued frames still finish"""
+        self._stop.set()
+
+    def run(self, source):
+        """
+        Process a video file, camera index or stream URL until it ends
+
+        Args:
+            source: Anything cv2.VideoCapture accepts
+
+        Returns:
+            Dictionary of run statistics
+        """
+        capture = cv2.VideoCapture(source)
+        if not capture.isOpened():
+            raise IOError(f"Cannot open video source: {source}")
+
+        skipper = FrameSkipper(capture.get(cv2.CAP_PROP_FPS), self.target_fps,
+                               adaptive=self.adaptive)
+
+        frames = queue.Queue(maxsize=self.queue_size)
+        detections = queue.Queue(maxsize=self.queue_size)
+        renders = queue.Queue(maxsize=self.queue_size)
+
+        stages = [
+            threading.Thread(target=self._decode, args=(capture, skipper, frames)),
+            threading.Thread(target=self._detect, args=(frames, detections, skipper)),
+            threading.Thread(target=self._occupancy, args=(detections, renders)),
+            threading.Thread(target=self._render, args=(renders, skipper.source_fps)),
+        ]
+
+        start = time.perf_counter()
+        for stage in stages:
+            stage.start()
+        for stage in stages:
+            stage.join()
+        capture.release()
+
+        if self.error is not None:
+            raise self.error
+
+        elapsed = time.perf_counter() - start
+        self.stats['seconds'] = round(elapsed, 3)
+        self.stats['processed_fps'] = round(self.stats['frames_processed'] / elapsed, 2) if elapsed else 0
+        return dict(self.stats)
+
+    def _decode(self, capture, skipper, frames):
+        """Read frames, decoding only the ones the skipper keeps"""
+        index = -1
+        next_index = 0
+
+        try:
+            while not self._stop.is_set():
+                if not capture.grab():
+                    break
+                index += 1
+                self.stats['frames_read'] += 1
+
+                if index < next_index:
+                    self.stats['frames_skipped'] += 1
+                    continue
+
+                ok, img = capture.retrieve()
+                if not ok:
+                    break
+
+                position = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                frames.put((index, position, img))
+                next_index = index + skipper.stride
+        finally:
+            frames.put(_END)
+
+    def _fail(self, error, inbox):
+        """Record a stage failure, stop the source and drain upstream"""
+        if self.error is None:
+            self.error = error
+        self._stop.set()
+
+        while inbox.get() is not _END:
+            pass
+
+    def _detect(self, frames, detections, skipper):
+        try:
+            while True:
+                item = frames.get()
+                if item is _END:
+                    break
+
+                index, position, img = item
+                changed = None
+                region = None
+
+                if self.motion_gate is not None:
+                    needed, changed, region = self.motion_gate.check(img)
+                    if not needed:
+                        self.stats['frames_gated'] += 1
+                        detections.put((index, position, img, [], changed))
+                        continue
+
+                start = time.perf_counter()
+                if self.crop_changed and region is not None:
+                    boxes = self._detect_region(img, region)
+                else:
+                    boxes = self.detector.detect(img)
+                elapsed = time.perf_counter() - start
+                skipper.update(elapsed)
+                STAGE_SECONDS.observe(elapsed, stage='stream_detect')
+
+                if self.motion_gate is not None:
+                    self.motion_gate.accept(img, changed)
+                detections.put((index, position, img, boxes, changed))
+        except Exception as e:
+            self._fail(e, frames)
+        finally:
+            detections.put(_END)
+
+    def _detect_region(self, img, region):
+        """Detect cars in a crop and map the boxes back to the frame"""
+        x1, y1, x2, y2 = region
+        boxes = self.detector.detect(img[y1:y2, x1:x2])
+        return [(bx1 + x1, by1 + y1, bx2 + x1, by2 + y1) for bx1, by1, bx2, by2 in boxes]
+
+    def _occupancy(self, detections, renders):
+        try:
+            self._track(detections, renders)
+        except Exception as e:
+            self._fail(e, detections)
+        finally:
+            renders.put(_END)
+
+    def _track(self, detections, renders):
+        tracker = OccupancyTracker(self.occupancy_detector, self.flip_frames)
+
+        while True:
+            item = detections.get()
+            if item is _END:
+                break
+
+            index, position, img, boxes, changed = item
+            start = time.perf_counter()
+            diffs = tracker.update(boxes, changed=changed)
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage='stream_occupancy')
+            self.stats['frames_processed'] += 1
+
+            if diffs:
+                self.stats['events'] += 1
+                if self.on_change is not None:
+                    self.on_change({
+                        'frame': index,
+                        'position': round(position, 3),
+                        'timestamp': diffs[0]['timestamp'],
+                        'changes': {diff['slot_id']: diff['occupied'] for diff in diffs},
+                    })
+
+            renders.put((img, tracker.snapshot()))
+
+    def _render(self, renders, source_fps):
+        writer = None
+
+        try:
+            while True:
+                item = renders.get()
+                if item is _END:
+                    break
+                if self.output_path is None:
+                    continue
+
+                img, predictions = item
+                start = time.perf_counter()
+                output = draw_results(img, self.slots, predictions)
+                STAGE_SECONDS.observe(time.perf_counter() - start, stage='stream_render')
+
+                if writer is None:
+                    h, w = output.shape[:2]
+                    fps = self.target_fps or source_fps
+                    writer = cv2.VideoWriter(self.output_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+                writer.write(output)
+        except Exception as e:
+            self._fail(e, renders)
+        finally:
+            if writer is not None:
+                writer.release()
+
+
+def main():
+    from .detect_cars import CarDetector
+    from .occupancy import OccupancyDetector
+    from .slot_utils import load_slots
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(description="Process a parking lot video stream")
+    parser.add_argument("source", help="Video file, camera index or stream URL")
+    parser.add_argument("--model", default=os.path.join(base_dir, "models", "yolov8n.pt"))
+    parser.add_argument("--slots", default=os.path.join(base_dir, "data", "UFPR04", "slots.json"))
+    parser.add_argument("--target-fps", type=float, default=None)
+    parser.add_argument("--output", default=None, help="Write annotated video here")
+    parser.add_argument("--flip-frames", type=int, default=1,
+                        help="Consecutive frames needed before a slot changes state")
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="Skip detection on frames where no slot changed")
+    parser.add_argument("--crop-changed", action="store_true",
+                        help="With --motion-gate, detect only around changed slots")
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+
+    slots = load_slots(args.slots)
+    processor = StreamProcessor(
+        CarDetector(args.model),
+        OccupancyDetector(slots),
+        slots,
+        target_fps=args.target_fps,
+        output_path=args.output,
+        flip_frames=args.flip_frames,
+        motion_gate=MotionGate(slots) if args.motion_gate else None,
+        crop_changed=args.crop_changed,
+        on_change=lambda event: print(f"frame {event['frame']} @ {event['position']}s: {event['changes']}"),
+    )
+
+    try:
+        stats = processor.run(source)
+    except KeyboardInterrupt:
+        processor.stop()
+        return
+
+    print(f"Read {stats['frames_read']} frames, processed {stats['frames_processed']} "
+          f"({stats['processed_fps']} fps), skipped {stats['frames_skipped']}, "
+          f"gated {stats['frames_gated']}")
+
+
+if __name__ == "__main__":
+    main()
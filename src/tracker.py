@@ -0,0 +1,94 @@
+import time
+
+import numpy as np
+
+
+class OccupancyTracker:
+    """Per-slot occupancy state with hysteresis on top of OccupancyDetector"""
+
+    def __init__(self, occupancy_detector, flip_frames=3):
+        """
+        Initialize tracker
+
+        Args:
+            occupancy_detector: OccupancyDetector for the camera's slots
+            flip_frames: Consecutive frames a slot must disagree with its
+                current state before the state flips
+        """
+        self.occupancy_detector = occupancy_detector
+        self.slot_ids = list(occupancy_detector.geometry.slot_ids)
+        self.flip_frames = max(1, int(flip_frames))
+
+        self.state = np.zeros(len(self.slot_ids), dtype=bool)
+        self.streak = np.zeros(len(self.slot_ids), dtype=np.int32)
+        # Occupancy each slot showed the last time it was evaluated
+        self.observed = np.zeros(len(self.slot_ids), dtype=bool)
+        self.initialized = False
+
+    def reset(self):
+        """Forget all state; the next update reports every slot"""
+        self.state[:] = False
+        self.streak[:] = 0
+        self.observed[:] = False
+        self.initialized = False
+
+    def update(self, boxes, timestamp=None, changed=None):
+        """
+        Feed one frame's detections and return the slots that flipped
+
+        Args:
+            boxes: List of car bounding boxes [(x1, y1, x2, y2), ...]
+            timestamp: Time of the frame, defaults to now
+            changed: Optional boolean array in slot order; slots marked False
+                are not re-evaluated and are taken to look as they did when
+                last evaluated, so a pending flip keeps counting
+
+        Returns:
+            List of diffs {'slot_id', 'occupied', 'timestamp'}
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        detector = self.occupancy_detector
+
+        if not self.initialized:
+            self.state = detector.occupied_mask(boxes)
+            self.observed = self.state.copy()
+            self.streak[:] = 0
+            self.initialized = True
+            flipped = np.arange(len(self.slot_ids))
+        else:
+            evaluate = np.ones(len(self.slot_ids), dtype=bool) if changed is None \
+                else np.asarray(changed, dtype=bool)
+
+            observed = detector.occupied_mask(boxes, slot_mask=evaluate)
+            self.observed[evaluate] = observed[evaluate]
+
+            # Unchanged slots with a pending flip still count this frame
+            active = evaluate | (self.streak > 0)
+            disagree = active & (self.observed != self.state)
+
+            self.streak[active & ~disagree] = 0
+            self.streak[disagree] += 1
+
+            flipped = np.nonzero(self.streak >= self.flip_frames)[0]
+            self.state[flipped] = ~self.state[flipped]
+            self.streak[flipped] = 0
+
+        return [
+            {
+                'slot_id': self.slot_ids[i],
+                'occupied': bool(self.state[i]),
+                'timestamp': timestamp,
+            }
+            for i in flipped
+        ]
+
+    def snapshot(self):
+        """
+        Current tracked state of every slot
+
+        Returns:
+            Dictionary mapping slot_id to occupancy status (True/False)
+        """
+        return {slot_id: bool(flag) for slot_id, flag in zip(self.slot_ids, self.state)}
@@ -0,0 +1,72 @@
+import os
+import queue
+import threading
+
+
+class AsyncUploadStore:
+    """Write encoded images to disk on a background thread"""
+
+    def __init__(self, directory, max_pending=64):
+        """
+        Initialize upload store
+
+        Args:
+            directory: Folder that receives the files
+            max_pending: Writes queued before new ones are dropped
+        """
+        self.directory = directory
+        self.written = 0
+        self.dropped = 0
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def save(self, filename, data):
+        """
+        Queue encoded image bytes for writing without blocking
+
+        Args:
+            filename: File name inside the store directory
+            data: Encoded image bytes
+
+        Returns:
+            Path the file will be written to, or None if the queue is full
+        """
+        self._ensure_started()
+        path = os.path.join(self.directory, filename)
+
+        try:
+            self._queue.put_nowait((path, data))
+        except queue.Full:
+            self.dropped += 1
+            return None
+
+        return path
+
+    def pending(self):
+        """Number of writes queued but not yet finished"""
+        return self._queue.unfinished_tasks
+
+    def flush(self):
+        """Block until every queued write has finished"""
+        self._queue.join()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            path, data = self._queue.get()
+            try:
+                with open(path, "wb") as f:
+                    f.write(data)
+                self.written += 1
+            except OSError:
+                self.dropped += 1
+            finally:
+                self._queue.task_done()
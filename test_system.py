@@ -3,8 +3,14 @@ Test script to verify Smart Parking System components
 """
 import os
 import sys
+import tempfile
 import cv2
 
+# Tests that import app record observations; keep them out of the
+# working tree's history database
+HISTORY_DIR = tempfile.TemporaryDirectory(prefix="parking-history-")
+os.environ["HISTORY_DB"] = os.path.join(HISTORY_DIR.name, "occupancy.db")
+
 def test_imports():
     """Test if all required packages are installed"""
     print("Testing imports...")
@@ -59,6 +65,48 @@ def test_slots():
         return False
 
 
+def test_binary_slots():
+    """Test the binary slot layout round-trip"""
+    print("\nTesting binary slot layout...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        from src.slot_utils import load_slot_arrays, load_slots, save_slot_arrays, slots_region
+        
+        slots = load_slots("data/UFPR04/slots.json")
+        # Fractional annotations must survive exactly
+        slots[max(slots) + 1] = [[0.1, 0.2], [1000.3, 0.2], [1000.3, 700.7], [0.1, 700.7]]
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = save_slot_arrays(slots, os.path.join(tmp, "slots.npz"))
+            loaded = load_slots(path)
+            ids, offsets, vertices = load_slot_arrays(path)
+            in_memory = load_slot_arrays(path, mmap_mode=None)[2]
+            if not isinstance(vertices.base, np.memmap) or not np.array_equal(in_memory, vertices):
+                print("✗ Binary layout not memory-mapped")
+                return False
+        
+        if list(loaded) != list(slots) or len(offsets) != len(ids) + 1:
+            print("✗ Slot ids or offsets differ after round-trip")
+            return False
+        
+        for slot_id, polygon in slots.items():
+            if not np.array_equal(loaded[slot_id], polygon):
+                print(f"✗ Slot {slot_id} vertices differ after round-trip")
+                return False
+        
+        if slots_region(loaded) != slots_region(slots):
+            print("✗ Slot region differs after round-trip")
+            return False
+        
+        print(f"✓ Binary layout round-trip working ({len(vertices)} vertices)")
+        return True
+    except Exception as e:
+        print(f"✗ Binary layout error: {e}")
+        return False
+
+
 def test_detection():
     """Test car detection on a sample image"""
     print("\nTesting car detection...")
@@ -94,6 +142,343 @@ def test_detection():
         return False
 
 
+def test_batch_detection():
+    """Test batched car detection against single-image detection"""
+    print("\nTesting batch detection...")
+    
+    images_dir = "data/UFPR04/images"
+    if not os.path.exists(images_dir):
+        print(f"✗ Images directory not found at {images_dir}")
+        return False
+    
+    images = sorted(f for f in os.listdir(images_dir) if f.endswith('.jpg'))[:4]
+    if not images:
+        print("✗ No sample images found")
+        return False
+    
+    try:
+        from src.detect_cars import CarDetector
+        
+        imgs = [cv2.imread(os.path.join(images_dir, name)) for name in images]
+        
+        detector = CarDetector("models/yolov8n.pt")
+        batch_boxes = detector.detect_batch(imgs, batch_size=2)
+        
+        for img, boxes in zip(imgs, batch_boxes):
+            single = detector.detect(img)
+            if len(single) != len(boxes):
+                print("✗ Batch and single-image detections differ")
+                return False
+        
+        print(f"✓ Batch detection matches single-image detection ({len(imgs)} images)")
+        return True
+    except Exception as e:
+        print(f"✗ Batch detection error: {e}")
+        return False
+
+
+class PoolTestDetector:
+    """Stand-in for CarDetector in pool workers; the process exits on a white image"""
+    def __init__(self, model_path, backend='pytorch'):
+        self.model_path = model_path
+    
+    def detect_batch(self, images, batch_size=8, profile=None):
+        import numpy as np
+        if any(img.min() == 255 for img in images):
+            os._exit(3)
+        return [np.array([[10, 10, 100, 100]], np.int32) for _ in images]
+
+
+class BrokenPoolDetector:
+    """Stand-in for a detector that cannot load, e.g. a bad model path"""
+    def __init__(self, model_path, backend='pytorch'):
+        os._exit(4)
+
+
+def test_inference_pool():
+    """Test job submission, dead worker recovery and the /jobs API"""
+    print("\nTesting inference pool...")
+    
+    try:
+        import io
+        import time
+        from types import SimpleNamespace
+        import numpy as np
+        os.environ.setdefault("WARMUP_ON_START", "False")
+        import app as server
+        from src.inference_pool import InferencePool
+        
+        def wait(pool, job_id, timeout=120):
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                job = pool.get(job_id)
+                if job['status'] != 'queued':
+                    return job
+                time.sleep(0.05)
+            return pool.get(job_id)
+        
+        pool = InferencePool(server.MODEL_PATH, num_workers=1, poll_interval=0.2,
+                             on_result=server.job_result, detector_factory=PoolTestDetector)
+        black = np.zeros((240, 320, 3), np.uint8)
+        
+        try:
+            job = wait(pool, pool.submit(black, context="UFPR04"))
+            if job['status'] != 'done' or job['result']['lot_id'] != "UFPR04" or pool.get("missing") is not None:
+                print(f"✗ Job not completed: {job}")
+                return False
+            
+            # A worker that dies mid-batch fails its jobs and is replaced
+            job = wait(pool, pool.submit(np.full_like(black, 255), context="UFPR04"))
+            if job['status'] != 'failed' or 'exited' not in job['error'] or pool.restarts != 1:
+                print(f"✗ Dead worker not detected: {job}")
+                return False
+            if pool.queue_depth() != 0 or wait(pool, pool.submit(black, context="UFPR04"))['status'] != 'done':
+                print("✗ Replacement worker not serving")
+                return False
+            
+            # The job API queues through the app's pool
+            original, server.inference_pool = server.inference_pool, pool
+            try:
+                client = server.app.test_client()
+                data = {'image': (io.BytesIO(cv2.imencode('.jpg', black)[1].tobytes()), 'a.jpg'),
+                        'lot_id': 'UFPR04'}
+                detector = server._car_detector
+                response = client.post('/jobs', data=data, content_type='multipart/form-data')
+                job_id = response.get_json()['job_id']
+                wait(pool, job_id)
+                job = client.get(f'/jobs/{job_id}').get_json()
+                missing = client.get('/jobs/missing').status_code
+                
+                # Classifier lots are not run through the detector pool
+                request_layout = server.request_layout
+                server.request_layout = lambda: SimpleNamespace(lot_id='UFPR04', classifier=object())
+                try:
+                    data['image'] = (io.BytesIO(cv2.imencode('.jpg', black)[1].tobytes()), 'a.jpg')
+                    classifier_status = client.post('/jobs', data=data, content_type='multipart/form-data').status_code
+                finally:
+                    server.request_layout = request_layout
+            finally:
+                server.inference_pool = original
+            
+            if response.status_code != 202 or job['status'] != 'done' or missing != 404:
+                print(f"✗ Job API failed: {response.status_code} {job} {missing}")
+                return False
+            if server.app_config.DETECTOR_BACKEND == 'pytorch' and server._car_detector is not detector:
+                print("✗ Job submission loaded a model in the web process")
+                return False
+            if classifier_status != 400 or pool.queue_depth() != 0:
+                print(f"✗ Classifier lot job answered {classifier_status}")
+                return False
+        finally:
+            pool.stop()
+        
+        # Workers that never start are retried a few times, then jobs fail
+        broken = InferencePool(server.MODEL_PATH, num_workers=1, poll_interval=0.05, max_start_failures=2,
+                               detector_factory=BrokenPoolDetector)
+        try:
+            failed = wait(broken, broken.submit(black), timeout=60)
+            late = wait(broken, broken.submit(black), timeout=5)
+        finally:
+            broken.stop()
+        if failed['status'] != 'failed' or 'could start' not in failed['error'] or broken.restarts != 1:
+            print(f"✗ Worker failing at startup not given up on: {failed} after {broken.restarts} restarts")
+            return False
+        if late['status'] != 'failed':
+            print(f"✗ Job submitted to a pool without workers left queued: {late}")
+            return False
+        
+        print(f"✓ Inference pool working ({job['result']['total_slots']} slots per job)")
+        return True
+    except Exception as e:
+        print(f"✗ Inference pool error: {e}")
+        return False
+
+
+def test_upload_store():
+    """Test background upload writes and in-memory uploads with saving disabled"""
+    print("\nTesting upload store...")
+    
+    try:
+        import io
+        import tempfile
+        import numpy as np
+        os.environ.setdefault("WARMUP_ON_START", "False")
+        import app as server
+        from src.upload_store import AsyncUploadStore
+        
+        class NoCarDetector:
+            def detect(self, img, **kwargs):
+                return []
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            store = AsyncUploadStore(os.path.join(tmp, "store"))
+            first = store.save("a.jpg", b"first")
+            store.save("b.jpg", b"second")
+            store.save(os.path.join("missing", "c.jpg"), b"third")
+            store.flush()
+            
+            with open(first, "rb") as f:
+                content = f.read()
+            if content != b"first" or store.written != 2 or store.dropped != 1 or store.pending() != 0:
+                print(f"✗ Unexpected writes: {store.written} written, {store.dropped} dropped")
+                return False
+            
+            original = server.upload_store, server.SAVE_UPLOADS, server.get_detector
+            server.upload_store = AsyncUploadStore(os.path.join(tmp, "uploads"))
+            server.get_detector = lambda: NoCarDetector()
+            try:
+                client = server.app.test_client()
+                responses = {}
+                for save, level in ((False, 0), (True, 1)):
+                    server.SAVE_UPLOADS = save
+                    frame = np.full((120, 160, 3), level, np.uint8)
+                    data = {'image': (io.BytesIO(cv2.imencode('.png', frame)[1].tobytes()), 'lot.png')}
+                    responses[save] = client.post('/detect?output=json', data=data,
+                                                  content_type='multipart/form-data').get_json()
+                    server.upload_store.flush()
+                    if not save:
+                        written = os.path.exists(server.upload_store.directory) or server.upload_store.written
+            finally:
+                server.upload_store, server.SAVE_UPLOADS, server.get_detector = original
+        
+        if not responses[False].get('success') or 'image_path' in responses[False] or written:
+            print("✗ Upload persisted with SAVE_UPLOADS=False")
+            return False
+        if not responses[True].get('image_path', '').endswith('lot.png'):
+            print(f"✗ Upload not saved with SAVE_UPLOADS=True: {responses[True]}")
+            return False
+        
+        print("✓ Upload store working (nothing written with saving disabled)")
+        return True
+    except Exception as e:
+        print(f"✗ Upload store error: {e}")
+        return False
+
+
+def test_health_endpoints():
+    """Test liveness and readiness before, during and after warm-up"""
+    print("\nTesting health endpoints...")
+    
+    try:
+        import threading
+        os.environ.setdefault("WARMUP_ON_START", "False")
+        import app as server
+        
+        release = threading.Event()
+        
+        def fake_warm_up():
+            release.wait(30)
+            server.ready.set()
+        
+        original = (server.warm_up, server._warmup_thread, server.warmup_error, server.ready.is_set())
+        server.warm_up = fake_warm_up
+        server._warmup_thread = None
+        server.warmup_error = None
+        server.ready.clear()
+        client = server.app.test_client()
+        
+        try:
+            health = client.get('/healthz')
+            warming = client.get('/readyz')
+            
+            release.set()
+            server._warmup_thread.join(5)
+            ready = client.get('/readyz')
+            
+            server.ready.clear()
+            server.warmup_error = "model missing"
+            failed = client.get('/readyz')
+        finally:
+            release.set()
+            server.warm_up, server._warmup_thread, server.warmup_error, was_ready = original
+            if was_ready:
+                server.ready.set()
+            else:
+                server.ready.clear()
+        
+        if health.status_code != 200 or health.get_json() != {'status': 'ok'}:
+            print(f"✗ Liveness failed: {health.status_code}")
+            return False
+        if warming.status_code != 503 or warming.get_json()['status'] != 'warming_up':
+            print(f"✗ Not ready during warm-up expected: {warming.status_code} {warming.get_json()}")
+            return False
+        if ready.status_code != 200 or ready.get_json()['status'] != 'ready':
+            print(f"✗ Ready after warm-up expected: {ready.status_code} {ready.get_json()}")
+            return False
+        if failed.status_code != 503 or failed.get_json() != {'status': 'failed', 'error': 'model missing'}:
+            print(f"✗ Failed warm-up not reported: {failed.status_code} {failed.get_json()}")
+            return False
+        
+        print("✓ Health endpoints working (warming_up -> ready, failed reported)")
+        return True
+    except Exception as e:
+        print(f"✗ Health endpoints error: {e}")
+        return False
+
+
+def test_tiling():
+    """Test tile layout and cross-tile box merging"""
+    print("\nTesting tiled inference helpers...")
+    
+    try:
+        import numpy as np
+        from src.detect_cars import tile_windows, merge_boxes
+        
+        region = (0, 0, 3840, 2160)
+        tiles = tile_windows(region, 640, 0.2)
+        covered = np.zeros((2160, 3840), dtype=bool)
+        for x1, y1, x2, y2 in tiles:
+            if x2 - x1 > 640 or y2 - y1 > 640:
+                print(f"✗ Tile {(x1, y1, x2, y2)} larger than tile size")
+                return False
+            covered[y1:y2, x1:x2] = True
+        
+        if not covered.all():
+            print("✗ Tiles do not cover the region")
+            return False
+        
+        # The same car seen whole in one tile and cut in half by the next
+        boxes = np.array([[600, 100, 700, 160], [600, 100, 640, 160], [900, 100, 1000, 160]], float)
+        scores = np.array([0.9, 0.6, 0.8])
+        keep = merge_boxes(boxes, scores).tolist()
+        if keep != [0, 2]:
+            print(f"✗ Unexpected merge result: {keep}")
+            return False
+        
+        # Tiles at x=0 and x=460 see one car 40px apart (IoU 0.43), which
+        # the profile's IoU threshold decides whether to merge
+        import torch
+        from types import SimpleNamespace
+        from src.detect_cars import CarDetector
+        from src.profiles import InferenceProfile
+        
+        def model(batch, **kwargs):
+            return [
+                SimpleNamespace(speed={}, boxes=SimpleNamespace(
+                    xyxy=torch.tensor([[500.0 - 420 * n, 100, 600 - 420 * n, 200]]),
+                    conf=torch.tensor([0.9 - 0.1 * n]), cls=torch.tensor([2.0])))
+                for n in range(len(batch))
+            ]
+        
+        detector = CarDetector.__new__(CarDetector)
+        detector.model = model
+        detector.backend = 'pytorch'
+        img = np.zeros((400, 1100, 3), np.uint8)
+        
+        for iou, expected in ((0.5, 2), (0.4, 1)):
+            detector.profile = InferenceProfile(iou=iou)
+            found = detector._detect_tiled([img], 2, None, 640, 0.2)[0]
+            if len(found) != expected:
+                print(f"✗ Tiled boxes with IoU threshold {iou}: {found.tolist()}")
+                return False
+        
+        print(f"✓ Tiled inference helpers working ({len(tiles)} tiles for 4K)")
+        return True
+    except Exception as e:
+        print(f"✗ Tiling error: {e}")
+        return False
+
+
 def test_occupancy():
     """Test occupancy detection"""
     print("\nTesting occupancy detection...")
@@ -116,6 +501,1058 @@ def test_occupancy():
         return False
 
 
+def test_overlap_engine():
+    """Test batched overlap engine against per-pair Shapely intersections"""
+    print("\nTesting overlap engine...")
+    
+    try:
+        import numpy as np
+        from shapely.geometry import Polygon, box
+        from src.slot_utils import load_slots
+        from src.occupancy import OccupancyDetector
+        
+        slots = load_slots("data/UFPR04/slots.json")
+        detector = OccupancyDetector(slots)
+        
+        rng = np.random.default_rng(0)
+        xy = rng.integers(0, 1000, size=(60, 2))
+        wh = rng.integers(0, 200, size=(60, 2))
+        boxes = [tuple(map(int, (x, y, x + w, y + h))) for (x, y), (w, h) in zip(xy, wh)]
+        
+        ratios = detector.overlap_ratios(boxes)
+        predictions = detector.predict(boxes)
+        
+        for row, (slot_id, polygon) in enumerate(slots.items()):
+            slot_poly = Polygon(polygon)
+            areas = [slot_poly.intersection(box(*b)).area for b in boxes]
+            
+            if predictions[slot_id] != any(a > 0 for a in areas):
+                print(f"✗ Slot {slot_id} occupancy differs from Shapely")
+                return False
+            
+            if slot_poly.area > 0:
+                expected = np.array(areas) / slot_poly.area
+                if not np.allclose(ratios[row], expected, atol=1e-9):
+                    print(f"✗ Slot {slot_id} overlap ratios differ from Shapely")
+                    return False
+        
+        print(f"✓ Overlap engine matches Shapely ({len(slots)} slots x {len(boxes)} boxes)")
+        return True
+    except Exception as e:
+        print(f"✗ Overlap engine error: {e}")
+        return False
+
+
+def test_overlap_scoring():
+    """Test overlap-ratio scoring, thresholds and best-slot assignment"""
+    print("\nTesting overlap scoring...")
+    
+    try:
+        import numpy as np
+        from shapely.geometry import Polygon, box
+        from src.occupancy import OccupancyDetector
+        
+        # Two adjacent 100x100 slots and a 10x10 one far away
+        slots = {
+            1: [(0, 0), (100, 0), (100, 100), (0, 100)],
+            2: [(100, 0), (200, 0), (200, 100), (100, 100)],
+            3: [(500, 500), (510, 500), (510, 510), (500, 510)],
+        }
+        # Mostly in slot 1 with a sliver over slot 2, and a huge box over slot 3
+        boxes = [(10, 10, 110, 90), (400, 400, 700, 700)]
+        
+        any_mode = OccupancyDetector(slots).predict(boxes)
+        if any_mode != {1: True, 2: True, 3: True}:
+            print(f"✗ Default mode changed: {any_mode}")
+            return False
+        
+        overlap = OccupancyDetector(slots, mode='overlap', slot_threshold=0.3)
+        if overlap.predict(boxes) != {1: True, 2: False, 3: True}:
+            print(f"✗ Slot threshold not applied: {overlap.predict(boxes)}")
+            return False
+        
+        strict = OccupancyDetector(slots, mode='overlap', slot_threshold=0.05, box_threshold=0.5)
+        if strict.predict(boxes) != {1: True, 2: False, 3: False}:
+            print(f"✗ Box threshold not applied: {strict.predict(boxes)}")
+            return False
+        
+        # Without assignment the sliver clears a low slot threshold
+        loose = OccupancyDetector(slots, mode='overlap', slot_threshold=0.05)
+        assigned = OccupancyDetector(slots, mode='overlap', slot_threshold=0.05, assign=True)
+        if not loose.predict(boxes)[2] or assigned.predict(boxes)[2]:
+            print("✗ Box not assigned to its best slot")
+            return False
+        
+        # Masked evaluation must not move a box to a different slot
+        mask = np.array([False, True, True])
+        if assigned.occupied_mask(boxes, slot_mask=mask).tolist() != [False, False, True]:
+            print("✗ Slot mask changed box assignment")
+            return False
+        
+        scores = overlap.scores(boxes)
+        for slot_id, polygon in slots.items():
+            poly = Polygon(polygon)
+            areas = [poly.intersection(box(*b)).area for b in boxes]
+            box_areas = [box(*b).area for b in boxes]
+            expected_slot = max(a / poly.area for a in areas)
+            expected_box = max(a / b for a, b in zip(areas, box_areas))
+            if not (np.isclose(scores[slot_id]['slot_overlap'], expected_slot, atol=1e-4)
+                    and np.isclose(scores[slot_id]['box_overlap'], expected_box, atol=1e-4)):
+                print(f"✗ Slot {slot_id} scores differ from Shapely: {scores[slot_id]}")
+                return False
+        
+        print("✓ Overlap scoring thresholds and assignment working")
+        return True
+    except Exception as e:
+        print(f"✗ Overlap scoring error: {e}")
+        return False
+
+
+def test_stream_processing():
+    """Test the video pipeline on a generated mp4 file"""
+    print("\nTesting stream processing...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        from src.motion import MotionGate
+        from src.occupancy import OccupancyDetector
+        from src.stream import StreamProcessor
+        
+        class BrightnessDetector:
+            """Reports one car over the slot while the frame is bright"""
+            def detect(self, img):
+                return [(0, 0, 50, 50)] if img.mean() > 128 else []
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            video_path = os.path.join(tmp, "lot.mp4")
+            writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"mp4v"), 10, (320, 240))
+            for i in range(60):
+                value = 255 if 20 <= i < 40 else 0
+                writer.write(np.full((240, 320, 3), value, np.uint8))
+            writer.release()
+            
+            slots = {1: [[10, 10], [100, 10], [100, 100], [10, 100]]}
+            events = []
+            processor = StreamProcessor(
+                BrightnessDetector(), OccupancyDetector(slots), slots,
+                target_fps=5, on_change=events.append
+            )
+            stats = processor.run(video_path)
+        
+        states = [event['changes'][1] for event in events]
+        if states != [False, True, False]:
+            print(f"✗ Unexpected occupancy changes: {states}")
+            return False
+        
+        if stats['frames_processed'] != 30 or stats['frames_skipped'] != 30:
+            print(f"✗ Unexpected frame skipping: {stats}")
+            return False
+        
+        # With the motion gate and hysteresis, a car that arrives and then
+        # stays still still flips its slot on the skipped frames
+        with tempfile.TemporaryDirectory() as tmp:
+            video_path = os.path.join(tmp, "lot.mp4")
+            writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"mp4v"), 10, (320, 240))
+            for i in range(40):
+                writer.write(np.full((240, 320, 3), 255 if i >= 20 else 0, np.uint8))
+            writer.release()
+            
+            gated_events = []
+            processor = StreamProcessor(
+                BrightnessDetector(), OccupancyDetector(slots), slots, target_fps=10,
+                on_change=gated_events.append, flip_frames=3, motion_gate=MotionGate(slots)
+            )
+            gated_stats = processor.run(video_path)
+        
+        if [event['changes'][1] for event in gated_events] != [False, True] or not gated_stats['frames_gated']:
+            print(f"✗ Gated slot did not flip: {gated_events} {gated_stats}")
+            return False
+        
+        print(f"✓ Stream processing working ({stats['frames_processed']}/{stats['frames_read']} frames)")
+        return True
+    except Exception as e:
+        print(f"✗ Stream processing error: {e}")
+        return False
+
+
+def test_batch_eval():
+    """Test the batch evaluator writes one row per image and resumes"""
+    print("\nTesting batch evaluation...")
+    
+    try:
+        import csv
+        import tempfile
+        import numpy as np
+        from src.batch_eval import BatchEvaluator, CsvResultWriter
+        from src.occupancy import OccupancyDetector
+        
+        class OneCarDetector:
+            """Reports one car over slot 1 in every image"""
+            def detect_batch(self, images, **kwargs):
+                return [np.array([[10, 10, 100, 100]], np.int32) for _ in images]
+        
+        slots = {1: [[10, 10], [100, 10], [100, 100], [10, 100]],
+                 2: [[200, 10], [300, 10], [300, 100], [200, 100]]}
+        occupancy = OccupancyDetector(slots)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            images_dir = os.path.join(tmp, "images")
+            os.makedirs(images_dir)
+            for name in ("2012-12-07_16_42_25.jpg", "2012-12-07_16_47_25.jpg", "broken.jpg"):
+                path = os.path.join(images_dir, name)
+                if name == "broken.jpg":
+                    with open(path, "wb") as f:
+                        f.write(b"not an image")
+                else:
+                    cv2.imwrite(path, np.zeros((120, 320, 3), np.uint8))
+            
+            output = os.path.join(tmp, "results.csv")
+            evaluator = BatchEvaluator(OneCarDetector(), occupancy, workers=0, batch_size=2)
+            first = evaluator.run(images_dir, CsvResultWriter(output, [1, 2]), limit=2)
+            second = evaluator.run(images_dir, CsvResultWriter(output, [1, 2]))
+            
+            with open(output, newline="") as f:
+                rows = list(csv.DictReader(f))
+        
+        if first['processed'] != 2 or second['skipped'] != 2 or second['failed'] != 1:
+            print(f"✗ Resume did not skip finished images: {first}, {second}")
+            return False
+        
+        if [row['image'] for row in rows] != ["2012-12-07_16_42_25.jpg", "2012-12-07_16_47_25.jpg", "broken.jpg"]:
+            print("✗ Unexpected rows written")
+            return False
+        
+        if rows[0]['slot_1'] != '1' or rows[0]['slot_2'] != '0' or rows[0]['captured_at'] != "2012-12-07T16:42:25":
+            print(f"✗ Unexpected row contents: {rows[0]}")
+            return False
+        
+        print("✓ Batch evaluation working")
+        return True
+    except Exception as e:
+        print(f"✗ Batch evaluation error: {e}")
+        return False
+
+
+def test_occupancy_tracker():
+    """Test hysteresis and change-only updates of the occupancy tracker"""
+    print("\nTesting occupancy tracker...")
+    
+    try:
+        import numpy as np
+        from src.occupancy import OccupancyDetector
+        from src.tracker import OccupancyTracker
+        
+        slots = {
+            1: [[0, 0], [100, 0], [100, 100], [0, 100]],
+            2: [[200, 0], [300, 0], [300, 100], [200, 100]],
+        }
+        tracker = OccupancyTracker(OccupancyDetector(slots), flip_frames=3)
+        car = [(10, 10, 50, 50)]
+        
+        first = tracker.update([], timestamp=0)
+        if len(first) != 2:
+            print("✗ First update should report every slot")
+            return False
+        
+        # A single-frame detection must not flip the slot
+        if tracker.update(car, timestamp=1) or tracker.update([], timestamp=2):
+            print("✗ Slot flipped on a one-frame detection")
+            return False
+        
+        diffs = [tracker.update(car, timestamp=t) for t in (3, 4, 5)]
+        if diffs[:2] != [[], []] or diffs[2] != [{'slot_id': 1, 'occupied': True, 'timestamp': 5}]:
+            print(f"✗ Unexpected diffs: {diffs}")
+            return False
+        
+        # Slots outside the changed mask keep their state
+        skipped = [tracker.update([], timestamp=t, changed=np.array([False, True])) for t in (6, 7, 8)]
+        if any(skipped) or not tracker.snapshot()[1]:
+            print("✗ Unchanged slots were re-evaluated")
+            return False
+        
+        # A pending flip keeps counting on frames the motion gate skipped
+        unchanged = np.array([False, False])
+        tracker.update([(210, 10, 250, 50)], timestamp=9, changed=np.array([False, True]))
+        gated = [tracker.update([], timestamp=t, changed=unchanged) for t in (10, 11)]
+        if gated != [[], [{'slot_id': 2, 'occupied': True, 'timestamp': 11}]]:
+            print(f"✗ Pending flip stalled on gated frames: {gated}")
+            return False
+        
+        print("✓ Occupancy tracker working")
+        return True
+    except Exception as e:
+        print(f"✗ Occupancy tracker error: {e}")
+        return False
+
+
+def test_motion_gate():
+    """Test that the motion gate only flags slots whose region changed"""
+    print("\nTesting motion gate...")
+    
+    try:
+        import numpy as np
+        from src.motion import MotionGate
+        
+        slots = {
+            1: [[0, 0], [200, 0], [200, 200], [0, 200]],
+            2: [[300, 0], [500, 0], [500, 200], [300, 200]],
+        }
+        gate = MotionGate(slots)
+        frame = np.full((240, 640, 3), 100, np.uint8)
+        
+        needed, changed, _ = gate.check(frame)
+        if not needed or not changed.all():
+            print("✗ First frame should need inference")
+            return False
+        gate.accept(frame)
+        
+        if gate.check(frame.copy())[0]:
+            print("✗ Identical frame should be skipped")
+            return False
+        
+        moved = frame.copy()
+        moved[50:150, 350:450] = 220
+        needed, changed, region = gate.check(moved)
+        if not needed or changed.tolist() != [False, True]:
+            print(f"✗ Unexpected changed slots: {changed.tolist()}")
+            return False
+        
+        if region[0] > 300 or region[2] < 500:
+            print(f"✗ Crop {region} does not cover the changed slot")
+            return False
+        
+        # Slots left out of inference keep their reference, so a slow
+        # change there adds up across frames
+        gate.accept(frame)
+        step = frame.copy()
+        step[:, :200] = 220
+        step[:, 300:500] = 115
+        needed, changed, _ = gate.check(step)
+        gate.accept(step, changed)
+        step[:, 300:500] = 130
+        if changed.tolist() != [True, False] or gate.check(step)[1].tolist() != [False, True]:
+            print("✗ Slow change lost when another slot was re-evaluated")
+            return False
+        
+        # A slot drawn over by a later, larger one is still compared
+        covered = MotionGate({1: [[40, 40], [80, 40], [80, 80], [40, 80]],
+                              2: [[0, 0], [400, 0], [400, 200], [0, 200]]})
+        covered.accept(frame)
+        step = frame.copy()
+        step[40:80, 40:80] = 220
+        if covered.check(step)[1].tolist() != [True, False]:
+            print("✗ Change in a fully overlapped slot was missed")
+            return False
+        
+        print("✓ Motion gate working")
+        return True
+    except Exception as e:
+        print(f"✗ Motion gate error: {e}")
+        return False
+
+
+def test_layout_registry():
+    """Test layout discovery, LRU eviction and reload on file change"""
+    print("\nTesting layout registry...")
+    
+    try:
+        import json
+        import tempfile
+        from src.layouts import LayoutRegistry
+        from src.slot_utils import load_slots, save_slot_arrays
+        
+        def write(path, n_slots):
+            slots = {str(i + 1): [[i * 10, 0], [i * 10 + 8, 0], [i * 10 + 8, 8], [i * 10, 8]]
+                     for i in range(n_slots)}
+            with open(path, "w") as f:
+                json.dump(slots, f)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            for lot_id, n_slots in (("A", 2), ("B", 3), ("C", 4)):
+                os.makedirs(os.path.join(tmp, lot_id))
+                write(os.path.join(tmp, lot_id, "slots.json"), n_slots)
+            
+            registry = LayoutRegistry(tmp, max_layouts=2)
+            if registry.lot_ids() != ["A", "B", "C"]:
+                print(f"✗ Unexpected lots: {registry.lot_ids()}")
+                return False
+            
+            layout = registry.get("A")
+            if registry.get("A") is not layout or len(layout) != 2:
+                print("✗ Compiled layout was not reused")
+                return False
+            
+            registry.get("B")
+            registry.get("C")
+            if registry.stats()["cached"] != 2 or registry.get("A") is layout:
+                print("✗ Least recently used layout was not evicted")
+                return False
+            
+            path = os.path.join(tmp, "C", "slots.json")
+            write(path, 5)
+            os.utime(path, ns=(layout.mtime + 10**9, layout.mtime + 10**9))
+            if len(registry.get("C")) != 5:
+                print("✗ Changed layout file was not reloaded")
+                return False
+            
+            # A binary layout is used while it is newer than the JSON, and a
+            # later JSON edit takes over again
+            binary = save_slot_arrays(load_slots(path), os.path.join(tmp, "C", "slots.npz"))
+            mtime = os.stat(path).st_mtime_ns
+            os.utime(binary, ns=(mtime + 10**9, mtime + 10**9))
+            registry.discover()
+            if registry.get("C").path != binary:
+                print("✗ Newer binary layout not used")
+                return False
+            write(path, 6)
+            os.utime(path, ns=(mtime + 2 * 10**9, mtime + 2 * 10**9))
+            if len(registry.get("C")) != 6:
+                print("✗ JSON edited after the binary layout was ignored")
+                return False
+            
+            try:
+                registry.get("missing")
+                print("✗ Unknown lot should raise KeyError")
+                return False
+            except KeyError:
+                pass
+        
+        print("✓ Layout registry working")
+        return True
+    except Exception as e:
+        print(f"✗ Layout registry error: {e}")
+        return False
+
+
+def test_slot_classifier():
+    """Test slot warping, classifier training and per-lot engine selection"""
+    print("\nTesting slot classifier...")
+    
+    try:
+        import shutil
+        import tempfile
+        import numpy as np
+        from src.evaluation import SlotMetrics
+        from src.layouts import CLASSIFIER_FILE, LayoutRegistry
+        from src.slot_classifier import SlotClassifier, SlotWarper, slot_quad
+        from src.slot_utils import load_slots
+        
+        slots = load_slots("data/UFPR04/slots.json")
+        warper = SlotWarper(slots)
+        rng = np.random.default_rng(0)
+        
+        # The shared remap table cuts out the same patch as a per-slot warp
+        img = cv2.GaussianBlur(rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8), (5, 5), 0)
+        patches = warper.warp(img)
+        for i in np.flatnonzero(warper.valid)[:5]:
+            quad = slot_quad(slots[warper.slot_ids[i]])
+            matrix = cv2.getPerspectiveTransform(quad, np.float32([[0, 0], [31, 0], [31, 31], [0, 31]]))
+            expected = cv2.warpPerspective(img, matrix, (32, 32))
+            if np.abs(expected.astype(int) - patches[i]).max() > 2:
+                print(f"✗ Patch of slot {warper.slot_ids[i]} differs from warpPerspective")
+                return False
+        
+        # Textured frames with a dark car in a random half of the slots
+        frames = []
+        for _ in range(30):
+            frame = cv2.GaussianBlur(rng.integers(90, 200, (720, 1280, 3), dtype=np.uint8), (5, 5), 0)
+            labels = {}
+            for slot_id, valid in zip(warper.slot_ids, warper.valid):
+                labels[slot_id] = bool(valid and rng.integers(2))
+                if labels[slot_id]:
+                    pts = np.asarray(slots[slot_id], dtype=np.float64)
+                    (cx, cy), (w, h) = pts.mean(axis=0), np.ptp(pts, axis=0) / 4
+                    cv2.rectangle(frame, (int(cx - w), int(cy - h)), (int(cx + w), int(cy + h)), (20, 20, 20), -1)
+            frames.append((frame, labels))
+        
+        train_patches, train_labels = [], []
+        for frame, labels in frames[:20]:
+            warped = warper.warp(frame)
+            for i, slot_id in enumerate(warper.slot_ids):
+                if warper.valid[i]:
+                    train_patches.append(warped[i])
+                    train_labels.append(labels[slot_id])
+        classifier = SlotClassifier.fit(np.stack(train_patches), np.array(train_labels))
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            for lot_id in ("A", "B"):
+                os.makedirs(os.path.join(tmp, lot_id))
+                shutil.copy("data/UFPR04/slots.json", os.path.join(tmp, lot_id, "slots.json"))
+            classifier.save(os.path.join(tmp, "A", CLASSIFIER_FILE))
+            
+            registry = LayoutRegistry(tmp, lot_engines={"A": "classifier"})
+            layout = registry.get("A")
+            if layout.classifier is None or registry.get("B").classifier is not None:
+                print("✗ Engine not selected per lot")
+                return False
+            
+            metrics = SlotMetrics()
+            for frame, labels in frames[20:]:
+                metrics.update(layout.classifier.predict(frame), labels)
+            accuracy = metrics.summary()["overall"]["accuracy"]
+            if accuracy < 0.95:
+                print(f"✗ Classifier accuracy too low: {accuracy}")
+                return False
+            
+            try:
+                LayoutRegistry(tmp, engine="classifier").get("B")
+                print("✗ Classifier lot without a model should fail")
+                return False
+            except FileNotFoundError:
+                pass
+        
+        print(f"✓ Slot classifier working (held-out accuracy {accuracy:.3f})")
+        return True
+    except Exception as e:
+        print(f"✗ Slot classifier error: {e}")
+        return False
+
+
+def test_config():
+    """Test per-lot engine parsing and config validation"""
+    print("\nTesting config...")
+    
+    try:
+        import subprocess
+        from config import Config, ProductionConfig, parse_engines
+        
+        engines = parse_engines(" A = classifier ,B=detector,junk")
+        if engines != {"A": "classifier", "B": "detector"}:
+            print(f"✗ OCCUPANCY_ENGINES parsed as {engines}")
+            return False
+        
+        class BadEngines(ProductionConfig):
+            SECRET_KEY = "secret"
+            OCCUPANCY_ENGINES = {"A": "clasifier"}
+        
+        class BadEngine(Config):
+            OCCUPANCY_ENGINE = "yolo"
+        
+        for bad in (BadEngines, BadEngine):
+            try:
+                bad.validate()
+                print(f"✗ Unknown engine accepted by {bad.__name__}")
+                return False
+            except ValueError:
+                pass
+        Config.validate()
+        
+        # Reading the settings must not load the detection stack
+        loaded = subprocess.run([sys.executable, "-c", "import sys, config; "
+                                 "print(sorted({'cv2', 'shapely', 'src.layouts'} & set(sys.modules)))"],
+                                capture_output=True, text=True).stdout.strip()
+        if loaded != "[]":
+            print(f"✗ Importing config loaded {loaded}")
+            return False
+        
+        print("✓ Config working")
+        return True
+    except Exception as e:
+        print(f"✗ Config error: {e}")
+        return False
+
+
+def test_inference_profiles():
+    """Test profile validation, per-lot profile files and reloading"""
+    print("\nTesting inference profiles...")
+    
+    try:
+        import json
+        import shutil
+        import tempfile
+        from src.layouts import LayoutRegistry
+        from src.profiles import InferenceProfile, load_profile, save_profile
+        
+        profile = InferenceProfile(imgsz=416, classes="trucks, car,motorbike")
+        if profile.classes != ('car', 'motorcycle', 'truck') or profile.class_ids != [2, 3, 7]:
+            print(f"✗ Unexpected classes: {profile.classes}")
+            return False
+        if profile.predict_kwargs()['imgsz'] != 416 or profile.replace(imgsz=416) != profile:
+            print("✗ Profile settings not kept")
+            return False
+        
+        for bad in ({'imgsz': 400}, {'conf': 1.5}, {'classes': 'car,boat'}, {'classes': ''}):
+            try:
+                InferenceProfile(**bad)
+                print(f"✗ Invalid profile accepted: {bad}")
+                return False
+            except ValueError:
+                pass
+        
+        defaults = {'imgsz': 640, 'conf': 0.5, 'iou': 0.45, 'max_det': 300, 'classes': 'car'}
+        
+        # Detectors built without a profile match the server's defaults
+        from config import Config
+        overridden = {'CONFIDENCE_THRESHOLD', 'IOU_THRESHOLD', 'INPUT_SIZE', 'MAX_DETECTIONS', 'DETECT_CLASSES'}
+        if not overridden & set(os.environ) and InferenceProfile() != InferenceProfile(**Config.profile_defaults()):
+            print(f"✗ Profile defaults differ from config: {InferenceProfile()}")
+            return False
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            for lot_id in ("A", "B"):
+                os.makedirs(os.path.join(tmp, lot_id))
+                shutil.copy("data/UFPR04/slots.json", os.path.join(tmp, lot_id, "slots.json"))
+            profile_path = os.path.join(tmp, "A", "profile.json")
+            with open(profile_path, "w") as f:
+                json.dump({'classes': ['car', 'truck']}, f)
+            
+            registry = LayoutRegistry(tmp, profile_defaults=defaults)
+            first = registry.get("A")
+            if first.profile.classes != ('car', 'truck') or first.profile.conf != 0.5:
+                print(f"✗ Profile file not applied over defaults: {first.profile}")
+                return False
+            if registry.get("B").profile != InferenceProfile(**defaults):
+                print("✗ Lot without a profile file should use the defaults")
+                return False
+            
+            # A tuned input size is merged into the file and reloads the lot
+            save_profile(profile_path, first.profile.replace(imgsz=320), fields=['imgsz'])
+            stat = os.stat(profile_path)
+            os.utime(profile_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+            second = registry.get("A")
+            if second.profile.imgsz != 320 or second.profile.classes != ('car', 'truck'):
+                print(f"✗ Updated profile not reloaded: {second.profile}")
+                return False
+            if second.version == first.version:
+                print("✗ Layout version should change with the profile")
+                return False
+            
+            with open(profile_path, "w") as f:
+                json.dump({'confidence': 0.3}, f)
+            try:
+                load_profile(profile_path, defaults)
+                print("✗ Unknown profile setting accepted")
+                return False
+            except ValueError:
+                pass
+        
+        print(f"✓ Inference profiles working ({second.profile})")
+        return True
+    except Exception as e:
+        print(f"✗ Inference profiles error: {e}")
+        return False
+
+
+def test_result_cache():
+    """Test result cache keys, LRU eviction and TTL"""
+    print("\nTesting result cache...")
+    
+    try:
+        import time
+        from src.result_cache import ResultCache
+        
+        cache = ResultCache(max_entries=2, ttl=0.2)
+        keys = [ResultCache.key(b"snapshot", "UFPR04", version) for version in ("v1", "v2", "v3")]
+        
+        if len(set(keys)) != 3 or ResultCache.key(b"snapshot", "UFPR04", "v1") != keys[0]:
+            print("✗ Keys must depend on content and versions only")
+            return False
+        
+        for i, key in enumerate(keys):
+            cache.put(key, {'occupied': i})
+        
+        if cache.get(keys[0]) is not None or cache.get(keys[2]) != {'occupied': 2}:
+            print("✗ Least recently used result was not evicted")
+            return False
+        
+        if cache.get(keys[2], require='image') is not None:
+            print("✗ Result without the required field should miss")
+            return False
+        
+        time.sleep(0.25)
+        if cache.get(keys[1]) is not None:
+            print("✗ Expired result was returned")
+            return False
+        
+        stats = cache.stats()
+        if (stats['hits'], stats['misses'], stats['evictions']) != (1, 3, 1):
+            print(f"✗ Unexpected counters: {stats}")
+            return False
+        
+        # A resubmitted snapshot is answered from the cache and still recorded
+        import io
+        import numpy as np
+        os.environ.setdefault("WARMUP_ON_START", "False")
+        import app as server
+        
+        class NoCarDetector:
+            def detect(self, img, **kwargs):
+                return []
+        
+        original = server.get_detector
+        server.get_detector = lambda: NoCarDetector()
+        try:
+            client = server.app.test_client()
+            frame = cv2.imencode('.png', np.full((90, 120, 3), 77, np.uint8))[1].tobytes()
+            responses = [client.post(f'/detect?output=json&timestamp={ts}',
+                                     data={'image': (io.BytesIO(frame), 'lot.png')},
+                                     content_type='multipart/form-data')
+                         for ts in (1000000, 1000060)]
+        finally:
+            server.get_detector = original
+        server.history.flush()
+        samples = server.history.occupancy("UFPR04", 1000000, 1003600)['samples']
+        if [r.headers['X-Cache'] for r in responses] != ['MISS', 'HIT'] or samples != 2:
+            print(f"✗ Cache hit not recorded: {samples} history samples")
+            return False
+        if 'predictions' in responses[1].get_json():
+            print("✗ Cached predictions leaked into the response")
+            return False
+        
+        print("✓ Result cache working")
+        return True
+    except Exception as e:
+        print(f"✗ Result cache error: {e}")
+        return False
+
+
+def test_evaluation_metrics():
+    """Test PKLot label round-trip and per-slot precision/recall"""
+    print("\nTesting evaluation metrics...")
+    
+    try:
+        import tempfile
+        from src.evaluation import SlotMetrics, load_pklot_labels, write_pklot_labels
+        
+        labels = {1: True, 2: False, 3: True}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "frame.xml")
+            write_pklot_labels(path, labels)
+            if load_pklot_labels(path) != labels:
+                print("✗ Labels differ after round-trip")
+                return False
+        
+        metrics = SlotMetrics()
+        metrics.update({1: True, 2: True, 3: False}, labels)
+        metrics.update({1: True, 2: False, 3: True}, labels)
+        summary = metrics.summary()
+        overall = summary['overall']
+        
+        if (overall['tp'], overall['fp'], overall['fn'], overall['tn']) != (3, 1, 1, 1):
+            print(f"✗ Unexpected confusion counts: {overall}")
+            return False
+        
+        if overall['precision'] != 0.75 or overall['recall'] != 0.75 or summary['per_slot'][1]['f1'] != 1.0:
+            print(f"✗ Unexpected scores: {summary}")
+            return False
+        
+        print("✓ Evaluation metrics working")
+        return True
+    except Exception as e:
+        print(f"✗ Evaluation metrics error: {e}")
+        return False
+
+
+def test_metrics_registry():
+    """Test Prometheus text rendering of counters, gauges and histograms"""
+    print("\nTesting metrics registry...")
+    
+    try:
+        from src.metrics import Registry, StageTimer
+        
+        registry = Registry()
+        requests = registry.counter('test_requests_total', 'Requests', ('status',))
+        registry.gauge('test_depth', 'Queue depth', callback=lambda: 3)
+        latency = registry.histogram('test_seconds', 'Latency', ('stage',), buckets=(0.1, 1.0))
+        
+        requests.inc(status=200)
+        requests.inc(2, status=200)
+        timer = StageTimer(latency)
+        timer.record('detect', 0.05)
+        timer.record('detect', 0.5)
+        timer.record('detect', 5.0)
+        
+        text = registry.render()
+        expected = [
+            '# TYPE test_requests_total counter',
+            'test_requests_total{status="200"} 3',
+            'test_depth 3',
+            'test_seconds_bucket{stage="detect",le="0.1"} 1',
+            'test_seconds_bucket{stage="detect",le="1.0"} 2',
+            'test_seconds_bucket{stage="detect",le="+Inf"} 3',
+            'test_seconds_count{stage="detect"} 3',
+        ]
+        missing = [line for line in expected if line not in text.splitlines()]
+        if missing:
+            print(f"✗ Missing metric lines: {missing}")
+            return False
+        
+        if timer.breakdown() != {'detect': 5550.0}:
+            print(f"✗ Unexpected breakdown: {timer.breakdown()}")
+            return False
+        
+        print("✓ Metrics registry working")
+        return True
+    except Exception as e:
+        print(f"✗ Metrics registry error: {e}")
+        return False
+
+
+def test_occupancy_history():
+    """Test history ingest, rollups and dwell times"""
+    print("\nTesting occupancy history...")
+    
+    try:
+        import io
+        import tempfile
+        from src.history import OccupancyHistory
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            history = OccupancyHistory(os.path.join(tmp, "history.db"))
+            t0 = 1700000000 // 3600 * 3600
+            
+            # Slot 1 is occupied for 10 minutes, slot 2 from minute 1 into the next hour
+            frames = [
+                (t0, {1: True, 2: False}),
+                (t0 + 60, {1: True, 2: True}),
+                (t0 + 600, {1: False, 2: True}),
+                (t0 + 4000, {1: False, 2: False}),
+            ]
+            for ts, predictions in frames:
+                history.record("A", predictions, ts)
+            history.flush()
+            
+            hourly = history.occupancy("A", t0, t0 + 7200)
+            rates = [bucket['occupancy_rate'] for bucket in hourly['buckets']]
+            if hourly['samples'] != 4 or hourly['occupancy_rate'] != 50.0 or rates != [66.7, 0.0]:
+                print(f"✗ Unexpected hourly rollup: {hourly}")
+                return False
+            
+            if len(history.occupancy("A", t0, t0 + 7200, "minute")['buckets']) != 4:
+                print("✗ Minute rollup should have one bucket per frame")
+                return False
+            
+            slots = history.slot_occupancy("A", t0, t0 + 7200)['slots']
+            if slots != {'1': {'samples': 4, 'occupancy_rate': 50.0},
+                         '2': {'samples': 4, 'occupancy_rate': 50.0}}:
+                print(f"✗ Unexpected slot rollup: {slots}")
+                return False
+            
+            dwell = history.dwell("A", t0, t0 + 7200)['per_slot']
+            if dwell['1']['mean_seconds'] != 600 or dwell['2']['mean_seconds'] != 3940:
+                print(f"✗ Unexpected dwell times: {dwell}")
+                return False
+            
+            if history.occupancy("B", t0, t0 + 7200)['samples'] != 0:
+                print("✗ Lots are not kept apart")
+                return False
+            
+            try:
+                history.record("A", {1: True}, float("nan"))
+                print("✗ Non-finite timestamp accepted")
+                return False
+            except ValueError:
+                pass
+            
+            # A failed batch is dropped without killing the writer, and the
+            # slot change it held is not kept in memory either
+            class BadSlotId:
+                def __str__(self):
+                    raise RuntimeError("bad slot id")
+            
+            for ts, predictions in ((t0, {1: False}), (t0 + 10, {1: True, BadSlotId(): True}),
+                                    (t0 + 20, {1: False})):
+                history.record("C", predictions, ts)
+                history.flush()
+            
+            if history.dropped != 1 or history.written != 6 or history.dwell("C", t0, t0 + 7200)['stays'] != 0:
+                print(f"✗ Failed batch left the writer inconsistent: {history.stats()}")
+                return False
+        
+        os.environ.setdefault("WARMUP_ON_START", "False")
+        import app as server
+        client = server.app.test_client()
+        for value in ("nan", "inf"):
+            response = client.post('/detect', data={'image': (io.BytesIO(b"x"), 'a.jpg'), 'timestamp': value},
+                                   content_type='multipart/form-data')
+            if response.status_code != 400:
+                print(f"✗ timestamp={value} not rejected: {response.status_code}")
+                return False
+        
+        for query in ("start=nan", "end=nan", "start=-inf", "days=nan", "days=inf", "start=10&end=5"):
+            response = client.get(f'/history/UFPR04?{query}')
+            if response.status_code != 400:
+                print(f"✗ History range {query} not rejected: {response.status_code}")
+                return False
+        if client.get('/history/UFPR04?start=0&end=10').status_code != 200:
+            print("✗ Valid history range rejected")
+            return False
+        
+        print(f"✓ Occupancy history working ({history.written} frames written)")
+        return True
+    except Exception as e:
+        print(f"✗ Occupancy history error: {e}")
+        return False
+
+
+def test_live_feed():
+    """Test live feed diffs, fan-out and slow-subscriber resync"""
+    print("\nTesting live feed...")
+    
+    try:
+        import json
+        from src.live_feed import LiveFeed
+        
+        def parse(event):
+            lines = event.decode().strip().split("\n")
+            return lines[1].split(": ", 1)[1], json.loads(lines[2].split(": ", 1)[1])
+        
+        feed = LiveFeed(max_pending=2)
+        fast, slow = feed.subscribe("A"), feed.subscribe("A")
+        other = feed.subscribe("B")
+        
+        kind, data = parse(fast.get(timeout=0))
+        if kind != "snapshot" or data['seq'] != 0:
+            print(f"✗ First event should be an empty snapshot: {kind} {data}")
+            return False
+        slow.get(timeout=0)
+        other.get(timeout=0)
+        
+        feed.publish("A", {1: False, 2: False}, timestamp=1.0)
+        feed.publish("A", {1: True, 2: False}, timestamp=2.0)
+        feed.publish("A", {1: True, 2: False}, timestamp=3.0)
+        
+        events = [parse(fast.get(timeout=0)), parse(fast.get(timeout=0))]
+        if [kind for kind, _ in events] != ["snapshot", "diff"] or events[1][1]['slots'] != {'1': 1}:
+            print(f"✗ Unexpected events: {events}")
+            return False
+        
+        if fast.get(timeout=0) is not None or other.get(timeout=0) is not None:
+            print("✗ Unchanged frame or other lot produced an event")
+            return False
+        
+        # The slow subscriber never read; its backlog is replaced by a snapshot
+        feed.publish("A", {1: True, 2: True})
+        kind, data = parse(slow.get(timeout=0))
+        if kind != "snapshot" or data['slots'] != {'1': 1, '2': 1} or slow.resyncs != 1:
+            print(f"✗ Slow subscriber not resynced: {kind} {data}")
+            return False
+        
+        feed.unsubscribe(fast)
+        if feed.stats()['subscribers'] != 2:
+            print("✗ Unsubscribe failed")
+            return False
+        
+        print(f"✓ Live feed working ({feed.stats()['dropped']} events dropped for the slow client)")
+        return True
+    except Exception as e:
+        print(f"✗ Live feed error: {e}")
+        return False
+
+
+def test_asgi_app():
+    """Test streamed multipart parsing and the ASGI routes"""
+    print("\nTesting ASGI app...")
+    
+    try:
+        import asyncio
+        import json
+        os.environ.setdefault("WARMUP_ON_START", "False")
+        import asgi
+        
+        body = (b"--b\r\nContent-Disposition: form-data; name=\"lot_id\"\r\n\r\nUFPR04\r\n"
+                b"--b\r\nContent-Disposition: form-data; name=\"image\"; filename=\"a.jpg\"\r\n"
+                b"Content-Type: image/jpeg\r\n\r\n" + bytes(range(256)) * 40 + b"\r\n--b--\r\n")
+        
+        def request(path, method="POST", content_type="multipart/form-data; boundary=b", chunk=1000, query=b""):
+            # Body arrives in small chunks, as from a slow client
+            messages = [{"type": "http.request", "body": body[i:i + chunk], "more_body": i + chunk < len(body)}
+                        for i in range(0, len(body), chunk)]
+            messages.append({"type": "http.disconnect"})
+            sent = []
+            
+            async def receive():
+                if len(messages) > 1:
+                    return messages.pop(0)
+                await asyncio.sleep(3600)
+            
+            async def send(message):
+                sent.append(message)
+            
+            scope = {"type": "http", "method": method, "path": path, "query_string": query, "root_path": "",
+                     "headers": [(b"content-type", content_type.encode())]}
+            asyncio.run(asyncio.wait_for(asgi.app(scope, receive, send), 30))
+            return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:])
+        
+        async def parse():
+            chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+            
+            async def receive():
+                chunk = chunks.pop(0)
+                return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+            
+            return await asgi.read_form(receive, "multipart/form-data; boundary=b", 1 << 20)
+        
+        fields, files = asyncio.run(parse())
+        if fields != {"lot_id": "UFPR04"} or files["image"] != ("a.jpg", bytes(range(256)) * 40):
+            print(f"✗ Multipart parsed wrongly: {fields} {list(files)}")
+            return False
+        
+        status, payload = request("/detect")
+        if status != 400 or json.loads(payload) != {"error": "Failed to read image"}:
+            print(f"✗ Undecodable upload: {status} {payload}")
+            return False
+        
+        status, payload = request("/detect", content_type="text/plain")
+        if status != 400 or json.loads(payload) != {"error": "No image file provided"}:
+            print(f"✗ Missing upload: {status} {payload}")
+            return False
+        
+        status, payload = request("/healthz", method="GET")
+        if status != 200 or json.loads(payload).get("status") != "ok":
+            print(f"✗ Bridged route failed: {status} {payload}")
+            return False
+        
+        # The lot is checked before the timestamp, as in the Flask app
+        statuses = [request("/detect", query=query)[0]
+                    for query in (b"lot_id=nope&timestamp=nan", b"timestamp=nan")]
+        if statuses != [404, 400]:
+            print(f"✗ Unknown lot or bad timestamp answered {statuses}")
+            return False
+        
+        async def watch_live():
+            sent = []
+            gone = asyncio.Event()
+            
+            async def receive():
+                await gone.wait()
+                return {"type": "http.disconnect"}
+            
+            async def send(message):
+                sent.append(message)
+                if len(sent) == 3:
+                    gone.set()
+            
+            scope = {"type": "http", "method": "GET", "path": "/live/UFPR04", "query_string": b"",
+                     "root_path": "", "headers": []}
+            task = asyncio.create_task(asgi.app(scope, receive, send))
+            while len(sent) < 2:
+                await asyncio.sleep(0.01)
+            subscribers = asgi.server.live_feed.subscriber_count()
+            # Published from another thread, as the pipeline does
+            await asyncio.get_running_loop().run_in_executor(
+                None, asgi.server.live_feed.publish, "UFPR04", {"live-test": True})
+            await asyncio.wait_for(task, 5)
+            return sent, subscribers
+        
+        before = asgi.server.live_feed.subscriber_count()
+        sent, subscribers = asyncio.run(watch_live())
+        if (sent[0]["status"] != 200 or not sent[1]["body"].startswith(b"id:")
+                or b'"live-test":1' not in sent[2]["body"]):
+            print(f"✗ Live stream sent {sent}")
+            return False
+        if subscribers != before + 1 or asgi.server.live_feed.subscriber_count() != before:
+            print("✗ Live subscriber not released on disconnect")
+            return False
+        
+        print("✓ ASGI app working")
+        return True
+    except Exception as e:
+        print(f"✗ ASGI app error: {e}")
+        return False
+
+
 def test_visualization():
     """Test visualization functions"""
     print("\nTesting visualization...")
@@ -140,6 +1577,49 @@ def test_visualization():
         return False
 
 
+def test_render_pixel_diff():
+    """Test single-pass rendering against per-slot blending"""
+    print("\nTesting single-pass rendering...")
+    
+    try:
+        import numpy as np
+        from src.visualize import draw_results, get_renderer
+        from src.slot_utils import load_slots
+        
+        rng = np.random.default_rng(0)
+        img = cv2.GaussianBlur(rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8), (9, 9), 0)
+        
+        slots = load_slots("data/UFPR04/slots.json")
+        predictions = {slot_id: bool(rng.integers(2)) for slot_id in slots}
+        
+        expected = draw_results(img, slots, predictions, single_pass=False)
+        result = draw_results(img, slots, predictions)
+        diff = np.abs(expected.astype(np.int16) - result.astype(np.int16)).max(axis=2) > 0
+        
+        # Blend order only matters where fills overlap
+        renderer = get_renderer(slots)
+        coverage = np.zeros(img.shape[:2], np.int32)
+        for pts in renderer.points:
+            mask = np.zeros(img.shape[:2], np.uint8)
+            cv2.fillPoly(mask, [pts], 1)
+            coverage += mask
+        
+        allowed = coverage > 1
+        if (diff & ~allowed).any():
+            print(f"✗ {int((diff & ~allowed).sum())} pixels differ outside overlaps")
+            return False
+        
+        if diff.mean() > 0.01:
+            print(f"✗ {100 * diff.mean():.2f}% of pixels differ")
+            return False
+        
+        print(f"✓ Single-pass rendering matches ({100 * diff.mean():.3f}% pixels differ at overlaps)")
+        return True
+    except Exception as e:
+        print(f"✗ Rendering diff error: {e}")
+        return False
+
+
 def main():
     """Run all tests"""
     print("=" * 60)
@@ -150,9 +1630,32 @@ def main():
         ("Package Imports", test_imports),
         ("Model Loading", test_model),
         ("Slots Loading", test_slots),
+        ("Binary Slot Layout", test_binary_slots),
         ("Car Detection", test_detection),
+        ("Batch Detection", test_batch_detection),
+        ("Inference Pool", test_inference_pool),
+        ("Upload Store", test_upload_store),
+        ("Health Endpoints", test_health_endpoints),
+        ("Tiled Inference", test_tiling),
         ("Occupancy Detection", test_occupancy),
-        ("Visualization", test_visualization)
+        ("Overlap Engine", test_overlap_engine),
+        ("Overlap Scoring", test_overlap_scoring),
+        ("Stream Processing", test_stream_processing),
+        ("Batch Evaluation", test_batch_eval),
+        ("Occupancy Tracker", test_occupancy_tracker),
+        ("Motion Gate", test_motion_gate),
+        ("Layout Registry", test_layout_registry),
+        ("Slot Classifier", test_slot_classifier),
+        ("Config", test_config),
+        ("Inference Profiles", test_inference_profiles),
+        ("Result Cache", test_result_cache),
+        ("Evaluation Metrics", test_evaluation_metrics),
+        ("Metrics Registry", test_metrics_registry),
+        ("Occupancy History", test_occupancy_history),
+        ("Live Feed", test_live_feed),
+        ("ASGI App", test_asgi_app),
+        ("Visualization", test_visualization),
+        ("Render Pixel Diff", test_render_pixel_diff)
     ]
     
     results = []
@@ -0,0 +1,108 @@
+"""
+Compare CarDetector backends on CPU: latency, throughput and parity
+
+Usage:
+    python tools/bench_backends.py [pytorch,onnx,openvino,torchscript]
+
+Uses up to 32 images from data/UFPR04/images, or synthetic frames if the
+dataset is not present. Parity is measured against the pytorch backend.
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.detect_cars import BACKENDS, CarDetector
+from src.occupancy import OccupancyDetector
+from src.slot_utils import load_slots
+
+MODEL_PATH = os.path.join(BASE_DIR, "models", "yolov8n.pt")
+SLOTS_PATH = os.path.join(BASE_DIR, "data", "UFPR04", "slots.json")
+IMAGES_DIR = os.path.join(BASE_DIR, "data", "UFPR04", "images")
+
+
+def load_images(limit=32):
+    paths = sorted(Path(IMAGES_DIR).glob("*.jpg"))[:limit] if os.path.isdir(IMAGES_DIR) else []
+    if paths:
+        return [cv2.imread(str(p)) for p in paths]
+
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(8)]
+
+
+def box_iou(a, b):
+    """IoU matrix between two int box arrays"""
+    a = a[:, None, :].astype(np.float64)
+    b = b[None, :, :].astype(np.float64)
+    iw = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    ih = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+def parity(reference, boxes, occupancy):
+    """Box recall at IoU 0.5 and per-slot occupancy agreement"""
+    matched = total = agree = slots = 0
+
+    for ref, got in zip(reference, boxes):
+        total += len(ref)
+        if len(ref) and len(got):
+            matched += int((box_iou(ref, got).max(axis=1) >= 0.5).sum())
+
+        a = occupancy.predict(ref)
+        b = occupancy.predict(got)
+        agree += sum(a[k] == b[k] for k in a)
+        slots += len(a)
+
+    recall = matched / total if total else 1.0
+    return recall, agree / slots if slots else 1.0
+
+
+def main():
+    backends = sys.argv[1].split(",") if len(sys.argv) > 1 else list(BACKENDS)
+    images = load_images()
+    occupancy = OccupancyDetector(load_slots(SLOTS_PATH))
+    reference = None
+
+    print(f"{len(images)} images, {os.cpu_count()} CPUs\n")
+    print(f"{'backend':<12} {'p50 ms':>8} {'p99 ms':>8} {'batch img/s':>12} {'box recall':>11} {'slot agree':>11}")
+
+    for backend in backends:
+        try:
+            detector = CarDetector(MODEL_PATH, backend=backend)
+        except Exception as e:
+            print(f"{backend:<12} skipped: {e}")
+            continue
+
+        detector.detect(images[0])  # warm-up
+
+        latencies = []
+        boxes = []
+        for img in images:
+            start = time.perf_counter()
+            found = detector.detect(img)
+            latencies.append((time.perf_counter() - start) * 1000)
+            boxes.append(np.array(found, dtype=np.int32).reshape(-1, 4))
+
+        start = time.perf_counter()
+        detector.detect_batch(images, batch_size=8)
+        throughput = len(images) / (time.perf_counter() - start)
+
+        if reference is None:
+            reference = boxes
+        recall, agree = parity(reference, boxes, occupancy)
+        p50, p99 = np.percentile(latencies, [50, 99])
+
+        print(f"{backend:<12} {p50:>8.1f} {p99:>8.1f} {throughput:>12.1f} {recall:>11.3f} {agree:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark the batch evaluation CLI's throughput against decoder worker count
+
+Runs BatchEvaluator over data/UFPR04/images (or synthetic 720p JPEGs if the
+dataset is not present) with 0, 1, 2 and 4 decoder processes, once with the
+real detector and once with a no-op detector to show decode scaling alone.
+
+Usage:
+    python tools/bench_batch_eval.py [images] [max workers]
+"""
+import os
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.batch_eval import BatchEvaluator, CsvResultWriter, iter_images
+from src.occupancy import OccupancyDetector
+from src.slot_utils import load_slots
+
+MODEL_PATH = os.path.join(BASE_DIR, "models", "yolov8n.pt")
+SLOTS_PATH = os.path.join(BASE_DIR, "data", "UFPR04", "slots.json")
+IMAGES_DIR = os.path.join(BASE_DIR, "data", "UFPR04", "images")
+
+
+class NoDetector:
+    """Returns no boxes so only decoding and bookkeeping are timed"""
+
+    def detect_batch(self, images, **kwargs):
+        return [np.zeros((0, 4), np.int32) for _ in images]
+
+
+def synthetic_images(directory, count):
+    rng = np.random.default_rng(0)
+    for i in range(count):
+        frame = cv2.GaussianBlur(rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8), (9, 9), 0)
+        cv2.imwrite(os.path.join(directory, f"{i:05d}.jpg"), frame)
+
+
+def run(detector, occupancy, images_dir, workers, limit):
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = CsvResultWriter(os.path.join(tmp, "results.csv"), occupancy.geometry.slot_ids)
+        evaluator = BatchEvaluator(detector, occupancy, workers=workers, batch_size=8)
+        return evaluator.run(images_dir, writer, limit=limit)["images_per_sec"]
+
+
+def main():
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 96
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    from src.detect_cars import CarDetector
+
+    occupancy = OccupancyDetector(load_slots(SLOTS_PATH))
+    detector = CarDetector(MODEL_PATH)
+    detector.detect_batch([np.zeros((720, 1280, 3), np.uint8)])  # warm-up
+
+    with tempfile.TemporaryDirectory() as tmp:
+        images_dir = IMAGES_DIR
+        if not os.path.isdir(images_dir) or next(iter_images(images_dir), None) is None:
+            images_dir = tmp
+            synthetic_images(tmp, limit)
+
+        print(f"{limit} images from {images_dir}, {os.cpu_count()} CPUs\n")
+        print(f"{'workers':>8} {'decode-only img/s':>18} {'end-to-end img/s':>17}")
+
+        workers = 0
+        while workers <= max_workers:
+            decode_rate = run(NoDetector(), occupancy, images_dir, workers, limit)
+            full_rate = run(detector, occupancy, images_dir, workers, limit)
+            print(f"{workers:>8} {decode_rate:>18.1f} {full_rate:>17.1f}")
+            workers = workers * 2 if workers else 1
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark occupancy history ingest and rollup queries
+
+Records a week of synthetic frames for a few lots through OccupancyHistory,
+reporting slot updates per second, then times "occupancy over the last 7
+days" from the hourly rollups against the same aggregate over raw rows.
+
+Usage:
+    python tools/bench_history.py [--lots 4] [--slots 500] [--frames 2000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.history import OccupancyHistory
+
+WEEK = 7 * 86400
+
+
+def synthetic_frames(n_lots, n_slots, n_frames, end, flip_rate=0.02, seed=0):
+    """(lot_id, timestamp, predictions) frames spread evenly over the week before end"""
+    rng = np.random.default_rng(seed)
+    state = rng.random((n_lots, n_slots)) < 0.5
+    times = np.linspace(end - WEEK, end, n_frames, endpoint=False)
+
+    frames = []
+    for ts in times:
+        for lot in range(n_lots):
+            state[lot] ^= rng.random(n_slots) < flip_rate
+            frames.append((f"lot{lot}", float(ts), dict(zip(range(1, n_slots + 1), state[lot].tolist()))))
+    return frames
+
+
+def time_query(fn, repeat=5):
+    """Best wall time of fn over repeat runs, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def raw_week(path, lot_id, start, end):
+    """Hourly occupancy over raw observation rows, for comparison"""
+    conn = sqlite3.connect(path)
+    rows = conn.execute(
+        "SELECT CAST(ts / 3600 AS INTEGER) * 3600, COUNT(*), SUM(occupied), SUM(total) "
+        "FROM observations WHERE lot_id = ? AND ts >= ? AND ts < ? GROUP BY 1 ORDER BY 1",
+        (lot_id, start, end)
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Occupancy history ingest and query benchmark")
+    parser.add_argument("--lots", type=int, default=4)
+    parser.add_argument("--slots", type=int, default=500, help="Slots per lot")
+    parser.add_argument("--frames", type=int, default=2000, help="Frames per lot over the week")
+    args = parser.parse_args()
+
+    end = float(int(time.time()) // 3600 * 3600)
+    frames = synthetic_frames(args.lots, args.slots, args.frames, end)
+    updates = len(frames) * args.slots
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.db")
+        history = OccupancyHistory(path, max_pending=len(frames))
+
+        start = time.perf_counter()
+        for lot_id, ts, predictions in frames:
+            history.record(lot_id, predictions, ts)
+        queued = time.perf_counter() - start
+        history.flush()
+        elapsed = time.perf_counter() - start
+
+        print(f"{len(frames)} frames x {args.slots} slots = {updates} slot updates")
+        print(f"record() {queued * 1e6 / len(frames):.1f} us/frame, "
+              f"ingest {elapsed:.2f}s: {updates / elapsed:,.0f} slot updates/s, "
+              f"{len(frames) / elapsed:,.0f} frames/s, dropped {history.dropped}")
+        print(f"database {os.path.getsize(path) / 1e6:.1f} MB "
+              f"(+{os.path.getsize(path + '-wal') / 1e6 if os.path.exists(path + '-wal') else 0:.1f} MB WAL)\n")
+
+        week_start = end - WEEK
+        rollup_ms, result = time_query(lambda: history.occupancy("lot0", week_start, end))
+        raw_ms, raw = time_query(lambda: raw_week(path, "lot0", week_start, end))
+        same = [(b['start'], b['samples']) for b in result['buckets']] == [(r[0], r[1]) for r in raw]
+
+        slots_ms, _ = time_query(lambda: history.slot_occupancy("lot0", week_start, end))
+        dwell_ms, dwell = time_query(lambda: history.dwell("lot0", week_start, end))
+        minute_ms, _ = time_query(lambda: history.occupancy("lot0", end - 86400, end, "minute"))
+
+        print(f"{'query (lot0)':<32} {'ms':>8}")
+        print(f"{'7 days hourly, rollups':<32} {rollup_ms:>8.2f}  ({len(result['buckets'])} buckets, "
+              f"{result['occupancy_rate']}%)")
+        print(f"{'7 days hourly, raw rows':<32} {raw_ms:>8.2f}  (same buckets: {'yes' if same else 'NO'})")
+        print(f"{'last day per minute':<32} {minute_ms:>8.2f}")
+        print(f"{'7 days per slot':<32} {slots_ms:>8.2f}")
+        print(f"{'7 days dwell':<32} {dwell_ms:>8.2f}  ({dwell['stays']} stays, "
+              f"mean {dwell['mean_seconds']}s)")
+
+
+if __name__ == "__main__":
+    main()
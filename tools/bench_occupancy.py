@@ -0,0 +1,204 @@
+"""
+Benchmark occupancy prediction against the original per-pair Shapely loop
+
+Also times overlap-ratio scoring ('overlap' mode with best-slot assignment)
+against a per-pair Shapely reference on lots of 1k+ slots.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from shapely.geometry import Polygon
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.geometry import clipped_area
+from src.occupancy import OccupancyDetector
+from src.slot_utils import load_slots
+
+SLOTS_PATH = os.path.join(BASE_DIR, "data", "UFPR04", "slots.json")
+
+
+def slot_polygons(slots):
+    """Shapely polygons the reference loops score against"""
+    return {slot_id: Polygon(polygon) for slot_id, polygon in slots.items()}
+
+
+def legacy_predict(slot_polys, boxes):
+    """Original OccupancyDetector.predict loop, kept as the reference"""
+    predictions = {}
+
+    for slot_id, slot_poly in slot_polys.items():
+        occupied = False
+
+        for (x1, y1, x2, y2) in boxes:
+            car_poly = Polygon([(x1, y1), (x2, y1), (x2, y2), (x1, y2)])
+            if slot_poly.intersection(car_poly).area > 0:
+                occupied = True
+                break
+
+        predictions[slot_id] = occupied
+
+    return predictions
+
+
+def legacy_scored_predict(slot_polys, boxes, slot_threshold, box_threshold):
+    """Per-pair Shapely overlap scoring with best-slot assignment, as a reference"""
+    best = {}
+
+    for b, (x1, y1, x2, y2) in enumerate(boxes):
+        car_poly = Polygon([(x1, y1), (x2, y1), (x2, y2), (x1, y2)])
+        for slot_id, slot_poly in slot_polys.items():
+            area = slot_poly.intersection(car_poly).area
+            if area > 0 and (b not in best or area > best[b][1]):
+                best[b] = (slot_id, area, area / slot_poly.area, area / car_poly.area)
+
+    predictions = {slot_id: False for slot_id in slot_polys}
+    for slot_id, _, slot_fraction, box_fraction in best.values():
+        if slot_fraction >= slot_threshold and box_fraction >= box_threshold:
+            predictions[slot_id] = True
+    return predictions
+
+
+def dense_predict(geometry, boxes):
+    """Batched overlap test over every slot/box pair, without the index"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    sb = geometry.bounds[:, None, :]
+    bb = boxes[None, :, :]
+    hit = (
+        (sb[..., 0] <= bb[..., 2]) & (bb[..., 0] <= sb[..., 2]) &
+        (sb[..., 1] <= bb[..., 3]) & (bb[..., 1] <= sb[..., 3])
+    )
+    slot_idx, box_idx = np.nonzero(hit)
+
+    occupied = np.zeros(len(geometry), dtype=bool)
+    areas = clipped_area(geometry.vertices[slot_idx], boxes[box_idx])
+    occupied[slot_idx[areas > 0]] = True
+    return occupied
+
+
+def synthetic_lot(n_slots, seed=0):
+    """Build a grid of slightly skewed quadrilateral slots"""
+    rng = np.random.default_rng(seed)
+    cols = int(np.ceil(np.sqrt(n_slots)))
+    slots = {}
+
+    for i in range(n_slots):
+        row, col = divmod(i, cols)
+        x, y = col * 60.0, row * 110.0
+        jitter = rng.uniform(-5, 5, size=(4, 2))
+        quad = np.array([[x, y], [x + 50, y], [x + 50, y + 100], [x, y + 100]]) + jitter
+        slots[i + 1] = quad.tolist()
+
+    return slots
+
+
+def random_boxes(slots, n_boxes, seed=0):
+    """Random car-sized boxes scattered over the lot extent"""
+    rng = np.random.default_rng(seed)
+    pts = np.concatenate([np.asarray(p) for p in slots.values()])
+    lo, hi = pts.min(axis=0), pts.max(axis=0)
+
+    xy = rng.uniform(lo, hi, size=(n_boxes, 2))
+    wh = rng.uniform(30, 120, size=(n_boxes, 2))
+    return [tuple(map(int, (x, y, x + w, y + h))) for (x, y), (w, h) in zip(xy, wh)]
+
+
+def time_call(fn, repeat):
+    """Best wall time of fn over repeat runs, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run_case(name, slots, boxes, repeat=5):
+    detector = OccupancyDetector(slots)
+    polygons = slot_polygons(slots)
+
+    legacy = legacy_predict(polygons, boxes)
+    current = detector.predict(boxes)
+    match = "yes" if legacy == current else "NO"
+
+    legacy_ms = time_call(lambda: legacy_predict(polygons, boxes), max(1, repeat // 2))
+    current_ms = time_call(lambda: detector.predict(boxes), repeat)
+
+    print(f"{name:<24} {len(slots):>6} {len(boxes):>6} "
+          f"{legacy_ms:>11.2f} {current_ms:>11.2f} {legacy_ms / current_ms:>8.1f}x  {match}")
+
+
+def run_scaling(sizes=(100, 1000, 10000), repeat=5):
+    """Per-frame cost as the lot grows, with one car per two slots"""
+    print(f"\n{'slots':>6} {'boxes':>6} {'build ms':>10} {'dense ms':>10} "
+          f"{'indexed ms':>11} {'us/slot':>9}")
+
+    for n_slots in sizes:
+        slots = synthetic_lot(n_slots)
+        boxes = random_boxes(slots, n_slots // 2)
+
+        start = time.perf_counter()
+        detector = OccupancyDetector(slots)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        dense = dense_predict(detector.geometry, boxes)
+        indexed = detector.geometry.occupied_mask(boxes)
+        assert (dense == indexed).all(), "indexed and dense results differ"
+
+        dense_ms = time_call(lambda: dense_predict(detector.geometry, boxes), repeat)
+        indexed_ms = time_call(lambda: detector.predict(boxes), repeat)
+
+        print(f"{n_slots:>6} {len(boxes):>6} {build_ms:>10.1f} {dense_ms:>10.2f} "
+              f"{indexed_ms:>11.2f} {indexed_ms * 1000 / n_slots:>9.2f}")
+
+
+def run_scoring(sizes=(1000, 5000, 20000), repeat=5, slot_threshold=0.3, box_threshold=0.2):
+    """Overlap-ratio scoring cost per frame, checked against Shapely on small lots"""
+    print(f"\n{'scoring':<8} {'slots':>6} {'boxes':>6} {'shapely ms':>11} {'any ms':>9} "
+          f"{'overlap ms':>11} {'us/slot':>9}  same")
+
+    for n_slots in sizes:
+        slots = synthetic_lot(n_slots)
+        boxes = random_boxes(slots, n_slots // 2)
+
+        any_mode = OccupancyDetector(slots)
+        scored = OccupancyDetector(slots, mode='overlap', slot_threshold=slot_threshold,
+                                   box_threshold=box_threshold, assign=True)
+
+        # The reference is quadratic; only run it where it finishes quickly
+        legacy_ms, match = float("nan"), "-"
+        if n_slots <= 1000:
+            polygons = slot_polygons(slots)
+            legacy = legacy_scored_predict(polygons, boxes, slot_threshold, box_threshold)
+            match = "yes" if legacy == scored.predict(boxes) else "NO"
+            legacy_ms = time_call(
+                lambda: legacy_scored_predict(polygons, boxes, slot_threshold, box_threshold), 1)
+
+        any_ms = time_call(lambda: any_mode.predict(boxes), repeat)
+        scored_ms = time_call(lambda: scored.predict(boxes), repeat)
+
+        print(f"{'':<8} {n_slots:>6} {len(boxes):>6} {legacy_ms:>11.2f} {any_ms:>9.2f} "
+              f"{scored_ms:>11.2f} {scored_ms * 1000 / n_slots:>9.2f}  {match}")
+
+
+def main():
+    print(f"{'case':<24} {'slots':>6} {'boxes':>6} {'legacy ms':>11} {'numpy ms':>11} {'speedup':>9}  same")
+
+    if os.path.exists(SLOTS_PATH):
+        slots = load_slots(SLOTS_PATH)
+        for n_boxes in (10, 50, 100):
+            run_case("UFPR04", slots, random_boxes(slots, n_boxes), repeat=10)
+
+    for n_slots, n_boxes in ((100, 50), (500, 100), (1000, 150)):
+        slots = synthetic_lot(n_slots)
+        run_case("synthetic", slots, random_boxes(slots, n_boxes))
+
+    run_scaling()
+    run_scoring()
+
+
+if __name__ == "__main__":
+    main()
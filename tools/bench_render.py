@@ -0,0 +1,78 @@
+"""
+Benchmark draw_results: per-slot blending versus the single-pass overlay
+"""
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.slot_utils import load_slots
+from src.visualize import draw_results
+
+SLOTS_PATH = os.path.join(BASE_DIR, "data", "UFPR04", "slots.json")
+
+
+def grid_lot(n_slots, width, height):
+    """Tile a frame with n_slots rectangular slots"""
+    cols = int(np.ceil(np.sqrt(n_slots * width / height)))
+    rows = int(np.ceil(n_slots / cols))
+    w, h = width / cols, height / rows
+    slots = {}
+
+    for i in range(n_slots):
+        row, col = divmod(i, cols)
+        x, y = col * w + 2, row * h + 2
+        slots[i + 1] = [[x, y], [x + w - 4, y], [x + w - 4, y + h - 4], [x, y + h - 4]]
+
+    return slots
+
+
+def time_call(fn, repeat):
+    """Best wall time of fn over repeat runs, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run_case(name, img, slots, repeat=5):
+    rng = np.random.default_rng(0)
+    predictions = {slot_id: bool(rng.integers(2)) for slot_id in slots}
+
+    legacy = draw_results(img, slots, predictions, single_pass=False)
+    current = draw_results(img, slots, predictions)
+    diff = np.abs(legacy.astype(np.int16) - current.astype(np.int16)).max(axis=2)
+
+    legacy_ms = time_call(lambda: draw_results(img, slots, predictions, single_pass=False), repeat)
+    current_ms = time_call(lambda: draw_results(img, slots, predictions), repeat)
+
+    print(f"{name:<10} {img.shape[1]:>5}x{img.shape[0]:<5} {len(slots):>6} {legacy_ms:>11.2f} "
+          f"{current_ms:>11.2f} {legacy_ms / current_ms:>8.1f}x {100 * (diff > 0).mean():>9.3f}")
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'layout':<10} {'frame':>11} {'slots':>6} {'per-slot ms':>11} "
+          f"{'single ms':>11} {'speedup':>9} {'% px diff':>9}")
+
+    frame = cv2.GaussianBlur(rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8), (9, 9), 0)
+
+    if os.path.exists(SLOTS_PATH):
+        run_case("UFPR04", frame, load_slots(SLOTS_PATH))
+
+    for n_slots in (100, 400):
+        run_case("grid", frame, grid_lot(n_slots, 1280, 720), repeat=3)
+
+    frame_4k = cv2.resize(frame, (3840, 2160))
+    run_case("grid", frame_4k, grid_lot(100, 3840, 2160), repeat=2)
+
+
+if __name__ == "__main__":
+    main()
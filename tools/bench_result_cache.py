@@ -0,0 +1,64 @@
+"""
+Benchmark /detect on repeated uploads with the result cache on and off
+
+Sends a set of distinct snapshots, then resubmits each several times, the
+way client retries do, and reports per-request latency for first
+submissions (misses) and resubmissions (hits).
+"""
+import io
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault("WARMUP_ON_START", "False")
+
+import app  # noqa: E402
+
+
+def snapshots(count=4):
+    rng = np.random.default_rng(0)
+    frames = [cv2.GaussianBlur(rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8), (9, 9), 0)
+              for _ in range(count)]
+    return [cv2.imencode(".jpg", frame)[1].tobytes() for frame in frames]
+
+
+def post(client, data, output):
+    start = time.perf_counter()
+    response = client.post(f"/detect?output={output}",
+                           data={"image": (io.BytesIO(data), "snapshot.jpg")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 200, response.json
+    return (time.perf_counter() - start) * 1000, response.headers.get("X-Cache")
+
+
+def run(client, uploads, output, repeats):
+    first = [post(client, data, output)[0] for data in uploads]
+    again = [post(client, data, output) for _ in range(repeats) for data in uploads]
+    hits = sum(1 for _, status in again if status == "HIT")
+    return np.median(first), np.median([ms for ms, _ in again]), hits / len(again)
+
+
+def main():
+    uploads = snapshots()
+    client = app.app.test_client()
+    app.warm_up()
+
+    print(f"{'cache':<6} {'output':<6} {'first ms':>9} {'repeat ms':>10} {'hit rate':>9}")
+
+    for enabled in (False, True):
+        app.result_cache.max_entries = app.RESULT_CACHE_SIZE if enabled else 0
+        for output in ("json", "image"):
+            app.result_cache.clear()
+            first, repeat, hit_rate = run(client, uploads, output, repeats=3)
+            print(f"{'on' if enabled else 'off':<6} {output:<6} {first:>9.1f} {repeat:>10.1f} {hit_rate:>9.2f}")
+
+    print(f"\n{app.result_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark the slot-crop classifier engine against the detector engine
+
+Splits labeled frames (PKLot-style XML next to each image) into train and
+test sets, trains the classifier on the first unless --model is given,
+then runs both engines over the test frames and reports per-frame
+latency, slots/sec and per-slot precision/recall/F1 for "occupied".
+Decoding is excluded from both timings.
+
+Without a labeled set, synthetic fixtures are generated; without a model
+file, the fixture detector stands in for YOLO (see fixtures.py).
+
+Usage:
+    python tools/bench_slot_classifier.py [--images DIR] [--model classifier.npz]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+# Sibling helper; a script's own directory is on sys.path
+from fixtures import FixtureDetector, make_fixtures
+from src.evaluation import SlotMetrics, labeled_images, latency_summary
+from src.occupancy import OccupancyDetector
+from src.slot_classifier import ClassifierEngine, SlotClassifier, SlotWarper
+from src.slot_utils import load_slots
+
+MODEL_PATH = os.path.join(BASE_DIR, "models", "yolov8n.pt")
+SLOTS_PATH = os.path.join(BASE_DIR, "data", "UFPR04", "slots.json")
+IMAGES_DIR = os.path.join(BASE_DIR, "data", "UFPR04", "images")
+
+
+def train(slots, items):
+    """Classifier trained on the labeled slots of items"""
+    warper = SlotWarper(slots)
+    patches, labels = [], []
+    for img, frame_labels in items:
+        warped = warper.warp(img)
+        for i, slot_id in enumerate(warper.slot_ids):
+            if warper.valid[i] and slot_id in frame_labels:
+                patches.append(warped[i])
+                labels.append(frame_labels[slot_id])
+    return SlotClassifier.fit(np.stack(patches), np.array(labels))
+
+
+def run_engine(predict, items, warmup=2):
+    """Per-frame timings and accuracy of predict(img) -> predictions"""
+    for img, _ in items[:warmup]:
+        predict(img)
+
+    timings = []
+    metrics = SlotMetrics()
+    for img, labels in items:
+        start = time.perf_counter()
+        predictions = predict(img)
+        timings.append(time.perf_counter() - start)
+        metrics.update(predictions, labels)
+    return timings, metrics.summary()["overall"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slot classifier vs detector engine benchmark")
+    parser.add_argument("--images", default=IMAGES_DIR, help="Images with PKLot-style .xml labels")
+    parser.add_argument("--slots", default=SLOTS_PATH)
+    parser.add_argument("--model", default=None, help="Trained classifier (.npz); trained here if omitted")
+    parser.add_argument("--detector-model", default=MODEL_PATH)
+    parser.add_argument("--backend", default="pytorch")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Benchmark on this many generated fixtures instead of --images")
+    parser.add_argument("--fixture-detector", action="store_true",
+                        help="Use the fixture detector even if the detector model exists")
+    parser.add_argument("--test-share", type=float, default=0.5, help="Share of frames used for testing")
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    slots = load_slots(args.slots)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        if not args.synthetic and os.path.isdir(args.images):
+            paths = labeled_images(args.images, args.limit)
+        dataset = args.images
+
+        if not paths:
+            count = args.synthetic or args.limit or 60
+            make_fixtures(tmp, slots, count)
+            paths = labeled_images(tmp)
+            dataset = f"synthetic ({count} frames)"
+
+        items = [(cv2.imread(path), labels) for path, labels in paths]
+
+    split = int(len(items) * (1 - args.test_share))
+    train_items, test_items = items[:split], items[split:]
+
+    if args.model:
+        classifier = SlotClassifier.load(args.model)
+    else:
+        start = time.perf_counter()
+        classifier = train(slots, train_items)
+        print(f"Trained on {len(train_items)} frames in {time.perf_counter() - start:.2f}s")
+
+    if args.fixture_detector or not os.path.exists(args.detector_model):
+        detector, detector_name = FixtureDetector(), "fixture"
+    else:
+        from src.detect_cars import CarDetector
+        detector, detector_name = CarDetector(args.detector_model, backend=args.backend), args.backend
+
+    start = time.perf_counter()
+    engine = ClassifierEngine(slots, classifier)
+    compile_ms = (time.perf_counter() - start) * 1000
+    occupancy = OccupancyDetector(slots)
+
+    results = {
+        f"detector ({detector_name})": run_engine(lambda img: occupancy.predict(detector.detect(img)), test_items),
+        "classifier": run_engine(engine.predict, test_items),
+    }
+
+    print(f"{len(test_items)} test frames from {dataset}, {len(slots)} slots, "
+          f"warp maps compiled in {compile_ms:.1f} ms\n")
+    print(f"{'engine':<20} {'p50 ms':>8} {'p99 ms':>8} {'slots/s':>10} {'precision':>10} "
+          f"{'recall':>7} {'F1':>6} {'accuracy':>9}")
+    for name, (timings, overall) in results.items():
+        summary = latency_summary(timings)
+        slots_per_sec = len(slots) * len(timings) / sum(timings)
+        print(f"{name:<20} {summary['p50']:>8.2f} {summary['p99']:>8.2f} {slots_per_sec:>10,.0f} "
+              f"{overall['precision']:>10.3f} {overall['recall']:>7.3f} {overall['f1']:>6.3f} "
+              f"{overall['accuracy']:>9.3f}")
+
+    # Per-stage split of the classifier: warp vs features and scoring
+    img = test_items[0][0]
+    warp_timings, score_timings = [], []
+    for _ in range(50):
+        start = time.perf_counter()
+        patches = engine.warper.warp(img)
+        warp_timings.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        classifier.probabilities(patches)
+        score_timings.append(time.perf_counter() - start)
+    print(f"\nclassifier stages: warp p50 {latency_summary(warp_timings)['p50']:.3f} ms, "
+          f"features + scoring p50 {latency_summary(score_timings)['p50']:.3f} ms")
+    if dataset.startswith("synthetic") and detector_name != "fixture":
+        print("(synthetic fixtures do not look like cars; expect low recall from a real model)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark slot layout loading: pretty-printed JSON vs the binary format
+
+For 100 to 100k synthetic slots, times reading the file, and reading plus
+compiling the layout (occupancy geometry, renderer, crop region) the way
+the layout registry does.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.occupancy import OccupancyDetector
+from src.slot_utils import load_slot_arrays, load_slots, save_slot_arrays, slots_region
+from src.visualize import SlotRenderer
+
+
+def grid_slots(n_slots, size=40):
+    """Square slots on a grid, written the way create_slots_json.py writes them"""
+    cols = int(np.ceil(np.sqrt(n_slots)))
+    slots = {}
+    for i in range(n_slots):
+        x, y = (i % cols) * size, (i // cols) * size
+        slots[i + 1] = [[float(x), float(y)], [x + size - 4.0, float(y)],
+                        [x + size - 4.0, y + size - 4.0], [float(x), y + size - 4.0]]
+    return slots
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def compile_layout(path):
+    slots = load_slots(path)
+    OccupancyDetector(slots)
+    SlotRenderer(slots)
+    slots_region(slots)
+
+
+def main():
+    print(f"{'slots':>7} {'json KB':>9} {'npz KB':>8} {'json ms':>9} {'npz ms':>8} "
+          f"{'arrays ms':>10} {'json+compile':>13} {'npz+compile':>12}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_slots in (100, 1000, 10000, 100000):
+            slots = grid_slots(n_slots)
+            json_path = os.path.join(tmp, f"{n_slots}.json")
+            npz_path = os.path.join(tmp, f"{n_slots}.npz")
+
+            with open(json_path, "w") as f:
+                json.dump(slots, f, indent=4)
+            save_slot_arrays(slots, npz_path)
+
+            repeat = 5 if n_slots < 100000 else 2
+            t_json = timed(lambda: load_slots(json_path), repeat)
+            t_npz = timed(lambda: load_slots(npz_path), repeat)
+            t_arrays = timed(lambda: load_slot_arrays(npz_path), repeat)
+            t_json_full = timed(lambda: compile_layout(json_path), repeat)
+            t_npz_full = timed(lambda: compile_layout(npz_path), repeat)
+
+            print(f"{n_slots:>7} {os.path.getsize(json_path) / 1024:>9.0f} "
+                  f"{os.path.getsize(npz_path) / 1024:>8.0f} {t_json:>9.1f} {t_npz:>8.1f} "
+                  f"{t_arrays:>10.2f} {t_json_full:>13.1f} {t_npz_full:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark app startup: import time, model load, warm-up and first request
+
+Each scenario runs in a fresh interpreter so import caches do not carry over.
+The result cache is disabled, so the second request (the same frame) runs
+inference again instead of hitting the cache.
+"""
+import json
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIO = r'''
+import io, json, time
+t0 = time.perf_counter()
+import app
+t_import = time.perf_counter() - t0
+
+import cv2, numpy as np
+frame = np.random.default_rng(0).integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+data = cv2.imencode(".jpg", frame)[1].tobytes()
+client = app.app.test_client()
+
+def request():
+    start = time.perf_counter()
+    response = client.post("/detect?output=json", data={"image": (io.BytesIO(data), "frame.jpg")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 200, response.json
+    return time.perf_counter() - start
+
+t_load = t_warmup = 0.0
+if WARMUP:
+    start = time.perf_counter()
+    app.get_detector()
+    t_load = time.perf_counter() - start
+    start = time.perf_counter()
+    app.warm_up()
+    t_warmup = time.perf_counter() - start
+
+first = request()
+second = request()
+print(json.dumps({"import": t_import, "load": t_load, "warmup": t_warmup,
+                  "first": first, "second": second}))
+'''
+
+
+def run(warmup):
+    env = dict(os.environ, WARMUP_ON_START="False", RESULT_CACHE_SIZE="0")
+    code = f"WARMUP = {warmup}\n" + SCENARIO
+    out = subprocess.run([sys.executable, "-c", code], cwd=BASE_DIR, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    print(f"{'scenario':<16} {'import s':>9} {'load s':>8} {'warm-up s':>10} "
+          f"{'1st req ms':>11} {'2nd req ms':>11} {'ready s':>8}")
+
+    for name, warmup in (("lazy, no warmup", False), ("explicit warmup", True)):
+        r = run(warmup)
+        ready = r["import"] + r["load"] + r["warmup"]
+        print(f"{name:<16} {r['import']:>9.2f} {r['load']:>8.2f} {r['warmup']:>10.2f} "
+              f"{1000 * r['first']:>11.1f} {1000 * r['second']:>11.1f} {ready:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
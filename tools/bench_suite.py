@@ -0,0 +1,199 @@
+"""
+Accuracy and throughput benchmark of the full pipeline over a labeled image set
+
+Runs decode -> CarDetector -> OccupancyDetector -> draw_results -> JPEG
+encode on every labeled image and reports per-stage latency percentiles,
+images/sec, peak memory and per-slot precision/recall/F1 for "occupied".
+Results are written as JSON so runs can be compared across commits.
+
+Labels are PKLot-style XML files next to each image (same stem, .xml).
+Without a labeled set, synthetic fixtures are generated from the slot
+layout; without a model file, a fixture detector that finds the synthetic
+cars is used instead of YOLO.
+
+Usage:
+    python tools/bench_suite.py [--images DIR] [--output run.json] [--compare previous.json]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+# Sibling helper; a script's own directory is on sys.path
+from fixtures import FixtureDetector, make_fixtures
+from src.evaluation import SlotMetrics, labeled_images, latency_summary
+from src.occupancy import OccupancyDetector
+from src.slot_utils import load_slots
+from src.visualize import draw_results
+
+MODEL_PATH = os.path.join(BASE_DIR, "models", "yolov8n.pt")
+SLOTS_PATH = os.path.join(BASE_DIR, "data", "UFPR04", "slots.json")
+IMAGES_DIR = os.path.join(BASE_DIR, "data", "UFPR04", "images")
+
+STAGES = ["decode", "detect", "occupancy", "render", "encode"]
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process (ru_maxrss is KiB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_pipeline(items, detector, occupancy, slots, warmup=2):
+    """Run every stage on every image and collect timings and metrics"""
+    for path, _ in items[:warmup]:
+        img = cv2.imread(path)
+        draw_results(img, slots, occupancy.predict(detector.detect(img)))
+
+    timings = {stage: [] for stage in STAGES}
+    metrics = SlotMetrics()
+    start = time.perf_counter()
+
+    for path, labels in items:
+        t0 = time.perf_counter()
+        img = cv2.imread(path)
+        t1 = time.perf_counter()
+        boxes = detector.detect(img)
+        t2 = time.perf_counter()
+        predictions = occupancy.predict(boxes)
+        t3 = time.perf_counter()
+        output = draw_results(img, slots, predictions)
+        t4 = time.perf_counter()
+        cv2.imencode(".jpg", output, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        t5 = time.perf_counter()
+
+        for stage, seconds in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4)):
+            timings[stage].append(seconds)
+        metrics.update(predictions, labels)
+
+    elapsed = time.perf_counter() - start
+    return timings, metrics, elapsed
+
+
+def compare(current, previous):
+    """Print stage latency and accuracy changes against an earlier run"""
+    print(f"\nCompared with {previous['meta'].get('commit')} ({previous['meta'].get('timestamp')}):")
+    for stage in STAGES:
+        old = previous["stages"].get(stage, {}).get("p50")
+        new = current["stages"][stage].get("p50")
+        if old and new:
+            print(f"  {stage:<10} p50 {old:8.2f} -> {new:8.2f} ms ({100 * (new - old) / old:+.1f}%)")
+
+    old, new = previous["throughput"]["images_per_sec"], current["throughput"]["images_per_sec"]
+    print(f"  {'images/s':<10}     {old:8.2f} -> {new:8.2f}")
+    old, new = previous["accuracy"]["overall"]["f1"], current["accuracy"]["overall"]["f1"]
+    print(f"  {'F1':<10}     {old:8.4f} -> {new:8.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-pipeline accuracy and throughput benchmark")
+    parser.add_argument("--images", default=IMAGES_DIR, help="Images with PKLot-style .xml labels")
+    parser.add_argument("--slots", default=SLOTS_PATH)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--backend", default="pytorch")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Benchmark on this many generated fixtures instead of --images")
+    parser.add_argument("--fixture-detector", action="store_true",
+                        help="Use the fixture detector even if the model exists")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare with")
+    args = parser.parse_args()
+
+    slots = load_slots(args.slots)
+    occupancy = OccupancyDetector(slots)
+    rss_start = peak_rss_mb()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        items = []
+        if not args.synthetic and os.path.isdir(args.images):
+            items = labeled_images(args.images, args.limit)
+        dataset = args.images
+
+        if not items:
+            count = args.synthetic or args.limit or 50
+            make_fixtures(tmp, slots, count)
+            items = labeled_images(tmp)
+            dataset = f"synthetic ({count} frames)"
+
+        synthetic = dataset.startswith("synthetic")
+        if args.fixture_detector or not os.path.exists(args.model):
+            detector, detector_name = FixtureDetector(), "fixture"
+        else:
+            from src.detect_cars import CarDetector
+            detector, detector_name = CarDetector(args.model, backend=args.backend), args.backend
+
+        timings, metrics, elapsed = run_pipeline(items, detector, occupancy, slots)
+
+    accuracy = metrics.summary()
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "dataset": dataset,
+            "images": len(items),
+            "slots": len(slots),
+            "detector": detector_name,
+            "cpus": os.cpu_count(),
+        },
+        "throughput": {
+            "seconds": round(elapsed, 3),
+            "images_per_sec": round(len(items) / elapsed, 2),
+        },
+        "stages": {stage: latency_summary(samples) for stage, samples in timings.items()},
+        "memory": {
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "pipeline_growth_mb": round(peak_rss_mb() - rss_start, 1),
+        },
+        "accuracy": accuracy,
+    }
+
+    print(f"{len(items)} images from {dataset}, detector: {detector_name}\n")
+    print(f"{'stage':<10} {'mean ms':>9} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    for stage, summary in results["stages"].items():
+        print(f"{stage:<10} {summary['mean']:>9.2f} {summary['p50']:>8.2f} {summary['p90']:>8.2f} "
+              f"{summary['p99']:>8.2f} {summary['max']:>8.2f}")
+
+    overall = accuracy["overall"]
+    print(f"\n{results['throughput']['images_per_sec']} images/sec, "
+          f"peak RSS {results['memory']['peak_rss_mb']} MB")
+    print(f"occupied: precision {overall['precision']:.3f}, recall {overall['recall']:.3f}, "
+          f"F1 {overall['f1']:.3f}, accuracy {overall['accuracy']:.3f}")
+
+    # Slots that were never occupied nor predicted occupied have no F1
+    scored = [(slot_id, scores) for slot_id, scores in accuracy["per_slot"].items()
+              if scores["tp"] + scores["fp"] + scores["fn"]]
+    worst = sorted(scored, key=lambda item: item[1]["f1"])[:5]
+    print("lowest F1 slots: " + ", ".join(f"{slot_id} ({s['f1']:.2f})" for slot_id, s in worst))
+    if synthetic and detector_name != "fixture":
+        print("(synthetic fixtures do not look like cars; expect low recall from a real model)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark the upload handling path: disk round trip versus in-memory decode
+"""
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.slot_utils import load_slots
+from src.visualize import draw_results
+
+SLOTS_PATH = os.path.join(BASE_DIR, "data", "UFPR04", "slots.json")
+
+
+def synthetic_upload(width=1280, height=720, seed=0):
+    """JPEG bytes of a noisy frame, roughly the size of a camera snapshot"""
+    rng = np.random.default_rng(seed)
+    img = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (9, 9), 0)
+    return cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def legacy_request(data, upload_dir, slots, predictions):
+    """Previous /detect I/O: save upload, read it back, overwrite with result"""
+    filepath = os.path.join(upload_dir, "upload.jpg")
+    with open(filepath, "wb") as f:
+        f.write(data)
+
+    img = cv2.imread(filepath)
+    output = draw_results(img, slots, predictions)
+    cv2.imwrite(filepath, output)
+    return 3  # write, read, write
+
+
+def memory_request(data, slots, predictions, render):
+    """Current /detect I/O: decode from bytes, optionally encode the result"""
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if render:
+        output = draw_results(img, slots, predictions)
+        cv2.imencode(".jpg", output, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return 0
+
+
+def run(name, fn, requests):
+    """Time fn over a number of requests and count disk operations"""
+    disk_ops = 0
+    latencies = []
+
+    for _ in range(requests):
+        start = time.perf_counter()
+        disk_ops += fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    elapsed = sum(latencies) / 1000
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"{name:<22} {p50:>8.2f} {p99:>8.2f} {requests / elapsed:>9.1f} "
+          f"{disk_ops / requests:>9.1f} {disk_ops / elapsed:>9.1f}")
+
+
+def main(requests=200):
+    slots = load_slots(SLOTS_PATH)
+    predictions = {slot_id: slot_id % 2 == 0 for slot_id in slots}
+    data = synthetic_upload()
+
+    print(f"upload size: {len(data) / 1024:.0f} KiB, {requests} requests\n")
+    print(f"{'path':<22} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>9} {'ops/req':>9} {'IOPS':>9}")
+
+    with tempfile.TemporaryDirectory() as upload_dir:
+        run("disk round trip", lambda: legacy_request(data, upload_dir, slots, predictions), requests)
+
+    run("in-memory + image", lambda: memory_request(data, slots, predictions, True), requests)
+    run("in-memory json only", lambda: memory_request(data, slots, predictions, False), requests)
+
+
+if __name__ == "__main__":
+    main()
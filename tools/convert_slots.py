@@ -0,0 +1,48 @@
+"""
+Convert a slots.json layout to the binary (.npz) layout format
+
+The binary file holds three arrays: slot ids, vertex offsets and float64
+vertices, stored uncompressed so they can be memory-mapped. load_slots()
+and the layout registry read it directly; of a slots.npz and slots.json
+side by side, the registry uses whichever was written last.
+
+Usage:
+    python tools/convert_slots.py data/UFPR04/slots.json [-o data/UFPR04/slots.npz]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.slot_utils import BINARY_SUFFIX, load_slot_arrays, load_slots, save_slot_arrays
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert slots.json to the binary layout format")
+    parser.add_argument("source", help="slots.json file")
+    parser.add_argument("-o", "--output", help="Output path (default: source with .npz suffix)")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.source)[0] + BINARY_SUFFIX
+    slots = load_slots(args.source)
+    save_slot_arrays(slots, output)
+
+    # Round-trip check; float64 keeps fractional coordinates exact
+    ids, offsets, vertices = load_slot_arrays(output)
+    expected = np.concatenate([np.asarray(p, np.float64).reshape(-1, 2) for p in slots.values()]) \
+        if slots else np.zeros((0, 2))
+    if ids.tolist() != list(slots) or not np.array_equal(vertices, expected):
+        print(f"Round-trip mismatch writing {output}")
+        return 1
+
+    print(f"Wrote {len(ids)} slots ({len(vertices)} vertices) to {output}: "
+          f"{os.path.getsize(args.source)} -> {os.path.getsize(output)} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+Load test of the live occupancy feed (GET /live/<lot_id>)
+
+Starts the app in a subprocess with a publisher thread that pushes a
+synthetic frame of --slots slots at --rate frames/sec (a few slots change
+per frame), then connects increasing numbers of SSE subscribers from one
+selector loop and reports delivered events/sec, publish-to-receive latency
+and server CPU and memory. A share of the subscribers (--slow) never read,
+to show that slow clients are resynced instead of stalling the others.
+
+Usage:
+    python tools/load_live_feed.py [--subscribers 10,100,500,1000] [--seconds 10]
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import selectors
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+LOT_ID = "UFPR04"
+
+
+def raise_fd_limit():
+    """Allow as many sockets as the hard limit permits"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def serve(port, n_slots, rate, flip_rate):
+    """Run the app with a synthetic publisher (subprocess entry point)"""
+    raise_fd_limit()
+    os.environ.setdefault("WARMUP_ON_START", "False")
+    os.environ.setdefault("HISTORY_DB", "")
+    os.environ.setdefault("LIVE_MAX_SUBSCRIBERS", "100000")
+
+    from werkzeug.serving import ThreadedWSGIServer, make_server
+    import app as server
+
+    def publish():
+        rng = np.random.default_rng(0)
+        state = rng.random(n_slots) < 0.5
+        interval = 1 / rate
+        next_frame = time.perf_counter()
+        while True:
+            state ^= rng.random(n_slots) < flip_rate
+            server.live_feed.publish(LOT_ID, dict(zip(range(1, n_slots + 1), state.tolist())))
+            next_frame += interval
+            time.sleep(max(0, next_frame - time.perf_counter()))
+
+    threading.Thread(target=publish, daemon=True).start()
+    # Accept bursts of new subscribers without refusing connections
+    ThreadedWSGIServer.request_queue_size = 1024
+    make_server("127.0.0.1", port, server.app, threaded=True).serve_forever()
+
+
+def process_usage(pid):
+    """CPU seconds and RSS (MB) of a process from /proc"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    rss = int(fields[21]) * resource.getpagesize() / 1e6
+    return cpu, rss
+
+
+def subscribers_now(port):
+    """parking_live_subscribers from the server's /metrics"""
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        sock.sendall(b"GET /metrics HTTP/1.0\r\n\r\n")
+        data = b""
+        while chunk := sock.recv(65536):
+            data += chunk
+    match = re.search(rb"^parking_live_subscribers (\d+)", data, re.M)
+    return int(match.group(1)) if match else None
+
+
+class Client:
+    """One SSE connection read from the shared selector"""
+
+    def __init__(self, sock, slow):
+        self.sock = sock
+        self.slow = slow
+        self.buffer = b""
+        self.events = 0
+        self.snapshots = 0
+        self.latencies = []
+
+    def feed(self, data, now):
+        self.buffer += data
+        *complete, self.buffer = self.buffer.split(b"\n\n")
+        for block in complete:
+            if b"\ndata: " not in block:
+                # HTTP headers and keepalive comments
+                continue
+            kind = block.split(b"event: ", 1)[1].split(b"\n", 1)[0]
+            payload = json.loads(block.split(b"data: ", 1)[1])
+            self.events += 1
+            self.snapshots += kind == b"snapshot"
+            if payload["timestamp"] is not None:
+                self.latencies.append(now - payload["timestamp"])
+
+
+def run_round(port, count, seconds, slow_share):
+    """Hold count subscriptions open for seconds and collect their events"""
+    selector = selectors.DefaultSelector()
+    clients = []
+    request = f"GET /live/{LOT_ID} HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n".encode()
+
+    for i in range(count):
+        sock = socket.create_connection(("127.0.0.1", port))
+        # Slow clients keep a tiny receive buffer and never read it
+        slow = i < int(count * slow_share)
+        if slow:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        sock.sendall(request)
+        sock.setblocking(False)
+        client = Client(sock, slow)
+        clients.append(client)
+        if not slow:
+            selector.register(sock, selectors.EVENT_READ, client)
+
+    # Give the server time to start a thread per connection
+    deadline = time.time() + 30
+    while subscribers_now(port) < count and time.time() < deadline:
+        time.sleep(0.2)
+    connected = subscribers_now(port)
+
+    for client in clients:
+        client.events = client.snapshots = 0
+        client.latencies = []
+
+    start = time.time()
+    while time.time() - start < seconds:
+        for key, _ in selector.select(timeout=0.5):
+            try:
+                data = key.fileobj.recv(262144)
+            except BlockingIOError:
+                continue
+            key.data.feed(data, time.time())
+    elapsed = time.time() - start
+
+    for client in clients:
+        client.sock.close()
+    selector.close()
+
+    readers = [client for client in clients if not client.slow]
+    latencies = np.concatenate([client.latencies for client in readers if client.latencies] or [[0.0]]) * 1000
+    return {
+        "connected": connected,
+        "events_per_sec": sum(client.events for client in readers) / elapsed,
+        "per_client": sum(client.events for client in readers) / max(1, len(readers)) / elapsed,
+        "resyncs": sum(max(0, client.snapshots - 1) for client in readers),
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live feed subscriber load test")
+    parser.add_argument("--subscribers", default="10,100,250,500,1000",
+                        help="Comma-separated subscriber counts to test")
+    parser.add_argument("--seconds", type=float, default=10, help="Measurement time per round")
+    parser.add_argument("--slots", type=int, default=100, help="Slots in the synthetic lot")
+    parser.add_argument("--rate", type=float, default=5, help="Published frames per second")
+    parser.add_argument("--flip-rate", type=float, default=0.05, help="Share of slots changing per frame")
+    parser.add_argument("--slow", type=float, default=0.05, help="Share of subscribers that never read")
+    parser.add_argument("--port", type=int, default=5077)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.slots, args.rate, args.flip_rate)
+        return
+
+    raise_fd_limit()
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(args.port),
+         "--slots", str(args.slots), "--rate", str(args.rate), "--flip-rate", str(args.flip_rate)],
+        cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    try:
+        for _ in range(300):
+            try:
+                subscribers_now(args.port)
+                break
+            except OSError:
+                time.sleep(0.1)
+
+        print(f"{args.slots} slots, {args.rate} frames/s, ~{args.slots * args.flip_rate:.0f} changes/frame, "
+              f"{args.slow:.0%} slow subscribers, {os.cpu_count()} CPUs\n")
+        print(f"{'subs':>6} {'connected':>9} {'events/s':>10} {'per sub':>8} {'resyncs':>8} "
+              f"{'p50 ms':>8} {'p99 ms':>8} {'srv cpu%':>9} {'srv MB':>7}")
+
+        for count in (int(n) for n in args.subscribers.split(",")):
+            cpu_start, _ = process_usage(server.pid)
+            wall_start = time.time()
+            result = run_round(args.port, count, args.seconds, args.slow)
+            cpu_end, rss = process_usage(server.pid)
+            cpu = 100 * (cpu_end - cpu_start) / (time.time() - wall_start)
+
+            print(f"{count:>6} {result['connected']:>9} {result['events_per_sec']:>10.0f} "
+                  f"{result['per_client']:>8.2f} {result['resyncs']:>8} {result['p50']:>8.1f} "
+                  f"{result['p99']:>8.1f} {cpu:>9.0f} {rss:>7.0f}")
+
+            # Wait for the server to notice the closed connections
+            for _ in range(100):
+                if subscribers_now(args.port) == 0:
+                    break
+                time.sleep(0.2)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
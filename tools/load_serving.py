@@ -0,0 +1,253 @@
+"""
+Load test of POST /detect on the Flask server against the ASGI server
+
+Starts each server in a subprocess, then drives it from one asyncio loop
+with --clients closed-loop clients posting a frame as fast as they get
+answers, while --slow clients trickle their uploads a few bytes at a time.
+Reports requests/sec, latency percentiles, errors and the server's thread
+count and RSS for every slow-client count.
+
+Frames are --distinct synthetic images cycled across requests, so after
+the first pass requests hit the result cache and the numbers measure the
+serving layer; pass --distinct 0 to make every request run detection.
+
+Usage:
+    python tools/load_serving.py [--servers flask,asgi] [--slow 0,100,500] [--seconds 10]
+"""
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+BOUNDARY = "loadservingboundary"
+
+
+def raise_fd_limit():
+    """Allow as many sockets as the hard limit permits"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def serve(kind, port):
+    """Run one server (subprocess entry point)"""
+    raise_fd_limit()
+    os.environ.setdefault("WARMUP_ON_START", "False")
+    os.environ.setdefault("HISTORY_DB", "")
+
+    if kind == "asgi":
+        import uvicorn
+        uvicorn.run("asgi:app", host="127.0.0.1", port=port, log_level="warning", backlog=2048)
+    else:
+        from werkzeug.serving import ThreadedWSGIServer, make_server
+        import app as server
+        # Same server app.run() uses; a deeper backlog so bursts are not refused
+        ThreadedWSGIServer.request_queue_size = 2048
+        make_server("127.0.0.1", port, server.app, threaded=True).serve_forever()
+
+
+def process_usage(pid):
+    """Thread count and RSS (MB) of a process from /proc"""
+    usage = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("Threads", "VmRSS"):
+                usage[name] = int(value.split()[0])
+    return usage["Threads"], usage["VmRSS"] / 1024
+
+
+def make_frames(count, seed=0):
+    """Distinct JPEG frames of a 720p scene"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(max(1, count)):
+        image = rng.integers(0, 256, (72, 128, 3), dtype=np.uint8)
+        image = cv2.resize(image, (1280, 720), interpolation=cv2.INTER_LINEAR)
+        frames.append(cv2.imencode(".jpg", image)[1].tobytes())
+    return frames
+
+
+def detect_request(port, image):
+    """Raw HTTP/1.1 POST /detect (JSON output) carrying image"""
+    body = (
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"image\"; filename=\"frame.jpg\"\r\n"
+        f"Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + image + f"\r\n--{BOUNDARY}--\r\n".encode()
+    head = (
+        f"POST /detect?output=json HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nConnection: close\r\n"
+        f"Content-Type: multipart/form-data; boundary={BOUNDARY}\r\nContent-Length: {len(body)}\r\n\r\n"
+    ).encode()
+    return head, body
+
+
+async def fetch_status(port, head, body, timeout):
+    """Send one request and return its HTTP status"""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", port), timeout)
+    try:
+        writer.write(head + body)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+        return int(response.split(b" ", 2)[1])
+    finally:
+        writer.close()
+
+
+async def fast_client(port, frames, offset, deadline, stats, timeout):
+    """Post frames back to back until the deadline"""
+    i = offset
+    while time.perf_counter() < deadline:
+        head, body = frames[i % len(frames)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            status = await fetch_status(port, head, body, timeout)
+        except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+            status = None
+        if status == 200:
+            stats["latencies"].append(time.perf_counter() - start)
+        else:
+            stats["errors"] += 1
+            await asyncio.sleep(0.05)
+
+
+async def slow_client(port, request, connected, interval):
+    """Hold a connection open by trickling an upload 16 bytes at a time"""
+    head, body = request
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    except OSError:
+        return
+    connected.append(writer)
+    try:
+        writer.write(head)
+        for i in range(0, len(body), 16):
+            writer.write(body[i:i + 16])
+            await writer.drain()
+            await asyncio.sleep(interval)
+    except (OSError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+
+async def run_round(port, pid, frames, clients, slow, seconds, timeout):
+    """Measure fast clients while slow clients hold connections"""
+    connected = []
+    slow_tasks = [asyncio.create_task(slow_client(port, frames[0], connected, 0.5)) for _ in range(slow)]
+    # Let the slow clients connect and the server take them on
+    for _ in range(100):
+        if len(connected) >= slow:
+            break
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(1)
+
+    stats = {"latencies": [], "errors": 0}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        fast_client(port, frames, i, start + seconds, stats, timeout) for i in range(clients)
+    ))
+    elapsed = time.perf_counter() - start
+    threads, rss = process_usage(pid)
+
+    for task in slow_tasks:
+        task.cancel()
+    await asyncio.gather(*slow_tasks, return_exceptions=True)
+
+    latencies = np.array(stats["latencies"] or [0.0]) * 1000
+    return {
+        "slow": len(connected),
+        "rps": len(stats["latencies"]) / elapsed,
+        "p50": float(np.percentile(latencies, 50)),
+        "p90": float(np.percentile(latencies, 90)),
+        "p99": float(np.percentile(latencies, 99)),
+        "errors": stats["errors"],
+        "threads": threads,
+        "rss": rss,
+    }
+
+
+async def wait_ready(port, limit=120):
+    """Wait for the server to accept connections and answer /healthz"""
+    deadline = time.time() + limit
+    while time.time() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /healthz HTTP/1.0\r\n\r\n")
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            if response.startswith(b"HTTP/1.1 200") or response.startswith(b"HTTP/1.0 200"):
+                return True
+        except OSError:
+            pass
+        await asyncio.sleep(0.5)
+    return False
+
+
+async def benchmark(kind, args, frames):
+    """Start one server and run every slow-client round against it"""
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", kind, "--port", str(args.port)],
+        cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        if not await wait_ready(args.port):
+            print(f"{kind}: server did not start")
+            return
+
+        # Warm the detector (and the result cache, when frames repeat)
+        for head, body in frames[:args.distinct or 1]:
+            await fetch_status(args.port, head, body, 120)
+
+        for slow in (int(n) for n in args.slow.split(",")):
+            result = await run_round(args.port, server.pid, frames, args.clients, slow,
+                                     args.seconds, args.timeout)
+            print(f"{kind:>6} {result['slow']:>6} {result['rps']:>8.1f} {result['p50']:>8.1f} "
+                  f"{result['p90']:>8.1f} {result['p99']:>8.1f} {result['errors']:>7} "
+                  f"{result['threads']:>8} {result['rss']:>7.0f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flask vs ASGI /detect load test")
+    parser.add_argument("--servers", default="flask,asgi", help="Comma-separated servers to test")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent fast clients")
+    parser.add_argument("--slow", default="0,100,500", help="Comma-separated slow-client counts")
+    parser.add_argument("--seconds", type=float, default=10, help="Measurement time per round")
+    parser.add_argument("--distinct", type=int, default=8,
+                        help="Distinct frames cycled (0: a new frame per request, cache always misses)")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--port", type=int, default=5078)
+    parser.add_argument("--serve", choices=("flask", "asgi"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+
+    raise_fd_limit()
+    count = args.distinct or 2000
+    frames = [detect_request(args.port, image) for image in make_frames(count)]
+
+    print(f"{args.clients} fast clients, slow clients trickle 16 B / 0.5 s, "
+          f"{args.distinct or 'unique'} frames, {os.cpu_count()} CPUs\n")
+    print(f"{'server':>6} {'slow':>6} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+          f"{'errors':>7} {'threads':>8} {'srv MB':>7}")
+
+    for kind in args.servers.split(","):
+        asyncio.run(benchmark(kind, args, frames))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Quantize the detector to INT8 and check it against the fp32 model
+
+Calibrates a static INT8 ONNX model on images from data/UFPR04/images,
+writes it where the onnx-int8 backend loads it from, then runs fp32 and
+INT8 side by side on held-out images and reports per-slot occupancy
+agreement and images/sec.
+
+Usage:
+    python tools/quantize_model.py [--mode static|dynamic] [--calibration 64] [--eval 100]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.detect_cars import CarDetector, export_model, exported_model_path
+from src.occupancy import OccupancyDetector
+from src.quantize import quantize_onnx
+from src.slot_utils import load_slots
+
+MODEL_PATH = os.path.join(BASE_DIR, "models", "yolov8n.pt")
+SLOTS_PATH = os.path.join(BASE_DIR, "data", "UFPR04", "slots.json")
+IMAGES_DIR = os.path.join(BASE_DIR, "data", "UFPR04", "images")
+
+
+def split_images(images_dir, n_calibration, n_eval):
+    """Spread calibration and evaluation picks over the whole directory"""
+    paths = sorted(Path(images_dir).glob("*.jpg")) if os.path.isdir(images_dir) else []
+    if not paths:
+        return [], []
+
+    calibration = paths[::max(1, len(paths) // n_calibration)][:n_calibration]
+    chosen = set(calibration)
+    rest = [p for p in paths if p not in chosen]
+    evaluation = rest[::max(1, len(rest) // n_eval)][:n_eval]
+    return calibration, evaluation
+
+
+def run_detector(detector, images, occupancy):
+    """Occupancy predictions per image and throughput in images/sec"""
+    detector.detect(images[0])  # warm-up
+
+    predictions = []
+    start = time.perf_counter()
+    for img in images:
+        predictions.append(occupancy.predict(detector.detect(img)))
+    elapsed = time.perf_counter() - start
+
+    return predictions, len(images) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="INT8 quantization with an accuracy check")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--slots", default=SLOTS_PATH)
+    parser.add_argument("--images", default=IMAGES_DIR)
+    parser.add_argument("--mode", choices=["static", "dynamic"], default="static")
+    parser.add_argument("--calibration", type=int, default=64, help="Images used to calibrate")
+    parser.add_argument("--eval", type=int, default=100, help="Held-out images to compare on")
+    parser.add_argument("--min-agreement", type=float, default=0.98,
+                        help="Slot agreement needed to call INT8 safe")
+    args = parser.parse_args()
+
+    calibration_paths, eval_paths = split_images(args.images, args.calibration, args.eval)
+    if not eval_paths:
+        print(f"No images found in {args.images}")
+        return 1
+
+    onnx_path = export_model(args.model, "onnx")
+    int8_path = exported_model_path(args.model, "onnx-int8")
+
+    calibration = [cv2.imread(str(p)) for p in calibration_paths] if args.mode == "static" else None
+    start = time.perf_counter()
+    quantize_onnx(onnx_path, int8_path, calibration_images=calibration)
+    print(f"Wrote {args.mode} INT8 model to {int8_path} "
+          f"({len(calibration or [])} calibration images, {time.perf_counter() - start:.1f}s)")
+
+    images = [cv2.imread(str(p)) for p in eval_paths]
+    occupancy = OccupancyDetector(load_slots(args.slots))
+
+    fp32, fp32_rate = run_detector(CarDetector(args.model, backend="onnx"), images, occupancy)
+    int8, int8_rate = run_detector(CarDetector(args.model, backend="onnx-int8"), images, occupancy)
+
+    slot_ids = list(fp32[0].keys())
+    agree = np.array([[a[k] == b[k] for k in slot_ids] for a, b in zip(fp32, int8)])
+    per_slot = agree.mean(axis=0)
+    overall = agree.mean()
+
+    print(f"\nEvaluated on {len(images)} held-out images")
+    print(f"fp32 onnx:  {fp32_rate:6.2f} images/sec")
+    print(f"int8 onnx:  {int8_rate:6.2f} images/sec ({int8_rate / fp32_rate:.2f}x)")
+    print(f"slot agreement: {100 * overall:.2f}% overall, "
+          f"{100 * agree.all(axis=1).mean():.1f}% of images identical")
+
+    worst = np.argsort(per_slot)[:5]
+    print("least stable slots: " + ", ".join(
+        f"{slot_ids[i]} ({100 * per_slot[i]:.0f}%)" for i in worst))
+
+    safe = overall >= args.min_agreement
+    print(f"\n{'SAFE' if safe else 'NOT SAFE'} to enable onnx-int8 "
+          f"(needs {100 * args.min_agreement:.0f}% slot agreement)")
+    return 0 if safe else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
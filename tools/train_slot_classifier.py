@@ -0,0 +1,142 @@
+"""
+Train the slot-crop occupancy classifier for a lot
+
+Labeled crops come from frames with PKLot-style XML labels (same stem,
+.xml), warped with the lot's own slot layout so training sees exactly the
+patches the engine sees at runtime, and/or from a directory of ready-cut
+crops in occupied/ and empty/ subdirectories (the PKLotSegmented layout).
+Without either, synthetic fixtures are generated. A share of the frames
+is held out to report accuracy before the model is written.
+
+Select the engine for the lot with OCCUPANCY_ENGINE=classifier, or
+OCCUPANCY_ENGINES=<lot_id>=classifier for some lots only.
+
+Usage:
+    python tools/train_slot_classifier.py --images DIR [--crops DIR] [--lot UFPR04]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+# Sibling helper; a script's own directory is on sys.path
+from fixtures import make_fixtures
+from src.evaluation import SlotMetrics, labeled_images
+from src.layouts import CLASSIFIER_FILE
+from src.slot_classifier import PATCH_SIZE, SlotClassifier, SlotWarper
+from src.slot_utils import load_slots
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+
+
+def frame_patches(warper, items):
+    """Labeled patches of every labeled, warpable slot in the frames"""
+    patches, labels = [], []
+    for path, frame_labels in items:
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        warped = warper.warp(img)
+        for i, slot_id in enumerate(warper.slot_ids):
+            if warper.valid[i] and slot_id in frame_labels:
+                patches.append(warped[i])
+                labels.append(frame_labels[slot_id])
+    return patches, labels
+
+
+def crop_patches(crops_dir, patch_size):
+    """Patches from crops sorted into occupied/ and empty/ subdirectories"""
+    patches, labels = [], []
+    for path in sorted(Path(crops_dir).rglob("*")):
+        kind = path.parent.name.lower()
+        if path.suffix.lower() not in IMAGE_SUFFIXES or kind not in ("occupied", "empty"):
+            continue
+        img = cv2.imread(str(path))
+        if img is not None:
+            patches.append(cv2.resize(img, patch_size, interpolation=cv2.INTER_AREA))
+            labels.append(kind == "occupied")
+    return patches, labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the slot-crop occupancy classifier")
+    parser.add_argument("--lot", default="UFPR04", help="Lot whose layout the frames were taken with")
+    parser.add_argument("--layouts", default=os.path.join(BASE_DIR, "data"), help="Layouts directory")
+    parser.add_argument("--images", default=None, help="Frames with PKLot-style .xml labels")
+    parser.add_argument("--crops", default=None, help="Crops in occupied/ and empty/ subdirectories")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Train on this many generated fixtures instead of --images")
+    parser.add_argument("--holdout", type=float, default=0.25, help="Share of frames held out for validation")
+    parser.add_argument("--l2", type=float, default=1.0, help="L2 penalty on the weights")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Occupied above this probability")
+    parser.add_argument("--patch-size", type=int, nargs=2, default=PATCH_SIZE, metavar=("W", "H"))
+    parser.add_argument("--output", default=None,
+                        help=f"Model file (default: <layouts>/<lot>/{CLASSIFIER_FILE})")
+    args = parser.parse_args()
+
+    lot_dir = os.path.join(args.layouts, args.lot)
+    slots_path = next((str(p) for p in sorted(Path(lot_dir).glob("slots.*"))), None)
+    if slots_path is None:
+        parser.error(f"No slots file in {lot_dir}")
+
+    slots = load_slots(slots_path)
+    warper = SlotWarper(slots, tuple(args.patch_size))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        items = labeled_images(args.images) if args.images and not args.synthetic else []
+        if not items and not args.crops:
+            count = args.synthetic or 100
+            make_fixtures(tmp, slots, count)
+            items = labeled_images(tmp)
+            print(f"No labeled frames; using {count} synthetic fixtures")
+
+        # Hold out whole frames, so validation patches come from unseen images
+        order = np.random.default_rng(0).permutation(len(items))
+        split = int(len(items) * (1 - args.holdout)) if len(items) > 1 else len(items)
+        train_items = [items[i] for i in order[:split]]
+        test_items = [items[i] for i in order[split:]]
+
+        patches, labels = frame_patches(warper, train_items)
+        if args.crops:
+            crops, crop_labels = crop_patches(args.crops, tuple(args.patch_size))
+            patches += crops
+            labels += crop_labels
+            print(f"{len(crops)} crops from {args.crops}")
+
+        if not patches:
+            parser.error("No labeled patches found")
+
+        start = time.perf_counter()
+        classifier = SlotClassifier.fit(np.stack(patches), np.array(labels), l2=args.l2)
+        classifier.threshold = args.threshold
+        elapsed = time.perf_counter() - start
+
+        train_accuracy = float((classifier.predict(np.stack(patches)) == np.array(labels)).mean())
+        print(f"Trained on {len(patches)} patches ({int(np.sum(labels))} occupied) "
+              f"from {len(train_items)} frames in {elapsed:.2f}s, train accuracy {train_accuracy:.3f}")
+
+        if test_items:
+            test_patches, test_labels = frame_patches(warper, test_items)
+            metrics = SlotMetrics()
+            predicted = classifier.predict(np.stack(test_patches)) if test_patches else []
+            metrics.update(dict(enumerate(predicted)), dict(enumerate(test_labels)))
+            overall = metrics.summary()["overall"]
+            print(f"Held out {len(test_items)} frames ({len(test_patches)} patches): "
+                  f"precision {overall['precision']:.3f}, recall {overall['recall']:.3f}, "
+                  f"F1 {overall['f1']:.3f}, accuracy {overall['accuracy']:.3f}")
+
+    output = args.output or os.path.join(lot_dir, CLASSIFIER_FILE)
+    classifier.save(output)
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
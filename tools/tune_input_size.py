@@ -0,0 +1,156 @@
+"""
+Pick the smallest detector input size that keeps a lot's occupancy accuracy
+
+Runs the detector over a lot's sample frames at each candidate input size
+(imgsz) and scores the resulting slot occupancy. With PKLot-style XML
+labels next to the frames (same stem, .xml) the score is accuracy against
+the labels; without them it is agreement with the largest size. The
+smallest size scoring within --tolerance of the best is chosen, and the
+detector latency saved against the lot's current profile is reported.
+Decoding is excluded from the timings.
+
+The other settings (thresholds, classes) come from the lot's profile:
+config defaults plus its profile.json. --write stores the chosen imgsz
+there; the server picks it up on the lot's next request.
+
+Usage:
+    python tools/tune_input_size.py --lot UFPR04 --images DIR [--tolerance 0.01] [--write]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import cv2
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from config import Config
+from src.detect_cars import BACKENDS, CarDetector
+from src.evaluation import SlotMetrics, latency_summary, load_pklot_labels
+from src.layouts import Layout
+from src.profiles import save_profile
+
+MODEL_PATH = os.path.join(BASE_DIR, "models", "yolov8n.pt")
+SIZES = "320,384,416,480,512,640,800,960,1280"
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+
+
+def sample_frames(images_dir, limit=None):
+    """(image, labels or None) for the frames in a directory"""
+    items = []
+    for path in sorted(Path(images_dir).rglob("*")):
+        if path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        img = cv2.imread(str(path))
+        if img is None:
+            continue
+        xml_path = path.with_suffix(".xml")
+        items.append((img, load_pklot_labels(xml_path) if xml_path.exists() else None))
+        if limit and len(items) >= limit:
+            break
+    return items
+
+
+def run_size(detector, layout, images, profile, region, tile_size, warmup=2):
+    """Per-frame detector timings and occupancy predictions at one profile"""
+    def predict(img):
+        return detector.detect(img, region=region, tile_size=tile_size, profile=profile)
+
+    for img in images[:warmup]:
+        predict(img)
+
+    timings, predictions = [], []
+    for img in images:
+        start = time.perf_counter()
+        boxes = predict(img)
+        timings.append(time.perf_counter() - start)
+        predictions.append(layout.occupancy_detector.predict(boxes))
+    return timings, predictions
+
+
+def score(predictions, labels):
+    """Overall slot accuracy and F1 of predictions against labels"""
+    metrics = SlotMetrics()
+    for frame_predictions, frame_labels in zip(predictions, labels):
+        metrics.update(frame_predictions, frame_labels)
+    overall = metrics.summary()["overall"]
+    return overall["accuracy"], overall["f1"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune a lot's detector input size")
+    parser.add_argument("--lot", default="UFPR04", help="Lot the frames were taken from")
+    parser.add_argument("--layouts", default=os.path.join(BASE_DIR, "data"), help="Layouts directory")
+    parser.add_argument("--images", required=True, help="Sample frames, optionally with PKLot-style .xml labels")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--backend", default=Config.DETECTOR_BACKEND)
+    parser.add_argument("--sizes", default=SIZES, help="Comma-separated input sizes to try")
+    parser.add_argument("--tolerance", type=float, default=0.01,
+                        help="Largest accuracy drop from the best size that is accepted")
+    parser.add_argument("--roi", action="store_true", help="Run on the slot region, as with ROI_INFERENCE")
+    parser.add_argument("--tile-size", type=int, default=None, help="As TILE_SIZE on the server")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--write", action="store_true", help="Store the chosen imgsz in the lot's profile.json")
+    args = parser.parse_args()
+
+    lot_dir = os.path.join(args.layouts, args.lot)
+    slots_path = next((str(p) for p in sorted(Path(lot_dir).glob("slots.*"))), None)
+    if slots_path is None:
+        parser.error(f"No slots file in {lot_dir}")
+    if not os.path.exists(args.model):
+        parser.error(f"Model file {args.model} not found")
+    if not BACKENDS[args.backend][1]:
+        parser.error(f"The {args.backend} backend is exported at a fixed input size")
+
+    layout = Layout(args.lot, slots_path, profile_defaults=Config.profile_defaults())
+    sizes = sorted({int(size) for size in args.sizes.split(",") if size.strip()} | {layout.profile.imgsz})
+    profiles = {size: layout.profile.replace(imgsz=size) for size in sizes}
+
+    items = sample_frames(args.images, args.limit)
+    if not items:
+        parser.error(f"No images in {args.images}")
+    images = [img for img, _ in items]
+    labeled = all(labels is not None for _, labels in items)
+
+    detector = CarDetector(args.model, backend=args.backend)
+    region = layout.region if args.roi else None
+
+    results = {}
+    for size in sizes:
+        results[size] = run_size(detector, layout, images, profiles[size], region, args.tile_size)
+
+    # Without labels, the largest size stands in for the truth
+    reference = [labels for _, labels in items] if labeled else results[sizes[-1]][1]
+    scores = {size: score(predictions, reference) for size, (_, predictions) in results.items()}
+    p50 = {size: latency_summary(timings)["p50"] for size, (timings, _) in results.items()}
+
+    best = max(accuracy for accuracy, _ in scores.values())
+    chosen = min(size for size in sizes if scores[size][0] >= best - args.tolerance)
+    current = layout.profile.imgsz
+
+    measure = "accuracy" if labeled else f"agreement with {sizes[-1]}"
+    print(f"{len(images)} frames from {args.images}, lot {args.lot}, {args.backend} backend, "
+          f"profile {layout.profile.to_dict()}\n")
+    print(f"{'imgsz':>6} {'p50 ms':>8} {'p99 ms':>8} {measure:>20} {'F1':>6}")
+    for size in sizes:
+        accuracy, f1 = scores[size]
+        marks = " <- chosen" if size == chosen else ""
+        marks += " (current)" if size == current else ""
+        print(f"{size:>6} {p50[size]:>8.2f} {latency_summary(results[size][0])['p99']:>8.2f} "
+              f"{accuracy:>20.3f} {f1:>6.3f}{marks}")
+
+    saved = p50[current] - p50[chosen]
+    print(f"\nimgsz {chosen}: {measure} {scores[chosen][0]:.3f} (best {best:.3f}, tolerance {args.tolerance}), "
+          f"p50 {p50[chosen]:.2f} ms vs {p50[current]:.2f} ms at {current}, "
+          f"{saved:+.2f} ms saved per frame ({saved / p50[current]:+.0%})")
+
+    if args.write:
+        save_profile(layout.profile_path, profiles[chosen], fields=["imgsz"])
+        print(f"Wrote {layout.profile_path}")
+
+
+if __name__ == "__main__":
+    main()